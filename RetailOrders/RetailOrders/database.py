@@ -0,0 +1,89 @@
+"""
+Настройки подключения к базе данных из переменных окружения.
+
+DB_ENGINE, DB_NAME, DB_HOST, DB_PORT, DB_USER, DB_PASSWORD - параметры подключения.
+DB_CONN_MAX_AGE - время жизни постоянного соединения, секунд
+    (0 - новое соединение на каждый запрос, "none" - без ограничения).
+    По умолчанию 60, при ASYNC_VIEWS=True - 0: под ASGI соединения открываются
+    в разных потоках и не переиспользуются, для повторного использования - пул.
+DB_CONN_HEALTH_CHECKS - проверять постоянное соединение перед повторным использованием.
+DB_POOL - пул соединений psycopg 3 (только PostgreSQL); DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT - размер пула и ожидание соединения, секунд.
+    С пулом постоянные соединения отключаются (CONN_MAX_AGE = 0).
+DB_STATEMENT_TIMEOUT - ограничение времени выполнения запроса, мс (только PostgreSQL).
+DB_CONNECT_TIMEOUT - ожидание установки соединения, секунд (только PostgreSQL).
+
+DB_REPLICAS - псевдонимы реплик через запятую, например "replica1,replica2".
+    Настройки реплики задаются переменными DB_REPLICA1_HOST и т.д., не заданные
+    берутся из основной базы.
+"""
+import os
+
+
+def _flag(value):
+    return value.lower() in ('true', '1', 'yes')
+
+
+def _conn_max_age(value):
+    if value.lower() == 'none':
+        return None
+    return int(value)
+
+
+def _default_conn_max_age():
+    return '0' if os.getenv('ASYNC_VIEWS', False) == 'True' else '60'
+
+
+def database_config(prefix='DB_', fallback=None):
+    """
+    Настройки одной базы данных для DATABASES
+    :param prefix: префикс переменных окружения (DB_ для основной базы)
+    :param fallback: префикс, переменные с которым используются, если с prefix не заданы
+    :return: словарь настроек Django
+    """
+    def env(name, default=None):
+        if fallback is not None:
+            default = os.getenv(fallback + name, default)
+        return os.getenv(prefix + name, default)
+
+    engine = env('ENGINE')
+    config = {
+        'ENGINE': engine,
+        'NAME': env('NAME'),
+        'HOST': env('HOST'),
+        'PORT': env('PORT'),
+        'USER': env('USER'),
+        'PASSWORD': env('PASSWORD'),
+        'CONN_MAX_AGE': _conn_max_age(env('CONN_MAX_AGE', _default_conn_max_age())),
+        'CONN_HEALTH_CHECKS': _flag(env('CONN_HEALTH_CHECKS', 'True')),
+        'OPTIONS': {},
+    }
+    if engine != 'django.db.backends.postgresql':
+        return config
+
+    options = config['OPTIONS']
+    if env('CONNECT_TIMEOUT'):
+        options['connect_timeout'] = int(env('CONNECT_TIMEOUT'))
+    if env('STATEMENT_TIMEOUT'):
+        options['options'] = f"-c statement_timeout={int(env('STATEMENT_TIMEOUT'))}"
+    if _flag(env('POOL', 'False')):
+        # Пул psycopg 3 несовместим с постоянными соединениями Django
+        config['CONN_MAX_AGE'] = 0
+        options['pool'] = {
+            'min_size': int(env('POOL_MIN_SIZE', 2)),
+            'max_size': int(env('POOL_MAX_SIZE', 10)),
+            'timeout': float(env('POOL_TIMEOUT', 10)),
+        }
+    return config
+
+
+def replica_configs(names):
+    """
+    Настройки реплик для DATABASES. В тестах реплики указывают на тестовую
+    основную базу (TEST MIRROR), поэтому отдельный кластер не нужен.
+    :param names: псевдонимы реплик
+    """
+    return {
+        name: {**database_config(prefix=f'DB_{name.upper()}_', fallback='DB_'), 'TEST': {'MIRROR': 'default'}}
+        for name in names
+    }
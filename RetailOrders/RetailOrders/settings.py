@@ -15,6 +15,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
 
+from .database import database_config, replica_configs
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Полнотекстовый и триграммный поиск товаров
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',  # Черный список для управления устаревшими токенами
@@ -50,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.instrumentation_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.middleware.replica_pinning_middleware',
 ]
 
 ROOT_URLCONF = 'RetailOrders.urls'
@@ -82,17 +87,87 @@ WSGI_APPLICATION = 'RetailOrders.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Постоянные соединения, пул, проверка соединений и таймауты - см. RetailOrders/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('DB_ENGINE'),
-        'NAME': os.getenv('DB_NAME'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT'),
-        'USER': os.getenv('DB_USER'),
-        'PASSWORD': os.getenv('DB_PASSWORD')
-    }
+    'default': database_config(),
 }
 
+# Реплики для чтения каталога и отчетов (см. backend/routers.py)
+DATABASE_REPLICAS = [name for name in os.getenv('DB_REPLICAS', '').split(',') if name]
+DATABASES.update(replica_configs(DATABASE_REPLICAS))
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+# Redis в production (REDIS_URL=redis://host:6379/0), память процесса - для разработки и тестов
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Асинхронные view профиля и контактов пользователя (для запуска под ASGI)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', False) == 'True'
+
+# Время жизни записей кэша каталога, секунд
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 300))
+# Время жизни кэша версий токенов пользователей, секунд. Отзыв токенов сбрасывает
+# запись только в кэше своего процесса, поэтому без общего кэша (Redis) отозванный
+# токен принимается другими процессами до истечения этого времени
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 3600 if os.getenv('REDIS_URL') else 5))
+
+# Метрики запросов (количество и время SQL, размер ответа) и заголовок Server-Timing
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', 'True') == 'True'
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'True') == 'True'
+# Как часто счетчики процесса добавляются в общий кэш, секунд
+METRICS_FLUSH_SECONDS = int(os.getenv('METRICS_FLUSH_SECONDS', 10))
+# Токен доступа к /metrics (Authorization: Bearer <токен>); без него endpoint доступен только при DEBUG
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Сколько повторов одного SQL за запрос считается N+1 и пишется в лог
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+# Строк в одной выборке из курсора при потоковой выгрузке каталога и заказов
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+# Фоновые задачи (backend.jobs): "worker" - очередь в базе, выполняет команда run_worker;
+# "immediate" - выполнение в процессе сразу после фиксации транзакции (тесты, разработка без воркера)
+JOBS_EXECUTOR = os.getenv('JOBS_EXECUTOR', 'worker')
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+# Задержка перед первым повтором, секунд; каждая следующая вдвое больше, но не больше максимума
+JOBS_RETRY_DELAY = float(os.getenv('JOBS_RETRY_DELAY', 10))
+JOBS_MAX_RETRY_DELAY = float(os.getenv('JOBS_MAX_RETRY_DELAY', 3600))
+# Аренда задачи воркером: после нее задачу упавшего воркера возьмет другой
+JOBS_LEASE_SECONDS = int(os.getenv('JOBS_LEASE_SECONDS', 300))
+
+
+# Хеширование паролей: первый хешер используется для новых паролей,
+# хеши остальных алгоритмов и с другим количеством итераций пересчитываются при входе
+PASSWORD_HASHERS = [
+    'backend.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Количество итераций PBKDF2 (0 - значение Django по умолчанию)
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 0))
+# Количество процессов для хеширования паролей (0 - в процессе запроса)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+# Максимум одновременных операций хеширования в процессе и время ожидания свободного слота, секунд
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 4))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -136,7 +211,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'backend.authentication.StatelessJWTAuthentication',
     ],
 }
 
@@ -149,4 +224,6 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',                                # Алгоритм шифрования (HMAC SHA-256)
     'SIGNING_KEY': SECRET_KEY,                           # Ключ для подписания токенов
     'AUTH_HEADER_TYPES': ('Bearer',),                    # Тип авторизационного заголовка
+    'TOKEN_OBTAIN_SERIALIZER': 'backend.serializers.UserTokenObtainPairSerializer',  # Токены с ролью и версией
+    'TOKEN_REFRESH_SERIALIZER': 'backend.serializers.UserTokenRefreshSerializer',
 }
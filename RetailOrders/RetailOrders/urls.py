@@ -14,13 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 # from backend.views import RegisterAccount
 
-from backend.views import RegisterAccount, UserRetrieveUpdate, ChangePasswordView, ContactsView, ContactDetailView
+from backend.views import RegisterAccount, UserRetrieveUpdate, ChangePasswordView, ContactsView, ContactDetailView, \
+    ContactBatchView, PriceListImportView, ProductListView, ProductDetailView, CategoryListView, OrderCheckoutView, \
+    OrderStatusView, CatalogSummaryView, ProductSearchView, ProductFacetView, MetricsView, PriceListExportView, \
+    OrderExportView
+
+if settings.ASYNC_VIEWS:
+    from backend.async_views import AsyncUserRetrieveUpdate as UserRetrieveUpdate, \
+        AsyncContactsView as ContactsView, AsyncContactDetailView as ContactDetailView
 
 
 urlpatterns = [
@@ -32,4 +40,17 @@ urlpatterns = [
     path('api/token/refresh', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/user/contact', ContactsView.as_view(), name='contacts'),
     path('api/user/contact/<int:pk>/', ContactDetailView.as_view(), name='contact'),
+    path('api/user/contact/batch', ContactBatchView.as_view(), name='contacts-batch'),
+    path('api/products', ProductListView.as_view(), name='products'),
+    path('api/products/search', ProductSearchView.as_view(), name='products-search'),
+    path('api/products/facets', ProductFacetView.as_view(), name='products-facets'),
+    path('api/products/<int:pk>', ProductDetailView.as_view(), name='product'),
+    path('api/categories', CategoryListView.as_view(), name='categories'),
+    path('api/categories/summary', CatalogSummaryView.as_view(), name='categories-summary'),
+    path('api/order/checkout', OrderCheckoutView.as_view(), name='order-checkout'),
+    path('api/order/status', OrderStatusView.as_view(), name='order-status'),
+    path('api/order/export', OrderExportView.as_view(), name='order-export'),
+    path('api/partner/import', PriceListImportView.as_view(), name='partner-import'),
+    path('api/partner/export', PriceListExportView.as_view(), name='partner-export'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
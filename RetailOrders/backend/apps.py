@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class BackendConfig(AppConfig):
     name = 'backend'
+
+    def ready(self):
+        # Регистрируем обработчики сигналов
+        from . import signals  # noqa: F401
+        # Регистрируем фоновые задачи для воркера
+        from . import tasks  # noqa: F401
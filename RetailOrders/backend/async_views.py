@@ -0,0 +1,163 @@
+"""
+Асинхронные view для профиля и контактов пользователя (ASYNC_VIEWS=True).
+
+APIView из DRF синхронный, и под ASGI каждый запрос занимает поток.
+Здесь view наследуются от django.views.View с async-обработчиками:
+аутентификация по JWT и запросы к базе выполняются через асинхронные
+методы кэша и ORM (aget, acreate, adelete, async for), а проверка
+данных сериализаторами, которая не обращается к базе, - в цикле событий.
+Формат ответов совпадает с синхронными view из backend.views.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
+
+from .authentication import StatelessJWTAuthentication
+from .fastpath import row_plan
+from .models import Contact, User
+from .renderers import FastJSONRenderer
+from .serializers import ContactDataSerializer, UserSerializer
+
+
+class AsyncAPIView(View):
+    """
+    Базовый async view: JWT-аутентификация, разбор тела запроса (JSON или
+    форма) и ответы в формате DRF. Все обработчики, кроме OPTIONS, требуют
+    аутентификации.
+    """
+    authentication = StatelessJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как и в APIView: аутентификация по заголовку, CSRF не проверяется
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.response({'detail': f'Method "{request.method}" not allowed.'},
+                                 status.HTTP_405_METHOD_NOT_ALLOWED)
+        if request.method == 'OPTIONS':
+            # Список методов (View.options): предварительный запрос CORS приходит без токена
+            return await handler(request, *args, **kwargs)
+        try:
+            authenticated = await self.authentication.aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+            request.user, request.auth = authenticated
+            request.data = self.parse(request)
+            return await handler(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.response({'detail': exc.detail}, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+
+    @staticmethod
+    def parse(request):
+        if request.method not in ('POST', 'PUT', 'PATCH'):
+            return {}
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError as error:
+                raise ParseError(f'JSON parse error - {error}')
+        return request.POST
+
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def response(cls, data, status_code=status.HTTP_200_OK):
+        # Тот же рендерер, что у DRF view: компактный JSON в UTF-8
+        return HttpResponse(cls.renderer.render(data), status=status_code, content_type='application/json')
+
+
+class AsyncUserRetrieveUpdate(AsyncAPIView):
+    """
+    Retrieve details and Update authenticated user
+    Methods:
+    - get: Retrieve the details of the authenticated user.
+    - put: Update the details of the authenticated user.
+    """
+
+    @staticmethod
+    async def get_user(user_id):
+        return await UserSerializer.setup_eager_loading(User.objects.filter(pk=user_id)).aget()
+
+    async def get(self, request, *args, **kwargs):
+        user = await self.get_user(request.user.id)
+        return self.response(UserSerializer(user).data)
+
+    async def put(self, request, *args, **kwargs):
+        user = await self.get_user(request.user.id)
+        serializer = UserSerializer(user, data=request.data, partial=True)
+        # Проверка уникальности username выполняет запрос к базе
+        if not await sync_to_async(serializer.is_valid)():
+            return self.response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        for attr, value in serializer.validated_data.items():
+            setattr(user, attr, value)
+        await user.asave()
+        return self.response(UserSerializer(user).data)
+
+
+class AsyncContactsView(AsyncAPIView):
+    """
+    Getting a list of contacts and creating a new contact
+    """
+
+    async def get(self, request):
+        contacts = Contact.objects.filter(user_id=request.user.id).order_by('id')
+        return self.response(await row_plan(ContactDataSerializer).arows(contacts))
+
+    async def post(self, request):
+        serializer = ContactDataSerializer(data=request.data)
+        if not serializer.is_valid():
+            return self.response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        contact = await Contact.objects.acreate(user_id=request.user.id, **serializer.validated_data)
+        return self.response(ContactDataSerializer(contact).data, status.HTTP_201_CREATED)
+
+
+class AsyncContactDetailView(AsyncAPIView):
+    """
+    Viewing, updating, and deleting a specific user contact.
+    Methods:
+    - get: Retrieve the details of the specific user contact.
+    - put: Update the details of the specific user contact.
+    - delete: Delete the specific user contact.
+    """
+
+    @staticmethod
+    async def get_contact(pk, user):
+        try:
+            return await Contact.objects.aget(pk=pk, user_id=user.id)
+        except Contact.DoesNotExist:
+            return None
+
+    async def get(self, request, pk):
+        contact = await self.get_contact(pk, request.user)
+        if contact is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        return self.response(ContactDataSerializer(contact).data)
+
+    async def put(self, request, pk):
+        contact = await self.get_contact(pk, request.user)
+        if contact is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        serializer = ContactDataSerializer(contact, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return self.response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        for attr, value in serializer.validated_data.items():
+            setattr(contact, attr, value)
+        await contact.asave(update_fields=list(serializer.validated_data))
+        return self.response(ContactDataSerializer(contact).data)
+
+    async def delete(self, request, pk):
+        deleted, _ = await Contact.objects.filter(pk=pk, user_id=request.user.id).adelete()
+        if not deleted:
+            return self.response({'Message': f'Contact id = {pk} not found'}, status.HTTP_404_NOT_FOUND)
+        return self.response({'Message': f'Contact id = {pk} successfully deleted'}, status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,158 @@
+"""
+Аутентификация по JWT без запроса пользователя на каждый запрос.
+
+В токен записываются id, роль, признаки is_active/is_staff и версия
+токенов пользователя (User.token_version). При проверке токена из базы
+читается только версия, и та берется из кэша, а request.user - ленивый
+объект: полная запись пользователя загружается, только когда view
+обращается к полям, которых нет в токене.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+# Утверждение токена с версией токенов пользователя
+VERSION_CLAIM = 'ver'
+
+
+def _version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def token_version(user_id):
+    """
+    Текущая версия токенов пользователя
+    :param user_id: id пользователя
+    :return: версия или None, если пользователя нет
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # get() вместо first(): first() добавляет ORDER BY к поиску по первичному ключу
+        try:
+            version = User.objects.values_list('token_version', flat=True).get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def atoken_version(user_id):
+    """
+    Текущая версия токенов пользователя для async view
+    """
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        try:
+            version = await User.objects.values_list('token_version', flat=True).aget(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        await cache.aset(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    cache.delete(_version_key(user_id))
+
+
+def add_user_claims(token, user):
+    """
+    Записываем в токен данные пользователя, нужные для проверки прав без запроса к базе
+    """
+    token.payload.update(user.token_claims())
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def check_token_version(token):
+    """
+    Проверяем, что токен не отозван сменой пароля, роли или статуса пользователя
+    """
+    if token.get(VERSION_CLAIM) != token_version(token[api_settings.USER_ID_CLAIM]):
+        raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+
+async def acheck_token_version(token):
+    if token.get(VERSION_CLAIM) != await atoken_version(token[api_settings.USER_ID_CLAIM]):
+        raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    Пользователь из утверждений токена.
+    id, pk, role, is_active и is_staff берутся из токена, при обращении
+    к остальным атрибутам пользователь загружается из базы.
+    """
+
+    def __init__(self, token):
+        user_id = int(token[api_settings.USER_ID_CLAIM])
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__['_claims'] = {
+            'id': user_id,
+            'role': token['role'],
+            'is_active': token['is_active'],
+            'is_staff': token['is_staff'],
+        }
+
+    id = property(lambda self: self._claims['id'])
+    pk = property(lambda self: self._claims['id'])
+    role = property(lambda self: self._claims['role'])
+    is_active = property(lambda self: self._claims['is_active'])
+    is_staff = property(lambda self: self._claims['is_staff'])
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация, которая не загружает пользователя из базы.
+    Токены, выданные до появления утверждений пользователя, проверяются
+    как в JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        self._check_claims(validated_token)
+        check_token_version(validated_token)
+        return TokenUser(validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        Аутентификация для async view: версия токенов читается через
+        асинхронные методы кэша и ORM
+        :return: (пользователь, токен) или None, если заголовка нет
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if VERSION_CLAIM not in validated_token:
+            user = await sync_to_async(super().get_user)(validated_token)
+            return user, validated_token
+        self._check_claims(validated_token)
+        await acheck_token_version(validated_token)
+        return TokenUser(validated_token), validated_token
+
+    @staticmethod
+    def _check_claims(validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if not validated_token.get('is_active'):
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
@@ -0,0 +1,176 @@
+"""
+Микробенчмарки endpoint'ов REST API.
+
+Каждый сценарий выполняется через django.test.Client (полный стек
+middleware, аутентификации и сериализации, без сети) в два прохода:
+замер времени без дополнительных инструментов и отдельный проход, в
+котором считаются SQL-запросы и пиковый объем памяти, выделенной за
+запрос (tracemalloc замедляет выполнение и исказил бы задержку).
+
+Результаты сравниваются с сохраненным базовым замером (baseline):
+количество запросов не должно расти совсем, задержка p95 и память - не
+больше чем на заданный допуск. Задержка зависит от машины и СУБД,
+поэтому базовый замер снимается на том же окружении, где выполняется
+сравнение.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from itertools import count
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .seed import PASSWORD
+
+# Разница задержки меньше этой не считается регрессией: шум на быстрых endpoint'ах
+MIN_LATENCY_DELTA_MS = 2.0
+# Проходов с tracemalloc и подсчетом запросов
+PROFILE_ITERATIONS = 10
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: Callable
+    body: Callable = None
+    auth: bool = True
+
+
+SCENARIOS = (
+    Scenario('user.register', 'post', lambda data: '/api/user/register', auth=False, body=lambda data, n: {
+        'first_name': 'Иван', 'last_name': 'Иванов', 'username': f'bench-{data["prefix"]}-{data["run"]}-{n}',
+        'email': f'bench-{data["prefix"]}-{data["run"]}-{n}@example.com', 'password': PASSWORD}),
+    Scenario('user.retrieve', 'get', lambda data: '/api/user/retrieveupdate'),
+    Scenario('user.update', 'put', lambda data: '/api/user/retrieveupdate',
+             body=lambda data, n: {'position': f'Менеджер {n}'}),
+    Scenario('token.obtain', 'post', lambda data: '/api/token', auth=False,
+             body=lambda data, n: {'email': data['email'], 'password': PASSWORD}),
+    Scenario('token.refresh', 'post', lambda data: '/api/token/refresh', auth=False,
+             body=lambda data, n: {'refresh': str(data['refresh_token']())}),
+    Scenario('contacts.list', 'get', lambda data: '/api/user/contact'),
+    Scenario('contacts.create', 'post', lambda data: '/api/user/contact',
+             body=lambda data, n: {'phone': f'+7901{n:07d}', 'city': 'Москва', 'street': 'Арбат', 'house': '1',
+                                   'apartment': '1'}),
+    Scenario('contact.detail', 'get', lambda data: f'/api/user/contact/{data["contact_id"]}/'),
+    Scenario('contact.update', 'put', lambda data: f'/api/user/contact/{data["contact_id"]}/',
+             body=lambda data, n: {'apartment': str(n % 1000)}),
+    Scenario('contacts.batch', 'post', lambda data: '/api/user/contact/batch', body=lambda data, n: {
+        'create': [{'phone': f'+7902{n:07d}', 'city': 'Казань', 'street': 'Баумана', 'house': '2',
+                    'apartment': '1'}],
+        'update': [{'id': data['contact_id'], 'house': str(n % 100)}]}),
+    Scenario('products.list', 'get', lambda data: '/api/products?limit=50', auth=False),
+    Scenario('products.filter', 'get', auth=False,
+             path=lambda data: f'/api/products?category={data["category_id"]}&in_stock=1'),
+    Scenario('products.detail', 'get', lambda data: f'/api/products/{data["product_id"]}', auth=False),
+    Scenario('products.search', 'get', lambda data: '/api/products/search?q=Смартфон', auth=False),
+    Scenario('products.facets', 'get', lambda data: f'/api/products/facets?category={data["category_id"]}',
+             auth=False),
+    Scenario('categories.list', 'get', lambda data: '/api/categories', auth=False),
+    Scenario('categories.summary', 'get', lambda data: '/api/categories/summary', auth=False),
+    # Товары чередуются, чтобы остатка хватило на все итерации
+    Scenario('order.checkout', 'post', lambda data: '/api/order/checkout', body=lambda data, n: {
+        'items': [{'product': data['in_stock_product_ids'][n % len(data['in_stock_product_ids'])],
+                   'quantity': 1}]}),
+)
+
+
+class ScenarioError(Exception):
+    """
+    Endpoint вернул ошибку: замер такого сценария не имеет смысла
+    """
+
+
+def _request(client, scenario, data, sequence, headers):
+    kwargs = dict(headers if scenario.auth else {})
+    # Тело (в том числе новый refresh-токен) готовится до начала замера
+    if scenario.body is not None:
+        kwargs.update(data=json.dumps(scenario.body(data, next(sequence))), content_type='application/json')
+    path = scenario.path(data)
+    return lambda: getattr(client, scenario.method)(path, **kwargs)
+
+
+def _check(scenario, response):
+    if response.status_code >= 400:
+        raise ScenarioError(f'{scenario.name}: {response.status_code} {response.content[:200]!r}')
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure(client, scenario, data, headers, iterations=50, warmup=5):
+    """
+    Замер одного сценария
+    :param client: django.test.Client
+    :param scenario: Scenario
+    :param data: данные набора (см. seed.sample), email пользователя, фабрика refresh-токенов
+                 и уникальная метка запуска run
+    :param headers: заголовки авторизации
+    :param iterations: количество замеряемых запросов
+    :param warmup: запросов прогрева (заполнение кэшей, соединение с БД)
+    :return: словарь с количеством запросов, p50/p95 в мс и памятью в КБ
+    :raise ScenarioError: endpoint вернул ошибку
+    """
+    sequence = count()
+    for _ in range(warmup):
+        _check(scenario, _request(client, scenario, data, sequence, headers)())
+
+    timings = []
+    for _ in range(iterations):
+        send = _request(client, scenario, data, sequence, headers)
+        started = time.perf_counter()
+        response = send()
+        timings.append((time.perf_counter() - started) * 1000)
+        _check(scenario, response)
+
+    queries, allocations = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(min(iterations, PROFILE_ITERATIONS)):
+            send = _request(client, scenario, data, sequence, headers)
+            with CaptureQueriesContext(connection) as captured:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                response = send()
+                _, peak = tracemalloc.get_traced_memory()
+            _check(scenario, response)
+            queries.append(len(captured.captured_queries))
+            allocations.append((peak - before) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'queries': max(queries),
+        'p50_ms': round(_percentile(timings, 0.5), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'alloc_kb': round(statistics.median(allocations), 1),
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Сравнение с базовым замером
+    :param results: результаты measure по сценариям
+    :param baseline: базовые результаты по сценариям
+    :param tolerance: допустимый относительный рост задержки и памяти
+    :return: список описаний регрессий
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append(f'{name}: запросов {base["queries"]} -> {result["queries"]}')
+        limit = max(base['p95_ms'] * (1 + tolerance), base['p95_ms'] + MIN_LATENCY_DELTA_MS)
+        if result['p95_ms'] > limit:
+            regressions.append(f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс')
+        if result['alloc_kb'] > base['alloc_kb'] * (1 + tolerance):
+            regressions.append(f'{name}: память {base["alloc_kb"]} -> {result["alloc_kb"]} КБ')
+    return regressions
@@ -0,0 +1,75 @@
+"""
+Проверка использования индексов через EXPLAIN.
+
+Каждый случай - запрос из реального сценария (views, order_status,
+summary) и индекс, который должен использоваться в его плане. Имя
+индекса ищется в тексте плана: в PostgreSQL "Index Scan using <имя>",
+в SQLite "USING INDEX <имя>". Для внешних ключей, индекс которых
+создает Django, указывается начало имени (backend_contact_user_id).
+
+SQLite применяет частичный индекс, только если условие запроса задано
+литералами, а Django передает значения параметрами, поэтому такие случаи
+проверяются только в PostgreSQL (vendors).
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import connection
+from django.db.models import Sum
+
+from ..models import ACTIVE_STATUSES, Contact, Order, OrderItem, Product
+
+
+@dataclass(frozen=True)
+class IndexCase:
+    name: str
+    index: str
+    query: Callable
+    vendors: tuple = ()
+
+
+CASES = (
+    IndexCase(
+        'Заказы покупателя в статусе, новые первыми', 'order_user_status_created_idx',
+        lambda data: Order.objects.filter(user_id=data['user_id'], status='delivered').order_by('-created_at')),
+    IndexCase(
+        'Незавершенные заказы по дате', 'order_active_idx',
+        lambda data: Order.objects.filter(status__in=ACTIVE_STATUSES).order_by('status', 'created_at')[:50],
+        vendors=('postgresql',)),
+    IndexCase(
+        'Строки заказа', 'orderitem_order_product_idx',
+        lambda data: OrderItem.objects.filter(order_id=data['order_id'])),
+    IndexCase(
+        'Товары отмененных заказов (возврат на склад)', 'orderitem_order_product_idx',
+        lambda data: OrderItem.objects.filter(order_id__in=data['order_ids']).values('product_id')
+        .annotate(total=Sum('quantity')).order_by('product_id')),
+    IndexCase(
+        'Каталог поставщика в категории', 'product_company_category_idx',
+        lambda data: Product.objects.filter(company_id=data['company_id'], category_id=data['category_id'])
+        .order_by('name', 'id')[:50]),
+    IndexCase(
+        'Товары категории в наличии', 'product_in_stock_idx',
+        lambda data: Product.objects.filter(category_id=data['category_id'], quantity__gt=0)
+        .order_by('name', 'id')[:50]),
+    IndexCase(
+        'Первая страница каталога', 'product_name_id_idx',
+        lambda data: Product.objects.order_by('name', 'id')[:50]),
+    IndexCase(
+        'Контакты пользователя', 'backend_contact_user_id',
+        lambda data: Contact.objects.filter(user_id=data['user_id'])),
+)
+
+
+def check_cases(data, cases=CASES):
+    """
+    Выполняем EXPLAIN для каждого случая
+    :param data: результат seed() с id для запросов
+    :return: список (случай, план, индекс используется); случаи для других СУБД пропускаются
+    """
+    results = []
+    for case in cases:
+        if case.vendors and connection.vendor not in case.vendors:
+            continue
+        plan = case.query(data).explain()
+        results.append((case, plan, case.index in plan))
+    return results
@@ -0,0 +1,140 @@
+"""
+Запись SQL ключевых endpoint'ов и проверка сортировок.
+
+У моделей нет порядка по умолчанию, поэтому ORDER BY появляется в запросе
+только там, где список сортируется явно. Для каждого endpoint'а
+перечислены допустимые сортировки (каждая опирается на индекс); любой
+другой ORDER BY, в том числе в exists(), count() и проверках внешних
+ключей, считается ошибкой.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+ORDER_BY = re.compile(r'\bORDER BY\s+(.+?)(?=\s+LIMIT\b|\s+OFFSET\b|\s+FOR\s+UPDATE\b|\)|$)', re.S)
+DIRECTION = re.compile(r'\s+(ASC|DESC)(\s+NULLS\s+(FIRST|LAST))?$', re.I)
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    path: Callable
+    orderings: tuple = ()
+    method: str = 'get'
+    body: Callable = None
+    auth: bool = False
+
+
+ENDPOINTS = (
+    Endpoint('Первая страница каталога', lambda data: '/api/products?limit=20', orderings=(('name', 'id'),)),
+    Endpoint('Каталог поставщика в категории',
+             lambda data: f'/api/products?company={data["company_id"]}&category={data["category_id"]}',
+             orderings=(('name', 'id'),)),
+    Endpoint('Товары категории в наличии', lambda data: f'/api/products?category={data["category_id"]}&in_stock=1',
+             orderings=(('name', 'id'),)),
+    Endpoint('Карточка товара', lambda data: f'/api/products/{data["product_id"]}'),
+    Endpoint('Категории', lambda data: '/api/categories', orderings=(('name',),)),
+    Endpoint('Сводка каталога', lambda data: '/api/categories/summary', orderings=(('name',),)),
+    Endpoint('Фасеты категории', lambda data: f'/api/products/facets?category={data["category_id"]}',
+             orderings=(('name', 'id'), ('property_id', '-count', 'value'))),
+    Endpoint('Поиск', lambda data: '/api/products/search?q=Смартфон', orderings=(('-rank', 'id'),)),
+    Endpoint('Профиль', lambda data: '/api/user/retrieveupdate', auth=True),
+    Endpoint('Контакты', lambda data: '/api/user/contact', orderings=(('id',),), auth=True),
+    Endpoint('Оформление заказа', lambda data: '/api/order/checkout', method='post', auth=True,
+             body=lambda data: {'items': [{'product': data['in_stock_product_ids'][0], 'quantity': 1}]}),
+)
+
+
+def _split(clause):
+    # Запятые внутри скобок (выражения) не разделяют поля сортировки
+    terms, depth, start = [], 0, 0
+    for index, char in enumerate(clause):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            terms.append(clause[start:index])
+            start = index + 1
+    terms.append(clause[start:])
+    return terms
+
+
+def _top_level(sql, keyword):
+    # Позиция ключевого слова вне скобок (подзапросов и выражений)
+    depth = 0
+    for index, char in enumerate(sql):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and sql.startswith(keyword, index):
+            return index
+    return -1
+
+
+def _columns(sql):
+    """
+    Имена столбцов внешнего SELECT: Django сортирует по выбранным
+    аннотациям ссылкой на номер столбца (ORDER BY 2 DESC)
+    """
+    start, end = _top_level(sql, 'SELECT '), _top_level(sql, ' FROM ')
+    if start < 0 or end < start:
+        return []
+    columns = []
+    for item in _split(sql[start + len('SELECT '):end]):
+        alias = re.search(r'\sAS\s+(\S+)$', item.strip())
+        columns.append(alias.group(1) if alias else item)
+    return columns
+
+
+def _field(term, columns):
+    term = term.strip()
+    match = DIRECTION.search(term)
+    descending = bool(match) and match.group(1).upper() == 'DESC'
+    if match:
+        term = term[:match.start()]
+    if term.isdigit() and 0 < int(term) <= len(columns):
+        term = columns[int(term) - 1].strip()
+    if '(' not in term:
+        term = term.split('.')[-1].strip('"`')
+    return f'-{term}' if descending else term
+
+
+def orderings(sql):
+    """
+    Сортировки запроса (включая подзапросы)
+    :param sql: текст запроса
+    :return: список кортежей полей, например [('-rank', 'id')]
+    """
+    columns = _columns(sql)
+    return [tuple(_field(term, columns) for term in _split(clause)) for clause in ORDER_BY.findall(sql)]
+
+
+def record(client, endpoint, data, headers=None):
+    """
+    Выполняем запрос к endpoint'у и записываем SQL
+    :param client: django.test.Client
+    :param endpoint: Endpoint
+    :param data: результат seed() с id для запросов
+    :param headers: заголовки запроса (авторизация)
+    :return: (код ответа, список SQL)
+    """
+    kwargs = dict(headers or {})
+    if endpoint.body is not None:
+        kwargs.update(data=endpoint.body(data), content_type='application/json')
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, endpoint.method)(endpoint.path(data), **kwargs)
+    return response.status_code, [query['sql'] for query in queries.captured_queries]
+
+
+def unexpected_orderings(endpoint, statements):
+    """
+    Сортировки, не объявленные для endpoint'а
+    :return: список (SQL, сортировка)
+    """
+    return [(sql, ordering) for sql in statements for ordering in orderings(sql)
+            if ordering not in endpoint.orderings]
@@ -0,0 +1,189 @@
+"""
+Генерация данных для бенчмарков.
+
+Размер задается количеством товаров, остальные таблицы масштабируются
+от него: на 1 000 товаров приходится около 8 000 строк во всех таблицах,
+на 1 250 000 - около 10 миллионов. Товары со своими характеристиками и
+заказами генерируются порциями, поэтому расход памяти не зависит от
+размера набора. Данные пишутся через bulk_create, без сигналов и пересчета
+сумм по одной строке: суммы заказов и фасеты вычисляются при генерации,
+сводка каталога - одним пересчетом в конце. Генерация детерминирована
+(random_seed), имена уникальны в пределах запуска (prefix), поэтому
+данные можно добавлять в непустую базу.
+"""
+import random
+import uuid
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+
+from .. import summary
+from ..facets import build_facet
+from ..models import (Category, Company, Contact, Order, OrderItem, Product, ProductFacet, ProductProperty,
+                      Property, STATUS_CHOICES, User)
+
+# Пароль всех сгенерированных пользователей
+PASSWORD = 'bench-Passw0rd'
+
+WORDS = ('Смартфон', 'Ноутбук', 'Планшет', 'Монитор', 'Наушники', 'Клавиатура', 'Мышь', 'Роутер',
+         'Колонка', 'Часы', 'Камера', 'Принтер', 'Телевизор', 'Холодильник', 'Пылесос')
+BRANDS = ('Apple', 'Samsung', 'Xiaomi', 'Lenovo', 'Asus', 'Acer', 'Sony', 'LG', 'Huawei', 'Dell')
+PROPERTIES = (('Диагональ', 'дюйм', lambda rnd: f'{rnd.uniform(5, 65):.1f}'),
+              ('Цвет', '', lambda rnd: rnd.choice(('черный', 'белый', 'серый', 'синий', 'красный'))),
+              ('Встроенная память', 'Гб', lambda rnd: str(rnd.choice((32, 64, 128, 256, 512, 1024)))),
+              ('Вес', 'г', lambda rnd: str(rnd.randint(50, 20000))),
+              ('Гарантия', 'мес', lambda rnd: str(rnd.choice((6, 12, 24, 36)))),
+              ('Страна', '', lambda rnd: rnd.choice(('Китай', 'Корея', 'Вьетнам', 'Тайвань'))))
+STATUS_WEIGHTS = {'new': 10, 'confirmed': 10, 'assembled': 5, 'sent': 5, 'delivered': 30, 'closed': 30,
+                  'canceled': 10}
+
+
+def _create(model, objects, batch_size):
+    created = []
+    for start in range(0, len(objects), batch_size):
+        created.extend(model.objects.bulk_create(objects[start:start + batch_size]))
+    return created
+
+
+def _share(total, start, end, count):
+    # Доля строк, приходящаяся на товары [start, end), без накопления ошибки округления
+    return total * end // count - total * start // count
+
+
+def seed(products=10000, properties_per_product=3, batch_size=5000, random_seed=42, prefix=None, progress=None):
+    """
+    Заполняем базу данными для бенчмарков
+    :param products: количество товаров, от него зависят размеры остальных таблиц
+    :param properties_per_product: характеристик у каждого товара
+    :param batch_size: строк в одном INSERT, товары генерируются порциями того же размера
+    :param random_seed: начальное значение генератора случайных чисел
+    :param prefix: уникальная часть имен (по умолчанию случайная)
+    :param progress: функция, вызываемая с количеством созданных товаров после каждой порции
+    :return: словарь с количеством строк и примерами id для запросов бенчмарков (см. sample)
+    """
+    rnd = random.Random(random_seed)
+    prefix = prefix or uuid.uuid4().hex[:8]
+    users_count = max(products // 10, 10)
+    companies_count = max(products // 2000, 2)
+    categories_count = max(products // 500, 5)
+    orders_count = max(products // 5, 10)
+    rows = Counter()
+
+    # В памяти держатся только id: объем не зависит от размера набора
+    password = make_password(PASSWORD)
+    user_ids = []
+    for start in range(0, users_count, batch_size):
+        users = User.objects.bulk_create([
+            User(username=f'bench-{prefix}-{i}', email=f'bench-{prefix}-{i}@example.com', password=password,
+                 first_name='Иван', last_name=f'Покупатель {i}',
+                 role='supplier' if i < companies_count else 'buyer')
+            for i in range(start, min(start + batch_size, users_count))])
+        Contact.objects.bulk_create([
+            Contact(user=user, phone=f'+7900{user.id % 10 ** 7:07d}', city='Москва', street='Тверская',
+                    house=str(user.id % 100), apartment=str(user.id % 300))
+            for user in users for _ in range(2)])
+        user_ids.extend(user.id for user in users)
+    rows.update(users=users_count, contacts=users_count * 2)
+    buyer_ids = user_ids[companies_count:]
+
+    companies = _create(Company, [
+        Company(name=f'Поставщик {prefix}-{i}', owner_id=user_ids[i]) for i in range(companies_count)], batch_size)
+    categories = _create(Category, [
+        Category(name=f'Категория {prefix}-{i}') for i in range(categories_count)], batch_size)
+    properties = _create(Property, [
+        Property(name=f'{name} {prefix}'[:30], value=unit) for name, unit, _ in PROPERTIES], batch_size)
+    rows.update(companies=companies_count, categories=categories_count, properties=len(properties))
+    generators = [generate for _, _, generate in PROPERTIES]
+    statuses = [status for status, _ in STATUS_CHOICES]
+    weights = [STATUS_WEIGHTS[status] for status in statuses]
+
+    article = (Product.objects.aggregate(last=Max('article'))['last'] or 0) + 1
+    for start in range(0, products, batch_size):
+        end = min(start + batch_size, products)
+        chunk = []
+        for i in range(start, end):
+            word, brand = rnd.choice(WORDS), rnd.choice(BRANDS)
+            chunk.append(Product(
+                name=f'{word} {brand} {rnd.randint(1, 999)}', description=f'{word} {brand}, модель {i}',
+                article=article + i, quantity=0 if rnd.random() < 0.15 else rnd.randint(1, 500),
+                price=rnd.randint(100, 300000), category=rnd.choice(categories), company=rnd.choice(companies)))
+        chunk = Product.objects.bulk_create(chunk)
+
+        parameters, facets = [], []
+        for product in chunk:
+            for index in rnd.sample(range(len(properties)), min(properties_per_product, len(properties))):
+                value = generators[index](rnd)
+                parameters.append(ProductProperty(product=product, property=properties[index], quantity=value))
+                facets.append(build_facet(product.id, properties[index].id, value))
+        _create(ProductProperty, parameters, batch_size)
+        _create(ProductFacet, facets, batch_size)
+
+        # Заказы порции ссылаются на товары этой же порции
+        orders, order_lines = [], []
+        for _ in range(_share(orders_count, start, end, products)):
+            lines = [(product, rnd.randint(1, 5)) for product in rnd.sample(chunk, min(rnd.randint(1, 5), len(chunk)))]
+            orders.append(Order(user_id=rnd.choice(buyer_ids), status=rnd.choices(statuses, weights)[0],
+                                total_amount=sum(product.price * quantity for product, quantity in lines)))
+            order_lines.append(lines)
+        orders = _create(Order, orders, batch_size)
+        items = _create(OrderItem, [
+            OrderItem(order=order, product=product, quantity=quantity, total_cost=product.price * quantity)
+            for order, lines in zip(orders, order_lines) for product, quantity in lines], batch_size)
+
+        rows.update(products=len(chunk), product_properties=len(parameters), product_facets=len(facets),
+                    orders=len(orders), order_items=len(items))
+        if progress is not None:
+            progress(end)
+
+    summary.refresh_companies(company.id for company in companies)
+    return {**sample(prefix), 'rows': dict(rows)}
+
+
+def sample(prefix):
+    """
+    Примеры id из набора данных, созданного seed(prefix=...), для запросов бенчмарков
+    :param prefix: уникальная часть имен набора
+    :return: словарь с id покупателя, поставщика, товара, заказов и т.д.
+    :raise LookupError: набора с таким prefix нет
+    """
+    companies = Company.objects.filter(name__startswith=f'Поставщик {prefix}-').order_by('id')
+    company = companies.first()
+    orders = list(Order.objects.filter(user__username__startswith=f'bench-{prefix}-')
+                  .order_by('id').values_list('id', 'user_id')[:20])
+    if company is None or not orders:
+        raise LookupError(f'Набор данных {prefix} не найден')
+    user_id = orders[0][1]
+    product = Product.objects.filter(company_id=company.id).order_by('id').first()
+    in_stock = list(Product.objects.filter(company__in=companies, quantity__gt=0)
+                    .order_by('id').values_list('id', flat=True)[:100])
+    return {
+        'prefix': prefix,
+        'user_id': user_id,
+        'contact_id': Contact.objects.filter(user_id=user_id).order_by('id').values_list('id', flat=True).first(),
+        'supplier_id': company.owner_id,
+        'company_id': product.company_id,
+        'category_id': product.category_id,
+        'product_id': product.id,
+        'in_stock_product_ids': in_stock,
+        'order_id': orders[0][0],
+        'order_ids': [order_id for order_id, _ in orders],
+        'property_id': Property.objects.filter(name__endswith=f' {prefix}').order_by('id').values_list(
+            'id', flat=True).first(),
+    }
+
+
+def cleanup(prefix):
+    """
+    Удаляем набор данных, созданный seed(prefix=...), вместе со всеми
+    созданными бенчмарками строками (зарегистрированные пользователи,
+    контакты, заказы)
+    :param prefix: уникальная часть имен набора
+    :return: количество удаленных строк
+    """
+    deleted = 0
+    for queryset in (User.objects.filter(username__startswith=f'bench-{prefix}-'),
+                     Category.objects.filter(name__startswith=f'Категория {prefix}-'),
+                     Property.objects.filter(name__endswith=f' {prefix}')):
+        deleted += queryset.delete()[0]
+    return deleted
@@ -0,0 +1,82 @@
+"""
+Сравнение вывода списков через DRF и через fastpath.
+
+Для каждого сериализатора одна и та же выборка выводится двумя способами:
+ModelSerializer(many=True) + JSONRenderer (как в обычном view) и
+serialize_rows() + FastJSONRenderer. Байты ответа должны совпадать,
+иначе быстрый путь меняет формат API. Время замеряется целиком (SQL,
+сериализация, рендеринг) и отдельно для сериализации и рендеринга по уже
+загруженным данным.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from rest_framework.renderers import JSONRenderer
+
+from ..fastpath import row_plan, serialize_rows
+from ..models import Contact, OrderItem, Product
+from ..renderers import FastJSONRenderer
+from ..serializers import ContactSerializer, OrderItemSerializer, ProductCatalogSerializer, ProductSerializer
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    serializer_class: type
+    queryset: Callable
+
+
+CASES = (
+    Case('products.catalog', ProductCatalogSerializer, lambda limit: Product.objects.order_by('name', 'id')[:limit]),
+    Case('products.detail', ProductSerializer, lambda limit: Product.objects.order_by('id')[:limit]),
+    Case('contacts', ContactSerializer, lambda limit: Contact.objects.order_by('id')[:limit]),
+    Case('order.items', OrderItemSerializer, lambda limit: OrderItem.objects.order_by('id')[:limit]),
+)
+
+
+def _eager(serializer_class, queryset):
+    setup = getattr(serializer_class, 'setup_eager_loading', None)
+    return setup(queryset) if setup else queryset
+
+
+def _best(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def measure(case, limit=500, iterations=20):
+    """
+    Замер одного сериализатора
+    :param case: Case
+    :param limit: строк в выборке
+    :param iterations: повторов (берется лучшее время)
+    :return: словарь: строк, совпадение байтов, время DRF и fastpath в мс (целиком и без SQL)
+    """
+    renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    serializer_class = case.serializer_class
+
+    def drf():
+        queryset = _eager(serializer_class, case.queryset(limit))
+        return renderer.render(serializer_class(queryset, many=True).data)
+
+    def fast():
+        return fast_renderer.render(serialize_rows(serializer_class, case.queryset(limit)))
+
+    expected, actual = drf(), fast()
+    # Уже загруженные данные: объекты моделей для DRF, строки values_list() для fastpath
+    instances = list(_eager(serializer_class, case.queryset(limit)))
+    plan = row_plan(serializer_class)
+    records, maps = plan.fetch(case.queryset(limit))
+    return {
+        'rows': len(records),
+        'identical': expected == actual,
+        'drf_ms': _best(drf, iterations) * 1000,
+        'fast_ms': _best(fast, iterations) * 1000,
+        'drf_cpu_ms': _best(lambda: renderer.render(serializer_class(instances, many=True).data), iterations) * 1000,
+        'fast_cpu_ms': _best(lambda: fast_renderer.render(plan.build(records, maps)), iterations) * 1000,
+    }
@@ -0,0 +1,190 @@
+"""
+Кэш каталога с чтением через кэш (read-through).
+
+Бэкенд задается настройкой CACHES (память процесса для разработки и
+тестов, Redis в production). Инвалидация построена на версиях:
+каждая запись товара хранит версии самого товара, его поставщика,
+категории и справочника характеристик на момент заполнения, а списки
+содержат в ключе общую версию каталога и версии своих областей.
+Увеличение версии делает устаревшими все зависящие от нее записи за
+одну операцию, поэтому массовый импорт поставщика инвалидируется за O(1).
+
+Изменение товара увеличивает версии только этого товара и списков его
+поставщика и категории (и списков без фильтра по ним). Изменение одних
+остатков (оформление и отмена заказа) сбрасывает только карточки:
+страницы списков обновятся по таймауту.
+
+Кэш заполняется чтением с основной базы: данные с отстающей реплики
+остались бы в кэше под уже новой версией до истечения таймаута.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import primary_reads
+
+PREFIX = 'catalog'
+
+# Общая версия каталога: входит в ключи всех списков
+CATALOG = 'all'
+# Справочник характеристик (Property) входит во все карточки товаров
+PROPERTIES = 'properties'
+# Списки товаров без фильтра по поставщику и категории
+PRODUCT_LISTS = 'products'
+# Сводка каталога (CatalogSummary)
+SUMMARY = 'summary'
+
+
+def company_scope(company_id):
+    return f'company:{company_id}'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def _scope_id(value):
+    # "05" и " 5" - тот же id 5, что и при инвалидации; нечисловое значение не фильтрует список
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def product_list_scopes(company_id=None, category_id=None):
+    """
+    Области списков товаров
+    :param company_id: фильтр по поставщику (id или значение параметра запроса)
+    :param category_id: фильтр по категории (id или значение параметра запроса)
+    """
+    company_id, category_id = _scope_id(company_id), _scope_id(category_id)
+    scopes = [f'products:company:{company_id}'] if company_id is not None else []
+    if category_id is not None:
+        scopes.append(f'products:category:{category_id}')
+    return tuple(scopes) or (PRODUCT_LISTS,)
+
+
+class CatalogCache:
+    """
+    Кэш сериализованных данных каталога
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+    def _version_key(self, scope):
+        return f'{PREFIX}:v:{scope}'
+
+    def versions(self, *scopes):
+        """
+        Текущие версии областей каталога.
+        Отсутствующая (вытесненная) версия создается заново из текущего времени,
+        чтобы она не совпала ни с одной ранее выданной версией.
+        """
+        keys = {self._version_key(scope): scope for scope in scopes}
+        found = self.cache.get_many(keys)
+        for key in keys.keys() - found.keys():
+            self.cache.add(key, time.time_ns(), None)
+            found[key] = self.cache.get(key)
+        return tuple(found[key] for key in keys)
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            key = self._version_key(scope)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, time.time_ns(), None)
+
+    def get_product(self, pk, loader):
+        """
+        Карточка товара из кэша или из loader()
+        :param pk: id товара
+        :param loader: функция, возвращающая (данные, id поставщика, id категории)
+        """
+        key = f'{PREFIX}:product:{pk}'
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry['versions'] == self.versions(*entry['scopes']):
+                return entry['data']
+
+        # Изменение товара увеличивает его версию, а изменение поставщика, категории
+        # и характеристик - общую версию каталога. Если они изменились за время
+        # выборки из БД, данные могли устареть и в кэш не кладутся.
+        before = self.versions(CATALOG, product_scope(pk))
+        with primary_reads():
+            data, company_id, category_id = loader()
+        scopes = (product_scope(pk), company_scope(company_id), category_scope(category_id), PROPERTIES)
+        after, *versions = self.versions(CATALOG, *scopes)
+        if before == (after, versions[0]):
+            self.cache.set(key, {'scopes': scopes, 'versions': tuple(versions), 'data': data}, self.timeout)
+        return data
+
+    def get_list(self, name, params, loader, scopes=()):
+        """
+        Список (страница каталога, категории) из кэша или из loader()
+        :param name: название списка
+        :param params: строка, однозначно определяющая содержимое (нормализованные параметры запроса)
+        :param loader: функция, возвращающая данные
+        :param scopes: области, от которых зависит список (кроме общей версии каталога)
+        """
+        digest = hashlib.md5(params.encode()).hexdigest()
+        version = '.'.join(str(value) for value in self.versions(CATALOG, *scopes))
+        key = f'{PREFIX}:list:{name}:{version}:{digest}'
+        data = self.cache.get(key)
+        if data is None:
+            with primary_reads():
+                data = loader()
+            self.cache.set(key, data, self.timeout)
+        return data
+
+    def _on_commit(self, func):
+        # Инвалидация после фиксации транзакции, иначе параллельный запрос
+        # успеет снова положить в кэш старые данные
+        transaction.on_commit(func)
+
+    def invalidate_products(self, product_ids, groups=()):
+        """
+        Сбрасываем карточки товаров и списки их поставщиков и категорий
+        :param product_ids: id товаров
+        :param groups: пары (id категории, id поставщика), списки которых изменились;
+                       пусто, если изменились только остатки (списки обновятся по таймауту)
+        """
+        scopes = [product_scope(pk) for pk in product_ids]
+        for category_id, company_id in groups:
+            scopes.extend(product_list_scopes(company_id=company_id) + product_list_scopes(category_id=category_id))
+        if groups:
+            scopes.append(PRODUCT_LISTS)
+        scopes = list(dict.fromkeys(scopes))
+        self._on_commit(lambda: self.bump(*scopes))
+
+    def invalidate_company(self, company_id):
+        self._on_commit(lambda: self.bump(company_scope(company_id), CATALOG))
+
+    def invalidate_category(self, category_id):
+        self._on_commit(lambda: self.bump(category_scope(category_id), CATALOG))
+
+    def invalidate_properties(self):
+        self._on_commit(lambda: self.bump(PROPERTIES, CATALOG))
+
+    def invalidate_summary(self):
+        # Сводка каталога (после фонового пересчета)
+        self._on_commit(lambda: self.bump(SUMMARY))
+
+
+catalog_cache = CatalogCache()
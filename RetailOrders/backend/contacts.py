@@ -0,0 +1,95 @@
+"""
+Пакетное изменение контактов пользователя.
+
+Создание, изменение и удаление выполняются в одной транзакции: контакты
+из update и delete читаются одним запросом с блокировкой, затем
+bulk_create, bulk_update и один DELETE ... WHERE id IN (...) AND user_id = ...
+Если хотя бы один элемент не прошел проверку (в том числе изменение или
+удаление чужого или несуществующего контакта), ничего не записывается.
+"""
+from django.db import transaction
+
+from .models import Contact
+from .serializers import ContactDataSerializer
+
+
+class ContactBatchError(Exception):
+    """
+    Пакет не применен. results: результаты по элементам с ошибками
+    """
+
+    def __init__(self, results):
+        super().__init__(results)
+        self.results = results
+
+
+def apply_contact_batch(user_id, create=(), update=(), delete=()):
+    """
+    Применяем пакет изменений контактов
+    :param user_id: id владельца контактов
+    :param create: данные новых контактов
+    :param update: изменения контактов, каждый элемент содержит id
+    :param delete: id удаляемых контактов
+    :return: {'create': [...], 'update': [...], 'delete': [...]} - результат по каждому элементу
+    """
+    results = {'create': [], 'update': [], 'delete': []}
+    failed = False
+
+    with transaction.atomic():
+        update_ids = {item.get('id') for item in update}
+        owned = Contact.objects.select_for_update().filter(
+            user_id=user_id, id__in=[pk for pk in update_ids | set(delete) if isinstance(pk, int)]
+        ).in_bulk()
+
+        created = []
+        for index, item in enumerate(create):
+            serializer = ContactDataSerializer(data=item)
+            if serializer.is_valid():
+                created.append(Contact(user_id=user_id, **serializer.validated_data))
+                results['create'].append({'index': index})
+            else:
+                failed = True
+                results['create'].append({'index': index, 'errors': serializer.errors})
+
+        changed, fields = [], set()
+        for index, item in enumerate(update):
+            contact = owned.get(item.get('id'))
+            if contact is None:
+                failed = True
+                results['update'].append({'index': index, 'id': item.get('id'), 'errors': 'Контакт не найден'})
+                continue
+            if contact.id in delete:
+                failed = True
+                results['update'].append({'index': index, 'id': contact.id, 'errors': 'Контакт также удаляется'})
+                continue
+            serializer = ContactDataSerializer(contact, data=item, partial=True)
+            if not serializer.is_valid():
+                failed = True
+                results['update'].append({'index': index, 'id': contact.id, 'errors': serializer.errors})
+                continue
+            for attr, value in serializer.validated_data.items():
+                setattr(contact, attr, value)
+            fields.update(serializer.validated_data)
+            changed.append(contact)
+            results['update'].append({'index': index, 'id': contact.id, 'status': 'updated'})
+
+        for pk in dict.fromkeys(delete):
+            if pk in owned:
+                results['delete'].append({'id': pk, 'status': 'deleted'})
+            else:
+                failed = True
+                results['delete'].append({'id': pk, 'errors': 'Контакт не найден'})
+
+        if failed:
+            raise ContactBatchError({key: [item for item in items if 'errors' in item]
+                                     for key, items in results.items()})
+
+        Contact.objects.bulk_create(created)
+        for result, contact in zip(results['create'], created):
+            result.update(id=contact.id, status='created')
+        if changed and fields:
+            Contact.objects.bulk_update(changed, sorted(fields))
+
+        if delete:
+            Contact.objects.filter(id__in=set(delete), user_id=user_id).delete()
+    return results
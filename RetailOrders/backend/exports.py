@@ -0,0 +1,278 @@
+"""
+Потоковая выгрузка каталога поставщика и истории заказов (JSON Lines, CSV).
+
+Строки читаются через values_list().iterator(chunk_size): в PostgreSQL это
+серверный курсор, в остальных СУБД - выборка пачками из одного курсора,
+поэтому в памяти одновременно находится не больше одной пачки строк,
+независимо от размера выгрузки.
+
+Вывод собирается в блоки по BLOCK_SIZE байт (первая строка отдается сразу)
+и возвращается генератором для StreamingHttpResponse или записи в файл.
+При сжатии блоки проходят через zlib в формате gzip со сбросом после
+каждого блока (Z_SYNC_FLUSH), чтобы клиент получал данные по мере
+выгрузки, а не после ее окончания.
+
+Каталог и история заказов читаются с базы, которую выбирает маршрутизатор
+(backend.routers): с реплики, но с основной базы в липком окне после записи
+пользователя.
+
+Каталог выгружается в формате прайс-листа (см. importer): файл можно
+загрузить обратно импортом. Характеристики товаров в CSV - отдельные
+колонки "Название (единица)", их список выбирается заранее одним запросом.
+"""
+import csv
+import json
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import router
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import STATUS_CHOICES, OrderItem, Product, ProductProperty, Property
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Колонки товара совпадают с колонками CSV прайс-листа (importer.CSV_COLUMNS)
+PRODUCT_COLUMNS = ('article', 'name', 'description', 'category', 'price', 'quantity')
+
+# Одна строка выгрузки - одна строка заказа
+ORDER_COLUMNS = ('order_id', 'created_at', 'status', 'buyer_id', 'item_id', 'product_id', 'article', 'product',
+                 'company_id', 'quantity', 'total_cost', 'order_total')
+
+# Размер блока вывода, байт
+BLOCK_SIZE = 64 * 1024
+
+# CSV открывается в Excel с правильной кодировкой, импорт прайс-листа читает utf-8-sig
+CSV_BOM = b'\xef\xbb\xbf'
+
+
+class ExportError(ValueError):
+    """
+    Некорректные параметры выгрузки
+    """
+
+
+def property_column(name, unit):
+    """
+    Колонка характеристики, обратная importer.split_property
+    :return: "Диагональ (дюйм)" или "Цвет" без единицы измерения
+    """
+    return f'{name} ({unit})' if unit else name
+
+
+def _chunks(iterator, size):
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def product_columns(company, using=None):
+    """
+    Колонки CSV каталога: поля товара и все характеристики товаров поставщика
+    :param company: компания-поставщик
+    :param using: псевдоним базы (по умолчанию выбирает маршрутизатор)
+    """
+    properties = (Property.objects.using(using)
+                  .filter(properties__product__company=company)
+                  .order_by('name', 'value').distinct().values_list('name', 'value'))
+    return PRODUCT_COLUMNS + tuple(dict.fromkeys(property_column(name, unit) for name, unit in properties))
+
+
+def product_rows(company, chunk_size=None, using=None):
+    """
+    Товары поставщика в формате прайс-листа
+    :param company: компания-поставщик
+    :param chunk_size: строк в одной выборке из курсора (по умолчанию EXPORT_CHUNK_SIZE)
+    :param using: псевдоним базы (по умолчанию выбирает маршрутизатор)
+    :return: итератор словарей с полями PRODUCT_COLUMNS и parameters
+    """
+    # База выбирается при вызове: строки читаются при отдаче потокового ответа,
+    # когда состояние маршрутизации запроса (липкое окно) уже сброшено
+    return _product_rows(company, chunk_size or settings.EXPORT_CHUNK_SIZE, using or router.db_for_read(Product))
+
+
+def _product_rows(company, chunk_size, using):
+    products = (Product.objects.using(using).filter(company=company).order_by('id')
+                .values_list('id', 'article', 'name', 'description', 'category__name', 'price', 'quantity')
+                .iterator(chunk_size=chunk_size))
+    for chunk in _chunks(products, chunk_size):
+        # Характеристики загружаются на пачку товаров, а не на каждый товар
+        parameters = defaultdict(dict)
+        values = (ProductProperty.objects.using(using).filter(product_id__in=[row[0] for row in chunk])
+                  .values_list('product_id', 'property__name', 'property__value', 'quantity'))
+        for product_id, name, unit, value in values:
+            parameters[product_id][property_column(name, unit)] = value
+        for product_id, *row in chunk:
+            yield {**dict(zip(PRODUCT_COLUMNS, row)), 'parameters': parameters.get(product_id, {})}
+
+
+def order_items(user=None):
+    """
+    Строки заказов, доступные пользователю
+    :param user: сотрудник - все заказы, поставщик - строки с его товарами,
+                 покупатель - его заказы; None - все заказы (команды)
+    """
+    items = OrderItem.objects.all()
+    if user is None or user.is_staff:
+        return items
+    if user.role == 'supplier':
+        return items.filter(product__company__owner_id=user.id)
+    return items.filter(order__user_id=user.id)
+
+
+def filter_order_items(items, params):
+    """
+    Фильтры истории заказов
+    :param items: queryset строк заказов
+    :param params: словарь с необязательными date_from, date_to (YYYY-MM-DD, включительно) и status
+    :raise ExportError: некорректное значение фильтра
+    """
+    bounds = {}
+    for name in ('date_from', 'date_to'):
+        if params.get(name):
+            try:
+                bounds[name] = parse_date(params[name])
+            except ValueError:
+                bounds[name] = None
+            if bounds[name] is None:
+                raise ExportError(f'{name}: дата должна быть в формате YYYY-MM-DD')
+    # Границы дня в текущем часовом поясе: условие по created_at, а не по created_at::date, использует индексы
+    if 'date_from' in bounds:
+        items = items.filter(order__created_at__gte=_day_start(bounds['date_from']))
+    if 'date_to' in bounds:
+        items = items.filter(order__created_at__lt=_day_start(bounds['date_to'] + timedelta(days=1)))
+    if params.get('status'):
+        if params['status'] not in dict(STATUS_CHOICES):
+            raise ExportError(f'Неизвестный статус: {params["status"]}')
+        items = items.filter(order__status=params['status'])
+    return items
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def order_rows(items, chunk_size=None, using=None):
+    """
+    История заказов
+    :param items: queryset строк заказов (см. order_items, filter_order_items)
+    :param chunk_size: строк в одной выборке из курсора (по умолчанию EXPORT_CHUNK_SIZE)
+    :param using: псевдоним базы (по умолчанию выбирает маршрутизатор, как для отчетов)
+    :return: итератор словарей с полями ORDER_COLUMNS
+    """
+    # База выбирается при вызове, как в product_rows
+    return _order_rows(items.using(using or router.db_for_read(OrderItem, report=True)),
+                       chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def _order_rows(items, chunk_size):
+    rows = (items.order_by('id')
+            .values_list('order_id', 'order__created_at', 'order__status', 'order__user_id', 'id', 'product_id',
+                         'product__article', 'product__name', 'product__company_id', 'quantity', 'total_cost',
+                         'order__total_amount')
+            .iterator(chunk_size=chunk_size))
+    for row in rows:
+        yield dict(zip(ORDER_COLUMNS, row))
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def _jsonl(rows):
+    if orjson is not None:
+        for row in rows:
+            yield orjson.dumps(row, default=_plain, option=orjson.OPT_APPEND_NEWLINE)
+        return
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=_plain) + '\n').encode()
+
+
+class _Echo:
+    """
+    Файл для csv.writer, который возвращает записанную строку
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield CSV_BOM + writer.writerow(columns).encode()
+    for row in rows:
+        parameters = row.get('parameters') or {}
+        values = [row[column] if column in row else parameters.get(column) for column in columns]
+        yield writer.writerow([value if isinstance(value, (str, int)) or value is None else _plain(value)
+                               for value in values]).encode()
+
+
+def _blocks(chunks, block_size):
+    chunks = iter(chunks)
+    # Первая строка (заголовок CSV) отдается сразу, не дожидаясь заполнения блока
+    first = next(chunks, None)
+    if first is None:
+        return
+    yield first
+    block, size = [], 0
+    for chunk in chunks:
+        block.append(chunk)
+        size += len(chunk)
+        if size >= block_size:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def stream(rows, export_format, columns=None, compress=False, block_size=BLOCK_SIZE):
+    """
+    Байты выгрузки
+    :param rows: итератор словарей (product_rows, order_rows)
+    :param export_format: один из EXPORT_FORMATS
+    :param columns: колонки CSV (для jsonl не используются)
+    :param compress: сжимать в gzip
+    :param block_size: размер блока вывода, байт
+    :return: генератор блоков bytes
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'Неизвестный формат: {export_format}')
+    chunks = _csv(rows, columns) if export_format == 'csv' else _jsonl(rows)
+    blocks = _blocks(chunks, block_size)
+    if not compress:
+        return blocks
+    return _gzip(blocks)
+
+
+def _gzip(blocks):
+    # wbits=31: поток в формате gzip (заголовок и контрольная сумма)
+    compressor = zlib.compressobj(wbits=31)
+    for block in blocks:
+        yield compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def filename(name, export_format, compress=False):
+    return f'{name}.{export_format}{".gz" if compress else ""}'
+
+
+def content_type(export_format, compress=False):
+    return 'application/gzip' if compress else CONTENT_TYPES[export_format]
@@ -0,0 +1,127 @@
+"""
+Фасетный поиск по характеристикам товаров.
+
+Значения ProductProperty копируются в ProductFacet с разбором числа
+(``number``), для которого есть индекс по (property, number). Отбор
+товаров по нескольким характеристикам выполняется одним запросом
+GROUP BY product HAVING COUNT(DISTINCT property) = N вместо отдельного
+соединения на каждую характеристику.
+
+Фасет товара поддерживается в актуальном состоянии только для изменений
+через модель: сохранение ProductProperty (signals.save_product_facet),
+ProductProperty.delete() и каскадное удаление товара или характеристики.
+QuerySet.update(), QuerySet.delete() и bulk_create() сигналов не вызывают,
+поэтому код, изменяющий характеристики такими запросами (импорт
+прайс-листа), обязан вызвать sync_facets() для затронутых товаров в той же
+транзакции.
+"""
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, F, Q
+
+from .models import ProductFacet, ProductProperty
+
+# Максимальное количество пар (характеристика, значение) в ответе с фасетами
+MAX_FACET_VALUES = 1000
+
+NUMBER_FIELD = ProductFacet._meta.get_field('number')
+
+
+class FacetError(ValueError):
+    """
+    Некорректное условие фильтра по характеристике.
+    """
+
+
+def parse_number(value):
+    """
+    Числовое значение характеристики: "6.5", "6,5", "512"
+    :return: Decimal или None, если значение не число
+    """
+    try:
+        number = Decimal(str(value).strip().replace(',', '.'))
+        if not number.is_finite():
+            return None
+        number = number.quantize(Decimal(1).scaleb(-NUMBER_FIELD.decimal_places))
+    except InvalidOperation:
+        return None
+    if len(number.as_tuple().digits) > NUMBER_FIELD.max_digits:
+        return None
+    return number
+
+
+def build_facet(product_id, property_id, value):
+    return ProductFacet(product_id=product_id, property_id=property_id, value=value, number=parse_number(value))
+
+
+def sync_facets(product_ids):
+    """
+    Перестраиваем фасеты товаров по их характеристикам
+    :param product_ids: id товаров
+    """
+    product_ids = list(product_ids)
+    ProductFacet.objects.filter(product_id__in=product_ids).delete()
+    ProductFacet.objects.bulk_create(
+        build_facet(product_id, property_id, value) for product_id, property_id, value in
+        ProductProperty.objects.filter(product_id__in=product_ids).values_list('product_id', 'property_id', 'quantity')
+    )
+
+
+def parse_filter(item):
+    """
+    Условие фильтра по характеристике
+    :param item: "<id характеристики>:<значение>" или "<id характеристики>:<от>..<до>"
+    :return: (id характеристики, Q для ProductFacet)
+    """
+    try:
+        property_id, value = item.split(':', 1)
+        property_id = int(property_id)
+    except ValueError:
+        raise FacetError(f'Некорректный фильтр: {item}')
+    if '..' not in value:
+        return property_id, Q(property_id=property_id, value=value)
+
+    condition = Q(property_id=property_id, number__isnull=False)
+    for bound, lookup in zip(value.split('..', 1), ('number__gte', 'number__lte')):
+        if bound:
+            number = parse_number(bound)
+            if number is None:
+                raise FacetError(f'Некорректный диапазон: {item}')
+            condition &= Q(**{lookup: number})
+    return property_id, condition
+
+
+def matching_products(items):
+    """
+    Подзапрос id товаров, удовлетворяющих всем фильтрам по характеристикам.
+    Несколько условий для одной характеристики объединяются через ИЛИ.
+    :param items: список строк фильтров (см. parse_filter)
+    :return: queryset с единственным полем product_id
+    """
+    filters = [parse_filter(item) for item in items]
+    properties = {property_id for property_id, _ in filters}
+    return (ProductFacet.objects.filter(reduce(or_, (condition for _, condition in filters)))
+            .values('product_id')
+            .annotate(matched=Count('property_id', distinct=True))
+            .filter(matched=len(properties))
+            .values('product_id'))
+
+
+def facet_counts(products):
+    """
+    Количество товаров для каждого значения каждой характеристики
+    :param products: queryset отобранных товаров
+    :return: список характеристик со значениями и количеством товаров
+    """
+    rows = (ProductFacet.objects.filter(product__in=products.order_by().values('id'))
+            .values('property_id', 'value')
+            .annotate(name=F('property__name'), unit=F('property__value'), count=Count('product_id'))
+            .order_by('property_id', '-count', 'value')[:MAX_FACET_VALUES])
+    facets = {}
+    for row in rows:
+        facet = facets.setdefault(row['property_id'], {
+            'property': row['property_id'], 'name': row['name'], 'unit': row['unit'], 'values': []})
+        facet['values'].append({'value': row['value'], 'count': row['count']})
+    return list(facets.values())
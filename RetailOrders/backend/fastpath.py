@@ -0,0 +1,197 @@
+"""
+Быстрый вывод списков только для чтения без создания моделей и полей DRF.
+
+По классу ModelSerializer один раз строится план: какие столбцы выбрать
+через values_list() и функция, собирающая из строки результата тот же
+словарь, что вернул бы сериализатор (те же ключи в том же порядке и те
+же значения). Функция генерируется как исходный код Python, поэтому на
+строку выполняется одно выражение без циклов по полям.
+
+Поддерживаются простые поля модели (в том числе source='relation.field'),
+вложенные сериализаторы по ForeignKey и списки по обратной связи
+(many=True). Для остальных полей (SerializerMethodField, source='*',
+ManyToMany) план не строится - FastPathUnsupported при первом обращении.
+"""
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from .serializers import _get_relation
+
+# Поля, у которых значение из базы совпадает с to_representation
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+IDENTITY_MODEL_FIELDS = ('CharField', 'TextField', 'EmailField', 'URLField', 'SlugField', 'IntegerField',
+                         'PositiveIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField',
+                         'SmallIntegerField', 'BigIntegerField', 'AutoField', 'BigAutoField', 'SmallAutoField',
+                         'BooleanField')
+
+
+class FastPathUnsupported(Exception):
+    """
+    Сериализатор содержит поле, которое нельзя вывести из values_list()
+    """
+
+
+class _Nested:
+    """
+    Вложенный список (many=True) по обратной связи
+    """
+
+    def __init__(self, key_index, model, fk, plan):
+        self.key_index = key_index
+        self.model = model
+        self.fk = fk
+        self.plan = plan
+
+
+class RowPlan:
+    """
+    План вывода сериализатора: столбцы values_list() и функция строки
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.columns = []
+        self.nested = []
+        self._converters = []
+        expression = self._compile(serializer_class(), self.model, '')
+        namespace = {f'c{index}': converter for index, converter in enumerate(self._converters)}
+        exec(f'def row(r, m):\n    return {expression}\n', namespace)
+        self.row = namespace['row']
+
+    def _column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def _convert(self, field, model_field, index):
+        value = f'r[{index}]'
+        if isinstance(field, IDENTITY_FIELDS) and model_field is not None \
+                and model_field.get_internal_type() in IDENTITY_MODEL_FIELDS:
+            return value
+        self._converters.append(field.to_representation)
+        return f'(None if {value} is None else c{len(self._converters) - 1}({value}))'
+
+    def _compile(self, serializer, model, prefix):
+        items = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+                raise FastPathUnsupported(f'{type(serializer).__name__}.{name}')
+            items.append(f'{name!r}: {self._compile_field(field, model, prefix)}')
+        return '{' + ', '.join(items) + '}'
+
+    def _compile_field(self, field, model, prefix):
+        attrs = field.source_attrs
+        if isinstance(field, serializers.ListSerializer):
+            if not isinstance(field.child, serializers.ModelSerializer) or len(attrs) != 1:
+                raise FastPathUnsupported(field.field_name)
+            try:
+                relation = _get_relation(model, attrs[0])
+            except FieldDoesNotExist:
+                raise FastPathUnsupported(field.field_name)
+            if not relation.one_to_many:
+                raise FastPathUnsupported(field.field_name)
+            key_index = self._column(f'{prefix}pk')
+            self.nested.append(_Nested(key_index, relation.related_model, relation.field.name,
+                                       RowPlan(type(field.child))))
+            return f'm[{len(self.nested) - 1}].get(r[{key_index}], [])'
+
+        if isinstance(field, serializers.ModelSerializer):
+            try:
+                relation = _get_relation(model, attrs[0]) if len(attrs) == 1 else None
+            except FieldDoesNotExist:
+                relation = None
+            if relation is None or not (relation.many_to_one or relation.one_to_one) or relation.auto_created:
+                raise FastPathUnsupported(field.field_name)
+            # Значение внешнего ключа показывает, есть ли связанный объект
+            key_index = self._column(f'{prefix}{attrs[0]}')
+            nested = self._compile(field, relation.related_model, f'{prefix}{attrs[0]}__')
+            return f'(None if r[{key_index}] is None else {nested})'
+
+        if isinstance(field, serializers.RelatedField) or not attrs:
+            raise FastPathUnsupported(field.field_name)
+        current, model_field = model, None
+        for attr in attrs:
+            try:
+                model_field = _get_relation(current, attr)
+            except FieldDoesNotExist:
+                # Свойство или метод модели
+                raise FastPathUnsupported(field.field_name)
+            if model_field.is_relation and attr != attrs[-1]:
+                current = model_field.related_model
+        return self._convert(field, model_field, self._column(prefix + '__'.join(attrs)))
+
+    def rows(self, queryset, key=None):
+        """
+        Выбираем строки и собираем словари
+        :param queryset: queryset модели сериализатора (select_related/prefetch_related не нужны)
+        :param key: поле, значение которого возвращается вместе со словарем (для вложенных списков)
+        :return: список словарей или пар (key, словарь)
+        """
+        return self.build(*self.fetch(queryset, key), key)
+
+    def fetch(self, queryset, key=None):
+        """
+        Только запросы к базе: строки values_list() и вложенные списки
+        :return: (строки, вложенные списки по ключу родителя) для build()
+        """
+        records = list(self._values(queryset, key))
+        maps = [_group(nested.plan.rows(children, key=nested.fk) if children is not None else ())
+                for nested, children in self._children(records)]
+        return records, maps
+
+    async def arows(self, queryset, key=None):
+        """
+        rows() для async view
+        """
+        records = [record async for record in self._values(queryset, key)]
+        maps = [_group(await nested.plan.arows(children, key=nested.fk) if children is not None else ())
+                for nested, children in self._children(records)]
+        return self.build(records, maps, key)
+
+    def _values(self, queryset, key):
+        columns = self.columns + [key] if key else self.columns
+        return queryset.select_related(None).prefetch_related(None).values_list(*columns)
+
+    def _children(self, records):
+        for nested in self.nested:
+            keys = {record[nested.key_index] for record in records} - {None}
+            # Тот же запрос, что выполняет prefetch_related, и тот же порядок строк
+            yield nested, nested.model._default_manager.filter(**{f'{nested.fk}__in': keys}) if keys else None
+
+    def build(self, records, maps, key=None):
+        """
+        Собираем словари из результата fetch() без обращений к базе
+        """
+        row = self.row
+        if key:
+            return [(record[-1], row(record, maps)) for record in records]
+        return [row(record, maps) for record in records]
+
+
+def _group(pairs):
+    grouped = defaultdict(list)
+    for parent, data in pairs:
+        grouped[parent].append(data)
+    return grouped
+
+
+@lru_cache(maxsize=None)
+def row_plan(serializer_class):
+    """
+    План вывода сериализатора (строится один раз на класс)
+    :raise FastPathUnsupported: сериализатор нельзя вывести через values_list()
+    """
+    return RowPlan(serializer_class)
+
+
+def serialize_rows(serializer_class, queryset):
+    """
+    То же, что serializer_class(queryset, many=True).data, без создания моделей
+    """
+    return row_plan(serializer_class).rows(queryset)
@@ -0,0 +1,32 @@
+from .facets import matching_products
+
+# Параметр запроса -> условие фильтрации товаров
+PRODUCT_FILTERS = (
+    ('category', 'category_id'),
+    ('company', 'company_id'),
+    ('price_min', 'price__gte'),
+    ('price_max', 'price__lte'),
+)
+
+# Все параметры запроса, от которых зависит выборка
+PRODUCT_PARAMS = tuple(param for param, lookup in PRODUCT_FILTERS) + ('in_stock', 'property')
+
+
+def filter_products(queryset, params):
+    """
+    Фильтрация товаров каталога по параметрам запроса
+    :param queryset: товары
+    :param params: category, company, price_min, price_max, in_stock (1/true) и повторяющийся property
+                   ("<id характеристики>:<значение>" или "<id характеристики>:<от>..<до>")
+    :return: отфильтрованный queryset
+    :raise ValueError: некорректное значение параметра
+    """
+    for param, lookup in PRODUCT_FILTERS:
+        if param in params:
+            queryset = queryset.filter(**{lookup: int(params[param])})
+    if params.get('in_stock') in ('1', 'true'):
+        queryset = queryset.filter(quantity__gt=0)
+    properties = params.getlist('property')
+    if properties:
+        queryset = queryset.filter(id__in=matching_products(properties))
+    return queryset
@@ -0,0 +1,147 @@
+"""
+Хеширование паролей вне потока обработки запроса.
+
+Хеширование и проверка пароля выполняются в пуле процессов
+(PASSWORD_HASH_WORKERS, 0 - в текущем процессе), количество одновременных
+операций в процессе ограничено PASSWORD_HASH_CONCURRENCY: при всплеске
+входов запросы ждут не дольше PASSWORD_HASH_TIMEOUT секунд и получают
+503, а не занимают все воркеры. Стоимость хеша задается
+PASSWORD_HASH_ITERATIONS; хеши с другим количеством итераций
+пересчитываются при следующем успешном входе.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ConfigurablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 с количеством итераций из настроек окружения.
+    Алгоритм тот же, поэтому существующие хеши проверяются без миграции.
+    """
+
+    def __init__(self):
+        self.iterations = settings.PASSWORD_HASH_ITERATIONS or hashers.PBKDF2PasswordHasher.iterations
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис временно перегружен, повторите попытку позже'
+    default_code = 'password_hashing_busy'
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, initializer=_init_worker)
+        return _pool
+
+
+def _get_slots():
+    global _slots
+    with _pool_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY)
+        return _slots
+
+
+def _reset_pool(pool):
+    """
+    Убираем сломанный пул: следующий вызов создаст новый
+    :param pool: пул, в котором процесс завершился аварийно
+    """
+    global _pool
+    with _pool_lock:
+        # Пул мог уже пересоздать другой поток
+        if _pool is pool:
+            _pool = None
+    # Ожидающие задачи сломанного пула не выполнятся, оставшиеся процессы завершаются без ожидания
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _hash(password):
+    return hashers.make_password(password)
+
+
+def _verify(password, encoded):
+    # Пересчет хеша выполняется в вызывающем процессе, здесь только признак
+    must_update = []
+    valid = hashers.check_password(password, encoded, setter=lambda raw: must_update.append(True))
+    return valid, bool(must_update)
+
+
+def _run(func, *args):
+    slots = _get_slots()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashingBusy()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return func(*args)
+        pool = _get_pool()
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            # Процесс пула завершился аварийно: пересоздаем пул при следующем вызове
+            _reset_pool(pool)
+            return func(*args)
+    finally:
+        slots.release()
+
+
+def make_password(password):
+    """
+    Хеш пароля для сохранения в User.password
+    :param password: пароль в открытом виде (None - непригодный пароль)
+    """
+    if password is None:
+        return hashers.make_password(None)
+    return _run(_hash, password)
+
+
+def check_password(password, encoded, setter=None):
+    """
+    Проверка пароля, аналог django.contrib.auth.hashers.check_password
+    :param password: пароль в открытом виде
+    :param encoded: сохраненный хеш
+    :param setter: вызывается с паролем, если хеш нужно пересчитать
+    :return: True, если пароль верный
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    valid, must_update = _run(_verify, password, encoded)
+    if valid and must_update and setter:
+        setter(password)
+    return valid
+
+
+async def amake_password(password):
+    return await sync_to_async(make_password, thread_sensitive=False)(password)
+
+
+async def acheck_password(password, encoded, setter=None):
+    """
+    Асинхронная проверка пароля
+    :param setter: корутина, вызывается с паролем, если хеш нужно пересчитать
+    """
+    must_update = []
+    valid = await sync_to_async(check_password, thread_sensitive=False)(password, encoded, must_update.append)
+    if must_update and setter:
+        await setter(password)
+    return valid
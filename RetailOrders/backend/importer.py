@@ -0,0 +1,435 @@
+"""
+Потоковый импорт прайс-листов поставщиков.
+
+Файл читается построчно (YAML, CSV или JSON Lines), товары накапливаются
+пачками по ``batch_size`` строк и записываются upsert-запросами
+``bulk_create(update_conflicts=True)``: товары по ``Product.article``,
+характеристики товаров по ограничению ``unique_product_parameter``.
+Категории и характеристики разрешаются через словари в памяти, поэтому
+расход памяти зависит от размера пачки и справочников, а не от размера файла.
+
+В инкрементальном режиме записываются только товары, у которых изменился
+отпечаток строки (``Product.fingerprint``), а товары поставщика, исчезнувшие
+из прайс-листа, удаляются.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+
+import yaml
+from django.db import transaction
+
+from . import facets
+from .cache import catalog_cache
+from .models import Category, OrderItem, Product, ProductProperty, Property
+from .tasks import refresh_company_summary_later
+
+FORMATS = ('yaml', 'csv', 'jsonl')
+
+EXTENSIONS = {
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+# Колонки CSV, которые описывают сам товар. Остальные колонки считаются характеристиками.
+CSV_COLUMNS = ('id', 'article', 'name', 'model', 'description', 'category', 'price', 'quantity')
+
+# Максимальное количество сообщений об ошибках в отчете об импорте
+MAX_REPORTED_ERRORS = 100
+
+# "Диагональ (дюйм)" -> ("Диагональ", "дюйм")
+PROPERTY_UNIT_RE = re.compile(r'^(?P<name>.*?)\s*\((?P<unit>[^()]*)\)$')
+
+
+class PriceListError(ValueError):
+    """
+    Ошибка в структуре файла или в отдельной строке прайс-листа.
+    """
+
+
+def detect_format(filename):
+    """
+    Определяем формат прайс-листа по расширению файла
+    :param filename: имя файла
+    :return: один из FORMATS
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension not in EXTENSIONS:
+        raise PriceListError(f'Неизвестный формат файла: {filename}')
+    return EXTENSIONS[extension]
+
+
+def _text_stream(stream):
+    """
+    CSV и JSON Lines читаются как текст, загруженные файлы приходят в бинарном виде.
+    """
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def _yaml_categories(value):
+    """
+    Словарь id -> название из списка ``categories``
+    """
+    if value is None:
+        return {}
+    if not isinstance(value, list):
+        raise PriceListError('categories должен быть списком')
+    categories = {}
+    for category in value:
+        if (not isinstance(category, dict) or not isinstance(category.get('id'), int)
+                or not str(category.get('name') or '').strip()):
+            raise PriceListError(f'categories: у категории должны быть целый id и название ({category!r})')
+        categories[category['id']] = category['name']
+    return categories
+
+
+def _iter_yaml(stream):
+    """
+    Читаем YAML по событиям парсера и собираем в объекты только отдельные
+    элементы списка ``goods``, не загружая документ целиком.
+
+    Товары ссылаются на категории по id из списка ``categories``, поэтому
+    он должен идти в файле перед ``goods``: иначе товары пришлось бы
+    держать в памяти до конца файла. Id, которого нет в ``categories``, не
+    превращается в название категории: такая строка попадает в ошибки импорта.
+    """
+    loader = yaml.SafeLoader(stream)
+    categories = None
+    try:
+        loader.get_event()  # StreamStartEvent
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()  # DocumentStartEvent
+        if not loader.check_event(yaml.MappingStartEvent):
+            raise PriceListError('Прайс-лист должен быть словарем с ключами shop, categories, goods')
+        loader.get_event()
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.construct_document(loader.compose_node(None, None))
+            if key == 'goods' and loader.check_event(yaml.SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    item = loader.construct_document(loader.compose_node(None, None))
+                    if isinstance(item, dict) and isinstance(item.get('category'), int):
+                        if categories is None:
+                            raise PriceListError('Список categories должен идти в файле перед goods')
+                        item['category'] = categories.get(item['category'])
+                    yield item
+                loader.get_event()
+            else:
+                value = loader.construct_document(loader.compose_node(None, None))
+                if key == 'categories':
+                    categories = _yaml_categories(value)
+    except yaml.YAMLError as error:
+        raise PriceListError(f'Ошибка разбора YAML: {error}')
+    finally:
+        loader.dispose()
+
+
+def _iter_csv(stream):
+    text = _text_stream(stream)
+    sample = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    header = next(csv.reader([sample], dialect))
+    for record in csv.DictReader(text, fieldnames=header, dialect=dialect):
+        item = {key: value for key, value in record.items() if key in CSV_COLUMNS}
+        item['parameters'] = {
+            key: value for key, value in record.items()
+            if key not in CSV_COLUMNS and key is not None and value not in (None, '')
+        }
+        yield item
+
+
+def _iter_jsonl(stream):
+    for line_number, line in enumerate(_text_stream(stream), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise PriceListError(f'Строка {line_number}: некорректный JSON ({error.msg})')
+
+
+READERS = {
+    'yaml': _iter_yaml,
+    'csv': _iter_csv,
+    'jsonl': _iter_jsonl,
+}
+
+
+def read_price_list(stream, file_format):
+    """
+    Генератор исходных записей прайс-листа
+    :param stream: файловый объект (бинарный или текстовый)
+    :param file_format: один из FORMATS
+    :return: итератор словарей с полями товара
+    """
+    if file_format not in READERS:
+        raise PriceListError(f'Неизвестный формат: {file_format}')
+    return READERS[file_format](stream)
+
+
+def split_property(name):
+    """
+    Разделяем название характеристики и единицу измерения
+    :param name: "Диагональ (дюйм)"
+    :return: ("Диагональ", "дюйм")
+    """
+    name = str(name).strip()
+    match = PROPERTY_UNIT_RE.match(name)
+    if match and match.group('name'):
+        return match.group('name'), match.group('unit').strip()
+    return name, ''
+
+
+def _check_length(model, field_name, value):
+    max_length = model._meta.get_field(field_name).max_length
+    if len(value) > max_length:
+        raise PriceListError(f'{field_name}: длина больше {max_length} символов')
+    return value
+
+
+def row_fingerprint(row):
+    """
+    Отпечаток нормализованной строки прайс-листа
+    :param row: словарь из normalize_row
+    :return: sha1 в шестнадцатеричном виде
+    """
+    payload = [row['name'], row['description'], row['category'], row['price'], row['quantity'],
+               sorted([name, unit, value] for (name, unit), value in row['parameters'].items())]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+def normalize_row(item):
+    """
+    Проверяем и приводим к единому виду запись прайс-листа
+    :param item: словарь из read_price_list
+    :return: словарь с полями article, name, description, category, price, quantity, parameters, fingerprint
+    """
+    if not isinstance(item, dict):
+        raise PriceListError('запись товара должна быть словарем')
+    article = item.get('article', item.get('id'))
+    try:
+        article = int(article)
+        price = int(item.get('price'))
+        quantity = int(item.get('quantity'))
+    except (TypeError, ValueError):
+        raise PriceListError(f'article={article}: артикул, цена и количество должны быть целыми числами')
+    if article < 0 or price < 0 or quantity < 0:
+        raise PriceListError(f'article={article}: отрицательные значения недопустимы')
+    name = str(item.get('name') or '').strip()
+    category = str(item.get('category') or '').strip()
+    if not name or not category:
+        raise PriceListError(f'article={article}: не указано название или категория')
+    description = str(item.get('description') or item.get('model') or '').strip()
+
+    parameters = {}
+    for key, value in (item.get('parameters') or {}).items():
+        property_name, unit = split_property(key)
+        parameters[(_check_length(Property, 'name', property_name),
+                    _check_length(Property, 'value', unit))] = _check_length(
+            ProductProperty, 'quantity', str(value))
+
+    row = {
+        'article': article,
+        'name': _check_length(Product, 'name', name),
+        'description': _check_length(Product, 'description', description),
+        'category': _check_length(Category, 'name', category),
+        'price': price,
+        'quantity': quantity,
+        'parameters': parameters,
+    }
+    row['fingerprint'] = row_fingerprint(row)
+    return row
+
+
+class PriceListImporter:
+    """
+    Импорт прайс-листа одного поставщика пачками upsert-запросов.
+    В режиме incremental прайс-лист считается полным: неизменившиеся товары
+    не записываются, а отсутствующие в нем товары поставщика удаляются.
+    """
+    product_update_fields = ('name', 'description', 'quantity', 'price', 'category', 'company', 'fingerprint')
+
+    def __init__(self, company, batch_size=1000, incremental=False):
+        self.company = company
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self._categories = None
+        self._linked_categories = None
+        self._properties = None
+        # Артикулы, встретившиеся в прайс-листе (только в инкрементальном режиме)
+        self._seen = set()
+        self.report = {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0,
+                       'deleted': 0, 'skipped': 0, 'errors': []}
+
+    def _error(self, message):
+        self.report['skipped'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append(str(message))
+
+    def run(self, items):
+        """
+        Импортируем записи прайс-листа
+        :param items: итератор словарей (см. read_price_list)
+        :return: отчет об импорте
+        """
+        batch = {}
+        for item in items:
+            self.report['processed'] += 1
+            try:
+                row = normalize_row(item)
+            except PriceListError as error:
+                self._error(error)
+                self._remember_invalid(item)
+                continue
+            if self.incremental:
+                self._seen.add(row['article'])
+            # Повтор артикула внутри пачки: побеждает последняя запись
+            batch[row['article']] = row
+            if len(batch) >= self.batch_size:
+                self._write_batch(list(batch.values()))
+                batch = {}
+        if batch:
+            self._write_batch(list(batch.values()))
+        if self.incremental:
+            self._delete_missing()
+        # bulk_create/update не отправляют сигналы, кэш поставщика сбрасывается целиком
+        catalog_cache.invalidate_company(self.company.id)
+        refresh_company_summary_later(self.company.id)
+        return self.report
+
+    def _remember_invalid(self, item):
+        """
+        Товар с ошибкой в строке не должен удаляться как исчезнувший из прайс-листа.
+        """
+        if self.incremental and isinstance(item, dict):
+            try:
+                self._seen.add(int(item.get('article', item.get('id'))))
+            except (TypeError, ValueError):
+                pass
+
+    def _delete_missing(self):
+        """
+        Удаляем товары поставщика, которых нет в прайс-листе.
+        Товары, уже попавшие в заказы, не удаляются, а снимаются с продажи (quantity = 0).
+        """
+        missing = [
+            pk for pk, article in Product.objects.filter(company_id=self.company.id).values_list(
+                'id', 'article').iterator(chunk_size=self.batch_size)
+            if article not in self._seen
+        ]
+        for start in range(0, len(missing), self.batch_size):
+            ids = missing[start:start + self.batch_size]
+            with transaction.atomic():
+                ordered = set(OrderItem.objects.filter(product_id__in=ids).values_list('product_id', flat=True))
+                Product.objects.filter(id__in=ordered).update(quantity=0, fingerprint='')
+                Product.objects.filter(id__in=set(ids) - ordered).delete()
+            self.report['deleted'] += len(ids)
+
+    def _category_ids(self, names):
+        if self._categories is None:
+            self._categories = dict(Category.objects.values_list('name', 'id'))
+            self._linked_categories = set(
+                Category.companies.through.objects.filter(
+                    company_id=self.company.id).values_list('category_id', flat=True))
+        missing = set(names) - self._categories.keys()
+        if missing:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self._categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        unlinked = {self._categories[name] for name in names} - self._linked_categories
+        if unlinked:
+            Category.companies.through.objects.bulk_create(
+                [Category.companies.through(category_id=category_id, company_id=self.company.id)
+                 for category_id in unlinked],
+                ignore_conflicts=True)
+            self._linked_categories |= unlinked
+        return self._categories
+
+    def _property_ids(self, keys):
+        if self._properties is None:
+            self._properties = {
+                (name, value): pk for pk, name, value in Property.objects.values_list('id', 'name', 'value')}
+        missing = set(keys) - self._properties.keys()
+        if missing:
+            Property.objects.bulk_create(
+                [Property(name=name, value=value) for name, value in missing], ignore_conflicts=True)
+            names = {name for name, _ in missing}
+            for pk, name, value in Property.objects.filter(name__in=names).values_list('id', 'name', 'value'):
+                self._properties[(name, value)] = pk
+        return self._properties
+
+    def _write_batch(self, rows):
+        articles = [row['article'] for row in rows]
+        existing = {article: (company_id, fingerprint) for article, company_id, fingerprint in
+                    Product.objects.filter(article__in=articles).values_list('article', 'company_id', 'fingerprint')}
+        accepted = []
+        for row in rows:
+            owner, fingerprint = existing.get(row['article'], (None, None))
+            if owner is not None and owner != self.company.id:
+                self._error(f"article={row['article']}: артикул принадлежит другому поставщику")
+            elif self.incremental and fingerprint == row['fingerprint']:
+                self.report['unchanged'] += 1
+            else:
+                accepted.append(row)
+        if not accepted:
+            return
+
+        with transaction.atomic():
+            categories = self._category_ids({row['category'] for row in accepted})
+            properties = self._property_ids({key for row in accepted for key in row['parameters']})
+            Product.objects.bulk_create(
+                [Product(article=row['article'], name=row['name'], description=row['description'],
+                         quantity=row['quantity'], price=row['price'],
+                         category_id=categories[row['category']], company_id=self.company.id,
+                         fingerprint=row['fingerprint'])
+                 for row in accepted],
+                update_conflicts=True,
+                unique_fields=['article'],
+                update_fields=self.product_update_fields,
+            )
+            product_ids = dict(Product.objects.filter(
+                article__in=[row['article'] for row in accepted]).values_list('article', 'id'))
+            # Характеристики, пропавшие из строки прайс-листа, не должны оставаться у товара.
+            # Удаление одним запросом: фасеты этих товаров перестраивает sync_facets ниже
+            ProductProperty.objects.filter(
+                product_id__in=[product_ids[row['article']] for row in accepted if row['article'] in existing]
+            ).delete()
+            ProductProperty.objects.bulk_create(
+                [ProductProperty(product_id=product_ids[row['article']],
+                                 property_id=properties[key], quantity=value)
+                 for row in accepted for key, value in row['parameters'].items()],
+                update_conflicts=True,
+                unique_fields=['product', 'property'],
+                update_fields=['quantity'],
+            )
+            facets.sync_facets(product_ids.values())
+
+        updated = sum(1 for row in accepted if row['article'] in existing)
+        self.report['updated'] += updated
+        self.report['created'] += len(accepted) - updated
+
+
+def import_price_list(stream, file_format, company, batch_size=1000, incremental=False):
+    """
+    Импорт прайс-листа поставщика из файлового объекта
+    :param stream: файловый объект
+    :param file_format: один из FORMATS
+    :param company: компания-поставщик
+    :param batch_size: количество товаров в одной пачке
+    :param incremental: записывать только изменившиеся товары и удалять исчезнувшие
+    :return: отчет об импорте
+    """
+    importer = PriceListImporter(company, batch_size=batch_size, incremental=incremental)
+    return importer.run(read_price_list(stream, file_format))
@@ -0,0 +1,235 @@
+"""
+Метрики запросов: SQL, время и размер ответа по view.
+
+Каждое соединение с базой получает обертку выполнения запросов
+(execute_wrappers, тот же механизм, что connection.execute_wrapper), которая
+записывает количество и время запросов в статистику текущего HTTP-запроса.
+Статистика хранится в contextvar, поэтому запросы из потоков sync_to_async
+в async view тоже учитываются, а вне HTTP-запроса (команды, воркеры)
+обертка ничего не делает.
+
+Повторяющийся текст SQL в пределах одного запроса (одинаковый запрос с
+разными параметрами) считается дубликатом: это признак N+1. Если запрос
+повторился N_PLUS_ONE_THRESHOLD раз, в лог пишется предупреждение.
+
+Счетчики накапливаются в памяти процесса и раз в METRICS_FLUSH_SECONDS
+добавляются в общий кэш, поэтому endpoint метрик отдает сумму по всем
+процессам (при Redis). Без сброса остаются данные последних секунд
+работы процесса.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'metrics'
+# Границы гистограммы длительности запросов, секунд
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Статистика текущего HTTP-запроса. Объект изменяется на месте,
+# поэтому запросы из потока sync_to_async видны в вызывающем контексте.
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """
+    SQL-запросы одного HTTP-запроса
+    """
+    __slots__ = ('queries', 'db_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}
+
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.statements.items() if count >= threshold]
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+        stats.statements[sql] = stats.statements.get(sql, 0) + 1
+
+
+def _install(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """
+    Подключаем запись запросов ко всем соединениям, в том числе будущим
+    """
+    connection_created.connect(_install, dispatch_uid='backend.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+def start():
+    """
+    Начинаем сбор статистики HTTP-запроса
+    :return: (статистика, токен для finish)
+    """
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+class MetricsRegistry:
+    """
+    Счетчики по (view, метод, класс статуса) с периодическим сбросом в кэш
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._flushed_at = time.monotonic()
+
+    def observe(self, view, method, status, duration, stats, size):
+        """
+        Учитываем завершенный HTTP-запрос
+        :param duration: полное время обработки, секунд
+        :param stats: RequestStats запроса
+        :param size: размер ответа в байтах или None для потоковых ответов
+        """
+        values = Counter({
+            'requests': 1,
+            'duration_us': int(duration * 1e6),
+            'db_us': int(stats.db_time * 1e6),
+            'queries': stats.queries,
+            'duplicates': stats.duplicates(),
+        })
+        for bound in DURATION_BUCKETS:
+            if duration <= bound:
+                values[f'le_{bound}'] += 1
+        if size is not None:
+            values['responses_sized'] = 1
+            values['bytes'] = size
+
+        for sql, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+            logger.warning('Запрос выполнен %d раз за один вызов %s %s: %s', count, method, view, sql[:300])
+
+        with self._lock:
+            self._pending[(view, method, status)].update(values)
+            if time.monotonic() - self._flushed_at < settings.METRICS_FLUSH_SECONDS:
+                return
+            pending = self._take()
+        self._flush(pending)
+
+    def _take(self):
+        pending, self._pending = self._pending, defaultdict(Counter)
+        self._flushed_at = time.monotonic()
+        return pending
+
+    @staticmethod
+    def _series_key(series):
+        return '|'.join(series)
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        names = set(cache.get(f'{PREFIX}:series') or ())
+        added = {self._series_key(series) for series in pending} - names
+        if added:
+            # Одновременный сброс из другого процесса может потерять имя,
+            # оно добавится снова при следующем сбросе этой серии
+            cache.set(f'{PREFIX}:series', sorted(names | added), None)
+        for series, values in pending.items():
+            for name, value in values.items():
+                key = f'{PREFIX}:{self._series_key(series)}:{name}'
+                if value and not cache.add(key, value, None):
+                    cache.incr(key, value)
+
+    def collect(self):
+        """
+        Метрики всех процессов в текстовом формате Prometheus
+        """
+        with self._lock:
+            pending = self._take()
+        self._flush(pending)
+
+        names = cache.get(f'{PREFIX}:series') or ()
+        counters = ['requests', 'duration_us', 'db_us', 'queries', 'duplicates', 'responses_sized', 'bytes']
+        counters += [f'le_{bound}' for bound in DURATION_BUCKETS]
+        stored = cache.get_many([f'{PREFIX}:{name}:{counter}' for name in names for counter in counters])
+        series = []
+        for name in names:
+            view, method, status = name.split('|')
+            values = {counter: stored.get(f'{PREFIX}:{name}:{counter}', 0) for counter in counters}
+            series.append((f'view="{_escape(view)}",method="{method}",status="{status}"', values))
+        return render(series)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _python_us(values):
+    return max(values['duration_us'] - values['db_us'], 0)
+
+
+def render(series):
+    """
+    Текстовый формат Prometheus
+    :param series: список (метки, значения счетчиков)
+    """
+    lines = []
+
+    def metric(name, kind, description, rows):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(rows)
+
+    metric('http_requests_total', 'counter', 'Обработанные HTTP-запросы',
+           [f'http_requests_total{{{labels}}} {values["requests"]}' for labels, values in series])
+
+    rows = []
+    for labels, values in series:
+        for bound in DURATION_BUCKETS:
+            rows.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {values[f"le_{bound}"]}')
+        rows.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values["requests"]}')
+        rows.append(f'http_request_duration_seconds_sum{{{labels}}} {values["duration_us"] / 1e6}')
+        rows.append(f'http_request_duration_seconds_count{{{labels}}} {values["requests"]}')
+    metric('http_request_duration_seconds', 'histogram', 'Полное время обработки запроса', rows)
+
+    metric('http_request_db_seconds_total', 'counter', 'Время выполнения SQL-запросов',
+           [f'http_request_db_seconds_total{{{labels}}} {values["db_us"] / 1e6}' for labels, values in series])
+    metric('http_request_python_seconds_total', 'counter', 'Время обработки без SQL (Python, сериализация)',
+           [f'http_request_python_seconds_total{{{labels}}} {_python_us(values) / 1e6}' for labels, values in series])
+    metric('http_request_db_queries_total', 'counter', 'Количество SQL-запросов',
+           [f'http_request_db_queries_total{{{labels}}} {values["queries"]}' for labels, values in series])
+    metric('http_request_db_duplicate_queries_total', 'counter',
+           'Повторы одного и того же SQL в пределах запроса (признак N+1)',
+           [f'http_request_db_duplicate_queries_total{{{labels}}} {values["duplicates"]}' for labels, values in series])
+
+    rows = []
+    for labels, values in series:
+        rows.append(f'http_response_size_bytes_sum{{{labels}}} {values["bytes"]}')
+        rows.append(f'http_response_size_bytes_count{{{labels}}} {values["responses_sized"]}')
+    metric('http_response_size_bytes', 'summary', 'Размер ответа (без потоковых ответов)', rows)
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,190 @@
+"""
+Фоновые задачи: очередь в базе данных, воркер и повторы с задержкой.
+
+Задача - функция, зарегистрированная декоратором @task (см. backend.tasks).
+Task.enqueue() записывает строку Job в текущей транзакции: если
+транзакция откатится, задача не появится, а воркер увидит ее только после
+фиксации, поэтому данные, нужные задаче, уже будут в базе. Параметры
+задачи хранятся в JSON.
+
+Воркер (команда run_worker) забирает пачку задач через
+SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько воркеров не получают
+одну задачу. Взятая задача арендуется на JOBS_LEASE_SECONDS: если воркер
+упал, после конца аренды задачу возьмет другой. Ошибка задачи планирует
+повтор с экспоненциальной задержкой (JOBS_RETRY_DELAY, 2x, 4x, ... не
+больше JOBS_MAX_RETRY_DELAY), после max_attempts попыток задача
+помечается как failed. Задача может выполниться больше одного раза
+(повтор после ошибки или истекшей аренды), поэтому функции задач должны
+быть идемпотентными.
+
+Ключ (key) объединяет одинаковые задачи: пока задача с ключом ждет
+первого запуска, постановка с тем же ключом возвращает ее, а не
+создает новую строку (частые изменения одного товара или категории
+дают одну задачу пересчета). После того как воркер взял задачу,
+постановка с тем же ключом создает новую: изменения, сделанные во
+время выполнения, не теряются.
+
+При JOBS_EXECUTOR = 'immediate' воркер не нужен: задача выполняется в
+процессе сразу после фиксации транзакции (тесты, разработка).
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PENDING_JOB_STATUSES, Job
+
+logger = logging.getLogger(__name__)
+
+# Зарегистрированные задачи по имени
+TASKS = {}
+
+
+class Task:
+    """
+    Зарегистрированная фоновая задача
+    """
+
+    def __init__(self, func, name, max_attempts=None):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def enqueue(self, key=None, delay=None, **payload):
+        """
+        Ставим задачу в очередь
+        :param key: ключ объединения с ожидающей задачей (None - всегда новая задача)
+        :param delay: отложить выполнение, секунд
+        :param payload: именованные аргументы функции (сериализуемые в JSON)
+        :return: Job
+        """
+        return enqueue(self, payload, key=key, delay=delay)
+
+
+def task(name=None, max_attempts=None):
+    """
+    Декоратор регистрации фоновой задачи
+    :param name: имя задачи в очереди (по умолчанию модуль.функция)
+    :param max_attempts: максимум попыток (по умолчанию JOBS_MAX_ATTEMPTS)
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', max_attempts)
+        if registered.name in TASKS:
+            raise ValueError(f'Задача {registered.name} уже зарегистрирована')
+        TASKS[registered.name] = registered
+        return registered
+    return register
+
+
+def enqueue(registered, payload, key=None, delay=None):
+    """
+    Ставим задачу в очередь (см. Task.enqueue)
+    """
+    defaults = {
+        'task': registered.name,
+        'payload': payload,
+        'max_attempts': registered.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        'run_at': timezone.now() + timedelta(seconds=delay or 0),
+    }
+    if key is None:
+        job, created = Job.objects.create(**defaults), True
+    else:
+        job, created = Job.objects.get_or_create(key=key, status='queued', attempts=0, defaults=defaults)
+    if created and settings.JOBS_EXECUTOR == 'immediate':
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def retry_delay(attempts):
+    """
+    Задержка перед следующей попыткой, секунд
+    :param attempts: количество выполненных попыток
+    """
+    delay = min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1), settings.JOBS_MAX_RETRY_DELAY)
+    # Разброс, чтобы задачи, упавшие вместе (недоступен сервис), не повторялись одновременно
+    return delay * random.uniform(0.75, 1)
+
+
+def claim(limit=10, job_ids=None):
+    """
+    Забираем задачи, время которых наступило, и арендуем их
+    :param limit: максимум задач
+    :param job_ids: только указанные задачи
+    :return: список Job (attempts уже увеличен)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = Job.objects.select_for_update(skip_locked=True).filter(status__in=PENDING_JOB_STATUSES,
+                                                                      run_at__lte=now)
+        if job_ids is not None:
+            jobs = jobs.filter(pk__in=job_ids)
+        jobs = list(jobs.order_by('run_at')[:limit])
+        if not jobs:
+            return []
+        lease_until = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status='running', attempts=F('attempts') + 1, run_at=lease_until)
+    for job in jobs:
+        job.status, job.attempts, job.run_at = 'running', job.attempts + 1, lease_until
+    return jobs
+
+
+def execute(job):
+    """
+    Выполняем арендованную задачу и записываем результат
+    :param job: Job из claim()
+    :return: True, если задача выполнена
+    """
+    # Строка обновляется, только если аренду не забрал другой воркер
+    current = Job.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+    registered = TASKS.get(job.task)
+    try:
+        if registered is None:
+            raise LookupError(f'Неизвестная задача {job.task}')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Аренда истекла на последней попытке')
+        registered(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if registered is None or job.attempts >= job.max_attempts:
+            logger.error('Задача %s (%s) не выполнена: %s', job.pk, job.task, error)
+            current.update(status='failed', last_error=error, finished_at=timezone.now())
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning('Задача %s (%s), попытка %d: повтор через %.0f с\n%s',
+                           job.pk, job.task, job.attempts, delay, error)
+            current.update(status='queued', last_error=error, run_at=timezone.now() + timedelta(seconds=delay))
+        return False
+    current.update(status='done', finished_at=timezone.now())
+    return True
+
+
+def run_job(job_id):
+    """
+    Выполняем одну задачу в текущем процессе (исполнитель immediate)
+    """
+    for job in claim(limit=1, job_ids=[job_id]):
+        execute(job)
+
+
+def run_pending(limit=10):
+    """
+    Одна итерация воркера
+    :param limit: максимум задач
+    :return: количество взятых задач
+    """
+    jobs = claim(limit)
+    for job in jobs:
+        execute(job)
+    return len(jobs)
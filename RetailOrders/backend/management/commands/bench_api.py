@@ -0,0 +1,106 @@
+import json
+import platform
+import uuid
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from backend.benchmarks.api import SCENARIOS, ScenarioError, compare, measure
+from backend.benchmarks.seed import cleanup, sample, seed
+from backend.models import User
+from backend.serializers import UserTokenObtainPairSerializer
+
+# Отдельный кэш процесса: замер не зависит от содержимого общего кэша и не засоряет его
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-api'}}
+
+
+class Command(BaseCommand):
+    help = ('Микробенчмарки endpoint\'ов API: количество SQL-запросов, задержка p50/p95 и память '
+            'на запрос. Сравнение с базовым замером завершается ошибкой при регрессии')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000,
+                            help='Размер временного набора данных (удаляется после замера)')
+        parser.add_argument('--prefix', help='Использовать набор, созданный seed_data, вместо временного')
+        parser.add_argument('--iterations', type=int, default=50, help='Замеряемых запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=5, help='Запросов прогрева на сценарий')
+        parser.add_argument('--scenario', action='append',
+                            help='Сценарий или группа (например, user или contacts.list), можно несколько раз')
+        parser.add_argument('--baseline', help='JSON базового замера для сравнения')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Сохранить результаты как базовый замер')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост задержки p95 и памяти относительно базового замера')
+
+    def handle(self, *args, **options):
+        scenarios = [scenario for scenario in SCENARIOS if self.selected(scenario.name, options['scenario'])]
+        if not scenarios:
+            raise CommandError('Нет сценариев с такими именами')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        temporary = options['prefix'] is None
+        if temporary:
+            data = seed(products=options['products'])
+        else:
+            try:
+                data = sample(options['prefix'])
+            except LookupError as error:
+                raise CommandError(str(error))
+        try:
+            with override_settings(CACHES=BENCH_CACHES, ALLOWED_HOSTS=['*']):
+                results = self.run(scenarios, data, options)
+        finally:
+            if temporary:
+                cleanup(data['prefix'])
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as file:
+                json.dump({'environment': self.environment(data, options), 'results': results}, file,
+                          ensure_ascii=False, indent=2)
+            self.stdout.write(f'Базовый замер сохранен в {options["save_baseline"]}')
+        if baseline is not None:
+            regressions = compare(results, baseline['results'], options['tolerance'])
+            if regressions:
+                raise CommandError('Регрессии относительно базового замера:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    @staticmethod
+    def selected(name, patterns):
+        return not patterns or any(name == pattern or name.startswith(f'{pattern}.') for pattern in patterns)
+
+    def run(self, scenarios, data, options):
+        user = User.objects.get(pk=data['user_id'])
+        data = {**data, 'email': user.email, 'run': uuid.uuid4().hex[:8],
+                'refresh_token': lambda: UserTokenObtainPairSerializer.get_token(user)}
+        token = UserTokenObtainPairSerializer.get_token(user)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+        client = Client()
+
+        self.stdout.write(f"{'сценарий':<22}{'запросов':>9}{'p50, мс':>10}{'p95, мс':>10}{'память, КБ':>12}")
+        results = {}
+        for scenario in scenarios:
+            try:
+                result = measure(client, scenario, data, headers, options['iterations'], options['warmup'])
+            except ScenarioError as error:
+                raise CommandError(f'Ошибка endpoint\'а {error}')
+            results[scenario.name] = result
+            self.stdout.write(f"{scenario.name:<22}{result['queries']:>9}{result['p50_ms']:>10.2f}"
+                              f"{result['p95_ms']:>10.2f}{result['alloc_kb']:>12.1f}")
+        return results
+
+    @staticmethod
+    def environment(data, options):
+        return {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'products': None if options['prefix'] else options['products'],
+            'prefix': options['prefix'],
+            'iterations': options['iterations'],
+        }
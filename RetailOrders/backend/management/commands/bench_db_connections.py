@@ -0,0 +1,84 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+MODES = ('new', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = ('Сравнение задержки запросов к базе при новом соединении на каждый запрос, '
+            'постоянных соединениях (CONN_MAX_AGE) и пуле соединений psycopg 3')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='База, настройки которой берутся за основу')
+        parser.add_argument('--mode', choices=MODES, action='append', help='Режимы (по умолчанию все доступные)')
+        parser.add_argument('--requests', type=int, default=200, help='Количество запросов в каждом потоке')
+        parser.add_argument('--threads', type=int, default=4, help='Количество параллельных потоков')
+        parser.add_argument('--query', default='SELECT 1', help='SQL-запрос, выполняемый в каждом запросе')
+
+    def handle(self, *args, **options):
+        base = connections.settings[options['database']]
+        postgresql = base['ENGINE'] == 'django.db.backends.postgresql'
+        modes = options['mode'] or [mode for mode in MODES if mode != 'pool' or postgresql]
+        if 'pool' in modes and not postgresql:
+            raise CommandError('Пул соединений доступен только для PostgreSQL')
+
+        self.stdout.write(f"{'режим':<12}{'запросов':>10}{'среднее':>10}{'p50':>10}{'p95':>10}{'p99':>10}  мс")
+        for mode in modes:
+            alias = f'bench_{mode}'
+            connections.settings[alias] = self.mode_settings(base, mode)
+            try:
+                timings = self.run(alias, options)
+            finally:
+                self.close(alias)
+                del connections.settings[alias]
+            self.report(mode, timings)
+
+    @staticmethod
+    def mode_settings(base, mode):
+        settings = {**base, 'OPTIONS': {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}}
+        if mode == 'new':
+            settings['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings['CONN_MAX_AGE'] = 600
+        else:
+            settings['CONN_MAX_AGE'] = 0
+            settings['OPTIONS']['pool'] = base['OPTIONS'].get('pool') or True
+        return settings
+
+    def run(self, alias, options):
+        def worker(_):
+            connection = connections[alias]
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                # Так же, как обработчики request_started/request_finished в Django
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute(options['query'])
+                    cursor.fetchall()
+                connection.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            return timings
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = list(executor.map(worker, range(options['threads'])))
+        return [timing for timings in results for timing in timings]
+
+    @staticmethod
+    def close(alias):
+        connection = connections[alias]
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        del connections[alias]
+
+    def report(self, mode, timings):
+        timings.sort()
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))]
+        self.stdout.write(
+            f'{mode:<12}{len(timings):>10}{statistics.fmean(timings):>10.3f}'
+            f'{percentile(0.5):>10.3f}{percentile(0.95):>10.3f}{percentile(0.99):>10.3f}')
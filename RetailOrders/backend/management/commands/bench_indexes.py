@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from backend.benchmarks.explain import check_cases
+from backend.benchmarks.seed import seed
+
+
+class Command(BaseCommand):
+    help = ('Проверка индексов через EXPLAIN на сгенерированных данных. '
+            'Данные создаются в транзакции и по умолчанию откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Количество товаров в наборе данных')
+        parser.add_argument('--force-index', action='store_true',
+                            help='Запретить последовательное чтение (PostgreSQL): проверяет, что индекс '
+                                 'подходит запросу, даже если на малом наборе планировщик выбирает seq scan')
+        parser.add_argument('--keep', action='store_true', help='Не откатывать сгенерированные данные')
+        parser.add_argument('--verbose', action='store_true', help='Выводить планы запросов')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = seed(products=options['products'])
+            self.stdout.write(', '.join(f'{table}: {count}' for table, count in data['rows'].items()))
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                if options['force_index'] and connection.vendor == 'postgresql':
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            results = check_cases(data)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        missed = []
+        for case, plan, used in results:
+            style = self.style.SUCCESS if used else self.style.ERROR
+            self.stdout.write(style(f'{"OK " if used else "NO "} {case.index:32} {case.name}'))
+            if options['verbose'] or not used:
+                self.stdout.write(plan)
+            if not used:
+                missed.append(case.index)
+        if missed:
+            raise CommandError(f'Индексы не используются: {", ".join(missed)}')
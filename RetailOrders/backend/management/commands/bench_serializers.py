@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.benchmarks.seed import cleanup, seed
+from backend.benchmarks.serialization import CASES, measure
+
+
+class Command(BaseCommand):
+    help = ('Сравнение вывода списков через DRF и через fastpath + orjson: совпадение ответа '
+            'байт в байт и скорость (целиком и только сериализация)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000,
+                            help='Размер временного набора данных (удаляется после замера)')
+        parser.add_argument('--rows', type=int, default=500, help='Строк в выборке')
+        parser.add_argument('--iterations', type=int, default=20, help='Повторов на замер')
+
+    def handle(self, *args, **options):
+        data = seed(products=options['products'])
+        try:
+            results = {case.name: measure(case, options['rows'], options['iterations']) for case in CASES}
+        finally:
+            cleanup(data['prefix'])
+
+        self.stdout.write(f"{'выборка':<18}{'строк':>7}{'DRF, мс':>10}{'fast, мс':>10}{'x':>6}"
+                          f"{'DRF CPU':>10}{'fast CPU':>10}{'x':>6}")
+        mismatched = []
+        for name, result in results.items():
+            style = self.style.SUCCESS if result['identical'] else self.style.ERROR
+            self.stdout.write(style(
+                f"{name:<18}{result['rows']:>7}{result['drf_ms']:>10.2f}{result['fast_ms']:>10.2f}"
+                f"{result['drf_ms'] / result['fast_ms']:>6.1f}{result['drf_cpu_ms']:>10.2f}"
+                f"{result['fast_cpu_ms']:>10.2f}{result['drf_cpu_ms'] / result['fast_cpu_ms']:>6.1f}"))
+            if not result['identical']:
+                mismatched.append(name)
+        if mismatched:
+            raise CommandError(f'Ответ fastpath отличается от DRF: {", ".join(mismatched)}')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from backend.benchmarks.queries import ENDPOINTS, orderings, record, unexpected_orderings
+from backend.benchmarks.seed import seed
+from backend.models import User
+from backend.serializers import UserTokenObtainPairSerializer
+
+# Отдельный кэш, чтобы списки каталога читались из базы, а не из кэша предыдущих запросов
+CHECK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                            'LOCATION': 'check-query-sql'}}
+
+
+class Command(BaseCommand):
+    help = ('Запись SQL ключевых endpoint\'ов на сгенерированных данных и проверка, '
+            'что в запросах нет сортировок, кроме объявленных. Данные откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help='Количество товаров в наборе данных')
+        parser.add_argument('--verbose', action='store_true', help='Выводить SQL всех запросов')
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), override_settings(CACHES=CHECK_CACHES, ALLOWED_HOSTS=['*']):
+            data = seed(products=options['products'])
+            token = UserTokenObtainPairSerializer.get_token(User.objects.get(pk=data['user_id']))
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+
+            client = Client()
+            failures = []
+            for endpoint in ENDPOINTS:
+                code, statements = record(client, endpoint, data, headers if endpoint.auth else None)
+                unexpected = unexpected_orderings(endpoint, statements)
+                ok = code < 400 and not unexpected
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f'{"OK " if ok else "NO "} {code} {len(statements):3} запросов  {endpoint.name}'))
+                for sql in statements if options['verbose'] else ():
+                    self.stdout.write(f'    {orderings(sql) or ""} {sql}')
+                for sql, ordering in unexpected:
+                    self.stdout.write(f'    лишняя сортировка {ordering}: {sql}')
+                if not ok:
+                    failures.append(endpoint.name)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'Ошибки в endpoint\'ах: {", ".join(failures)}')
@@ -0,0 +1,67 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import exports
+from backend.models import Company
+from backend.routers import replica_reads
+
+
+class Command(BaseCommand):
+    help = ('Потоковая выгрузка каталога поставщика или истории заказов в JSON Lines или CSV '
+            '(с gzip). Память не зависит от размера выгрузки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=('products', 'orders'), help='Что выгружать')
+        parser.add_argument('--format', choices=exports.EXPORT_FORMATS, default='jsonl', help='Формат файла')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать в gzip')
+        parser.add_argument('--output', '-o', help='Файл (по умолчанию стандартный вывод)')
+        parser.add_argument('--company', type=int, help='Поставщик (обязательно для products)')
+        parser.add_argument('--date-from', help='Заказы с даты YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Заказы по дату YYYY-MM-DD включительно')
+        parser.add_argument('--status', help='Заказы в статусе')
+        parser.add_argument('--chunk-size', type=int, help='Строк в одной выборке из курсора')
+
+    def handle(self, *args, **options):
+        # Каталог читается с реплик, если они настроены
+        with replica_reads():
+            self.export(options)
+
+    def export(self, options):
+        export_format, chunk_size = options['format'], options['chunk_size']
+        try:
+            if options['dataset'] == 'products':
+                company = self.company(options['company'])
+                columns = exports.product_columns(company) if export_format == 'csv' else None
+                rows = exports.product_rows(company, chunk_size=chunk_size)
+            else:
+                items = exports.filter_order_items(exports.order_items(), options)
+                columns, rows = exports.ORDER_COLUMNS, exports.order_rows(items, chunk_size=chunk_size)
+            chunks = exports.stream(rows, export_format, columns=columns, compress=options['gzip'])
+        except exports.ExportError as error:
+            raise CommandError(str(error))
+
+        if options['output'] is None:
+            self.write(chunks, sys.stdout.buffer)
+            return
+        with open(options['output'], 'wb') as file:
+            size = self.write(chunks, file)
+        self.stderr.write(self.style.SUCCESS(f'Записано {size} байт в {options["output"]}'))
+
+    @staticmethod
+    def company(company_id):
+        if company_id is None:
+            raise CommandError('Для выгрузки каталога укажите --company')
+        try:
+            return Company.objects.get(pk=company_id)
+        except Company.DoesNotExist:
+            raise CommandError(f'Компания {company_id} не найдена')
+
+    @staticmethod
+    def write(chunks, file):
+        size = 0
+        for chunk in chunks:
+            file.write(chunk)
+            size += len(chunk)
+        file.flush()
+        return size
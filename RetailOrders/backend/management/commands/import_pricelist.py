@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.importer import FORMATS, PriceListError, detect_format, import_price_list
+from backend.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Потоковый импорт прайс-листа поставщика (YAML, CSV, JSON Lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу прайс-листа')
+        parser.add_argument('--company', type=int, required=True, help='id компании-поставщика')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию - по расширению)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество товаров в одной пачке')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Записывать только изменившиеся товары и удалять исчезнувшие из прайс-листа')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Компания id = {options['company']} не найдена")
+
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as stream:
+                report = import_price_list(stream, file_format, company, batch_size=options['batch_size'],
+                                           incremental=options['incremental'])
+        except (OSError, PriceListError) as error:
+            raise CommandError(error)
+
+        for message in report['errors']:
+            self.stderr.write(message)
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано: {report['processed']}, создано: {report['created']}, "
+            f"обновлено: {report['updated']}, без изменений: {report['unchanged']}, "
+            f"удалено: {report['deleted']}, пропущено: {report['skipped']}"))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.models import Job
+
+
+class Command(BaseCommand):
+    help = ('Удаление завершенных фоновых задач пачками. Вместе с задачей освобождается ее ключ '
+            'идемпотентности. Запускается по расписанию (cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Удалять задачи, завершенные раньше, дней')
+        parser.add_argument('--failed', action='store_true', help='Удалять и задачи с ошибкой')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Количество задач в одном DELETE')
+
+    def handle(self, *args, **options):
+        finished = Job.objects.filter(status__in=('done', 'failed') if options['failed'] else ('done',),
+                                      finished_at__lte=timezone.now() - timedelta(days=options['days']))
+        deleted = 0
+        while True:
+            ids = list(finished.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            Job.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'Удалено задач: {deleted}'))
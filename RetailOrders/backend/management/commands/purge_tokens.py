@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = ('Удаление истекших refresh-токенов и записей черного списка пачками. '
+            'Запускается по расписанию (cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Количество токенов в одном DELETE')
+        parser.add_argument('--dry-run', action='store_true', help='Только подсчитать истекшие токены')
+
+    def handle(self, *args, **options):
+        # Граница фиксируется один раз, чтобы команда не гонялась за новыми токенами
+        expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow()).order_by('id')
+        if options['dry_run']:
+            self.stdout.write(f'Истекших токенов: {expired.count()}')
+            return
+
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # Записи BlacklistedToken удаляются каскадом
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'Удалено токенов: {deleted}'))
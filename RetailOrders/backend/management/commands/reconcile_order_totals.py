@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from backend.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Поиск и исправление расхождений Order.total_amount с суммой строк заказа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество заказов в одном UPDATE')
+
+    def handle(self, *args, **options):
+        items_total = Coalesce(Sum('order__total_cost'), Value(0), output_field=DecimalField())
+        drift = list(
+            Order.objects.annotate(actual=items_total).exclude(total_amount=F('actual'))
+            .order_by('id').values_list('id', flat=True))
+        if options['dry_run']:
+            self.stdout.write(f'Заказов с расхождением: {len(drift)}')
+            if drift:
+                self.stdout.write(', '.join(map(str, drift)))
+            return
+
+        actual = Subquery(
+            OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+                total=Sum('total_cost')).values('total'))
+        batch_size = options['batch_size']
+        for start in range(0, len(drift), batch_size):
+            Order.objects.filter(id__in=drift[start:start + batch_size]).update(
+                total_amount=Coalesce(actual, Value(0), output_field=DecimalField()))
+        self.stdout.write(self.style.SUCCESS(f'Исправлено заказов: {len(drift)}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from backend import summary
+from backend.models import CatalogSummary
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчет сводки каталога по категориям и поставщикам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help='Пересчитать только указанных поставщиков')
+
+    def handle(self, *args, **options):
+        if options['company']:
+            summary.refresh_companies(options['company'])
+        else:
+            summary.refresh_all()
+        self.stdout.write(self.style.SUCCESS(f'Строк сводки: {CatalogSummary.objects.count()}'))
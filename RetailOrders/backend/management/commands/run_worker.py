@@ -0,0 +1,40 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from backend import jobs
+
+
+class Command(BaseCommand):
+    help = ('Воркер фоновых задач: выполняет задачи из очереди в базе данных. '
+            'Можно запускать несколько воркеров, SIGTERM завершает работу после текущей пачки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Задач, забираемых за один раз (должны успеть за JOBS_LEASE_SECONDS)')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Пауза при пустой очереди, секунд')
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        processed = 0
+        while not self.stopping:
+            # Соединение переиспользуется между пачками с учетом CONN_MAX_AGE, как между HTTP-запросами
+            close_old_connections()
+            taken = jobs.run_pending(options['batch_size'])
+            processed += taken
+            if taken:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
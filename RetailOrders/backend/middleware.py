@@ -0,0 +1,112 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from . import instrumentation
+from .routers import replica_reads
+
+# Остальные методы объединяются в один ряд метрик, чтобы клиент не мог создавать новые ряды
+METRIC_METHODS = frozenset({'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'})
+
+
+def _pin_key(request):
+    """
+    Ключ липкого окна пользователя по id из access-токена.
+    Подпись не проверяется: id нужен только для выбора базы для чтения,
+    аутентификация выполняется позже в view.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        user_id = UntypedToken(header[1], verify=False)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return f'replica:pin:{user_id}'
+
+
+@sync_and_async_middleware
+def replica_pinning_middleware(get_response):
+    """
+    Разрешает чтение каталога с реплик в пределах запроса. Если запрос
+    что-то записал, следующие запросы пользователя в течение
+    REPLICA_STICKY_SECONDS читают с основной базы.
+    """
+    if not settings.DATABASE_REPLICAS:
+        raise MiddlewareNotUsed()
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            key = _pin_key(request)
+            pinned = key is not None and bool(await cache.aget(key))
+            with replica_reads(pinned) as state:
+                response = await get_response(request)
+            if key is not None and state['written']:
+                await cache.aset(key, True, settings.REPLICA_STICKY_SECONDS)
+            return response
+    else:
+        def middleware(request):
+            key = _pin_key(request)
+            pinned = key is not None and bool(cache.get(key))
+            with replica_reads(pinned) as state:
+                response = get_response(request)
+            if key is not None and state['written']:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+            return response
+    return middleware
+
+
+def _server_timing(stats, duration):
+    db = stats.db_time * 1000
+    return (f'db;dur={db:.1f};desc="{stats.queries} queries, {stats.duplicates()} duplicate", '
+            f'app;dur={duration * 1000 - db:.1f}, total;dur={duration * 1000:.1f}')
+
+
+def _observe(request, response, stats, started):
+    duration = time.perf_counter() - started
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match is not None else 'unmatched'
+    method = request.method if request.method in METRIC_METHODS else 'OTHER'
+    size = None if response.streaming else len(response.content)
+    instrumentation.registry.observe(view, method, f'{response.status_code // 100}xx', duration, stats, size)
+    if settings.SERVER_TIMING:
+        response['Server-Timing'] = _server_timing(stats, duration)
+
+
+@sync_and_async_middleware
+def instrumentation_middleware(get_response):
+    """
+    Количество и время SQL-запросов, время без SQL и размер ответа по view.
+    Пишет заголовок Server-Timing и счетчики для endpoint'а метрик.
+    Стоит первым в MIDDLEWARE, чтобы учитывать всю обработку запроса.
+    """
+    if not settings.INSTRUMENTATION:
+        raise MiddlewareNotUsed()
+    instrumentation.install()
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats, token = instrumentation.start()
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                instrumentation.finish(token)
+            _observe(request, response, stats, started)
+            return response
+    else:
+        def middleware(request):
+            stats, token = instrumentation.start()
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                instrumentation.finish(token)
+            _observe(request, response, stats, started)
+            return response
+    return middleware
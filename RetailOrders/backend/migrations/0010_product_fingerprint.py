@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_rename_phone_number_contact_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, verbose_name='Отпечаток строки прайс-листа'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def fill_summary(apps, schema_editor):
+    Product = apps.get_model('backend', 'Product')
+    CatalogSummary = apps.get_model('backend', 'CatalogSummary')
+    rows = (Product.objects.order_by().values('category_id', 'company_id')
+            .annotate(product_count=Count('id'), in_stock_count=Count('id', filter=Q(quantity__gt=0)),
+                      min_price=Min('price'), max_price=Max('price')))
+    CatalogSummary.objects.bulk_create((CatalogSummary(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0011_product_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='Количество товаров')),
+                ('in_stock_count', models.PositiveIntegerField(default=0, verbose_name='Товаров в наличии')),
+                ('min_price', models.PositiveIntegerField(blank=True, null=True, verbose_name='Минимальная цена')),
+                ('max_price', models.PositiveIntegerField(blank=True, null=True, verbose_name='Максимальная цена')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='backend.category', verbose_name='Категория')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='backend.company', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Сводка по категории',
+                'verbose_name_plural': 'Сводки по категориям',
+                'constraints': [models.UniqueConstraint(fields=('category', 'company'), name='unique_catalog_summary')],
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Конфигурация полнотекстового поиска должна совпадать с backend.search.SEARCH_CONFIG
+CREATE_SEARCH = '''
+CREATE OR REPLACE FUNCTION backend_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON backend_product
+    FOR EACH ROW EXECUTE FUNCTION backend_product_search_vector_update();
+
+UPDATE backend_product SET search_vector =
+    setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(description, '')), 'B');
+
+CREATE INDEX product_search_vector_idx ON backend_product USING gin (search_vector);
+CREATE INDEX product_name_trgm_idx ON backend_product USING gin (name gin_trgm_ops);
+'''
+
+DROP_SEARCH = '''
+DROP INDEX IF EXISTS product_name_trgm_idx;
+DROP INDEX IF EXISTS product_search_vector_idx;
+DROP TRIGGER IF EXISTS backend_product_search_vector_trigger ON backend_product;
+DROP FUNCTION IF EXISTS backend_product_search_vector_update();
+'''
+
+
+def create_search(apps, schema_editor):
+    # Индексы GIN и триггер есть только в PostgreSQL, для остальных СУБД
+    # поиск работает без индекса (см. backend.search)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0012_catalogsummary'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:30
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def parse_number(value):
+    # Копия backend.facets.parse_number на момент создания миграции
+    try:
+        number = Decimal(str(value).strip().replace(',', '.'))
+        if not number.is_finite():
+            return None
+        number = number.quantize(Decimal('0.000001'))
+    except InvalidOperation:
+        return None
+    if len(number.as_tuple().digits) > 20:
+        return None
+    return number
+
+
+def fill_facets(apps, schema_editor):
+    ProductProperty = apps.get_model('backend', 'ProductProperty')
+    ProductFacet = apps.get_model('backend', 'ProductFacet')
+    rows = ProductProperty.objects.order_by().values_list('product_id', 'property_id', 'quantity')
+    ProductFacet.objects.bulk_create(
+        (ProductFacet(product_id=product_id, property_id=property_id, value=value, number=parse_number(value))
+         for product_id, property_id, value in rows.iterator(chunk_size=2000)),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0013_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(blank=True, max_length=50, verbose_name='Значение параметра')),
+                ('number', models.DecimalField(blank=True, decimal_places=6, max_digits=20, null=True, verbose_name='Числовое значение')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='backend.product', verbose_name='Продукт')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='backend.property', verbose_name='Характеристика')),
+            ],
+            options={
+                'verbose_name': 'Фасет продукта',
+                'verbose_name_plural': 'Фасеты продуктов',
+                'indexes': [models.Index(fields=['property', 'value', 'product'], name='facet_value_idx'), models.Index(condition=models.Q(('number__isnull', False)), fields=['property', 'number', 'product'], name='facet_number_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'property'), name='unique_product_facet')],
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0015_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('new', 'confirmed', 'assembled', 'sent'))), fields=['status', 'created_at'], name='order_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['order', 'product'], name='orderitem_order_product_idx'),
+        ),
+        # Индекс по order удаляется только после создания составного индекса
+        migrations.AlterField(
+            model_name='orderitem',
+            name='order',
+            field=models.ForeignKey(blank=True, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='order', to='backend.order', verbose_name='Заказ'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['company', 'category', 'name', 'id'], name='product_company_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['category', 'name', 'id'], name='product_in_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0016_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'verbose_name': 'Категория', 'verbose_name_plural': 'Список категорий'},
+        ),
+        migrations.AlterModelOptions(
+            name='company',
+            options={'verbose_name': 'Компания розничной торговли', 'verbose_name_plural': 'Список компаний розничной торговли'},
+        ),
+        migrations.AlterModelOptions(
+            name='product',
+            options={'verbose_name': 'Продукт', 'verbose_name_plural': 'Список продуктов'},
+        ),
+        migrations.AlterModelOptions(
+            name='property',
+            options={'verbose_name': 'Характеристика', 'verbose_name_plural': 'Список характеристик'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'verbose_name': 'Пользователь', 'verbose_name_plural': 'Список пользователей'},
+        ),
+    ]
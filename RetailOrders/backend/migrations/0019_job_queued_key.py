@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0018_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='key',
+            field=models.CharField(blank=True, max_length=200, null=True, verbose_name='Ключ объединения'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('attempts', 0), ('status', 'queued')), fields=('key',), name='job_queued_key_unique'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:00
+
+from django.db import migrations
+from django.utils import timezone
+
+LEGACY_TASK = 'summary.refresh_products'
+
+
+def rewrite_legacy_summary_jobs(apps, schema_editor):
+    """
+    Невыполненные задачи summary.refresh_products (поставленные до перехода на
+    пересчет по парам) заменяем задачами summary.refresh_pairs с ключом пары,
+    как их ставит tasks.refresh_summary_later
+    """
+    Job = apps.get_model('backend', 'Job')
+    Product = apps.get_model('backend', 'Product')
+    legacy = Job.objects.filter(task=LEGACY_TASK, status__in=('queued', 'running'))
+    max_attempts = {}
+    for payload, attempts in legacy.values_list('payload', 'max_attempts'):
+        product_ids = (payload or {}).get('product_ids') or []
+        pairs = Product.objects.filter(id__in=product_ids).values_list('category_id', 'company_id').distinct()
+        for pair in pairs:
+            max_attempts[pair] = max(max_attempts.get(pair, 0), attempts)
+
+    now = timezone.now()
+    for (category_id, company_id), attempts in sorted(max_attempts.items()):
+        Job.objects.get_or_create(
+            key=f'summary:pair:{category_id}:{company_id}', status='queued', attempts=0,
+            defaults={'task': 'summary.refresh_pairs', 'payload': {'pairs': [[category_id, company_id]]},
+                      'max_attempts': attempts, 'run_at': now})
+    legacy.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_job_queued_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(rewrite_legacy_summary_jobs, migrations.RunPython.noop),
+    ]
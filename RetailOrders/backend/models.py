@@ -1,12 +1,16 @@
 
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 # from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, AbstractUser, BaseUserManager, PermissionsMixin
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import validate_email
 from django.utils.translation import gettext_lazy as _
 
+from . import hashing
+
 # Create your models here.
 
 ROLE_CHOICES = (
@@ -25,6 +29,19 @@ STATUS_CHOICES = (
     ('canceled', 'Отменен'),
 )
 
+# Заказы, которые еще обрабатываются
+ACTIVE_STATUSES = ('new', 'confirmed', 'assembled', 'sent')
+
+JOB_STATUS_CHOICES = (
+    ('queued', 'В очереди'),
+    ('running', 'Выполняется'),
+    ('done', 'Выполнена'),
+    ('failed', 'Ошибка'),
+)
+
+# Задачи, которые воркер может взять: ожидающие и выполняющиеся с истекшей арендой
+PENDING_JOB_STATUSES = ('queued', 'running')
+
 class UserManager(BaseUserManager):
     """
     Менеджер пользователя, требуемый Django для работы с кастомной моделью пользователя.
@@ -114,6 +131,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     # Временная метка показывающая время последнего обновления объекта.
     updated_at = models.DateTimeField(auto_now=True)
+    # Версия токенов: увеличивается при смене пароля, роли или статуса,
+    # выданные ранее токены с другой версией отклоняются
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'  # Основной идентификатор пользователя — email
     REQUIRED_FIELDS = []  # Обязательные поля при создании пользователя
@@ -123,10 +143,57 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f'{self.first_name} {self.last_name} {self.email}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'role', 'is_active', 'is_staff'}.issubset(field_names):
+            instance._saved_claims = instance.token_claims()
+        return instance
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            # Пересчет хеша с новой стоимостью не считается сменой пароля и не отзывает токены
+            self.password = hashing.make_password(raw_password)
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            self.password = await hashing.amake_password(raw_password)
+            await self.asave(update_fields=['password'])
+
+        return await hashing.acheck_password(raw_password, self.password, setter)
+
+    def token_claims(self):
+        """
+        Данные пользователя, которые записываются в токен
+        """
+        return {'role': self.role, 'is_active': self.is_active, 'is_staff': self.is_staff}
+
+    def save(self, *args, **kwargs):
+        saved = getattr(self, '_saved_claims', None)
+        changed = self._password is not None or (saved is not None and saved != self.token_claims())
+        if changed and not self._state.adding:
+            # Пароль или данные из токена изменились: выданные ранее токены отзываются
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+            self._forget_token_version()
+        super().save(*args, **kwargs)
+        self._saved_claims = self.token_claims()
+
+    def _forget_token_version(self):
+        from .authentication import forget_token_version
+        transaction.on_commit(lambda: forget_token_version(self.pk))
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = "Список пользователей"
-        ordering = ('email',)
 
 
 class Company(models.Model):
@@ -145,7 +212,6 @@ class Company(models.Model):
     class Meta:
         verbose_name = 'Компания розничной торговли'
         verbose_name_plural = "Список компаний розничной торговли"
-        ordering = ('-name',)
 
     def __str__(self):
         return self.name
@@ -182,7 +248,6 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = "Список категорий"
-        ordering = ('-name',)
 
     def __str__(self):
         return self.name
@@ -201,15 +266,65 @@ class Product(models.Model):
     company = models.ForeignKey(Company, verbose_name="Поставщик",
                                 related_name='products', blank=True,
                                 on_delete=models.CASCADE)
+    # Хэш строки прайс-листа, по которому инкрементальный импорт находит изменившиеся товары
+    fingerprint = models.CharField(max_length=40, verbose_name='Отпечаток строки прайс-листа',
+                                   blank=True, editable=False)
+    # Полнотекстовый индекс по названию и описанию. В PostgreSQL заполняется триггером
+    # (миграция 0013), поэтому актуален и после bulk_create/update при импорте.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = "Список продуктов"
-        ordering = ('-name',)
+        # Порядок по умолчанию не задается: иначе ORDER BY добавляется и в exists(),
+        # проверки внешних ключей и массовые операции. Списки сортируют явно по индексу.
+        indexes = [
+            # Постраничный вывод каталога по ключу (name, id)
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            # Каталог поставщика по категории с тем же ключом сортировки
+            models.Index(fields=['company', 'category', 'name', 'id'], name='product_company_category_idx'),
+            # Только товары в наличии (фильтр in_stock)
+            models.Index(fields=['category', 'name', 'id'], name='product_in_stock_idx',
+                         condition=models.Q(quantity__gt=0)),
+        ]
 
     def __str__(self):
         return f'{self.name} {self.article}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем категорию и поставщика, чтобы при их смене пересчитать и старую строку сводки
+        instance._saved_group = (instance.__dict__.get('category_id'), instance.__dict__.get('company_id'))
+        return instance
+
+class CatalogSummary(models.Model):
+    """
+    Сводные показатели товаров категории у поставщика.
+    Пересчитывается при импорте прайс-листов и изменении остатков (см. backend.summary).
+    """
+    objects = models.Manager()
+    category = models.ForeignKey(Category, verbose_name='Категория', related_name='summaries',
+                                 on_delete=models.CASCADE)
+    company = models.ForeignKey(Company, verbose_name='Поставщик', related_name='summaries',
+                                on_delete=models.CASCADE)
+    product_count = models.PositiveIntegerField(verbose_name='Количество товаров', default=0)
+    in_stock_count = models.PositiveIntegerField(verbose_name='Товаров в наличии', default=0)
+    min_price = models.PositiveIntegerField(verbose_name='Минимальная цена', null=True, blank=True)
+    max_price = models.PositiveIntegerField(verbose_name='Максимальная цена', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Сводка по категории'
+        verbose_name_plural = "Сводки по категориям"
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'company'], name='unique_catalog_summary'),
+        ]
+
+    def __str__(self):
+        return f'{self.category_id} {self.company_id} {self.product_count}'
+
+
 class Property(models.Model):
     objects = models.Manager()
     name = models.CharField(max_length=30, verbose_name="Название", blank=False)
@@ -221,7 +336,6 @@ class Property(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['name', 'value'], name='unique_property'),
         ]
-        ordering = ('-name',)
 
     def __str__(self):
         return self.name
@@ -248,11 +362,60 @@ class ProductProperty(models.Model):
     def __str__(self):
         return f'{self.product.name} {self.property.name}'
 
+    def delete(self, *args, **kwargs):
+        """
+        Удаляем характеристику вместе с ее фасетом.
+        При удалении через QuerySet.delete() (импорт) и каскадно фасеты удаляются
+        отдельно: backend.facets.sync_facets или каскадом от товара и характеристики.
+        """
+        with transaction.atomic():
+            ProductFacet.objects.filter(product_id=self.product_id, property_id=self.property_id).delete()
+            self.invalidate_product()
+            return super().delete(*args, **kwargs)
+
+    def invalidate_product(self):
+        # Характеристики входят в карточку товара и в списки каталога
+        from .cache import catalog_cache
+        groups = Product.objects.filter(pk=self.product_id).values_list('category_id', 'company_id')
+        catalog_cache.invalidate_products([self.product_id], groups=list(groups))
+
+class ProductFacet(models.Model):
+    """
+    Типизированное значение характеристики товара для фасетного поиска.
+    Строится из ProductProperty (см. backend.facets): числовые значения
+    дополнительно хранятся в поле number для фильтрации по диапазону.
+    """
+    objects = models.Manager()
+    product = models.ForeignKey(Product, verbose_name='Продукт', related_name='facets',
+                                on_delete=models.CASCADE)
+    property = models.ForeignKey(Property, verbose_name="Характеристика", related_name='facets',
+                                 on_delete=models.CASCADE)
+    value = models.CharField(max_length=50, verbose_name="Значение параметра", blank=True)
+    number = models.DecimalField(max_digits=20, decimal_places=6, verbose_name="Числовое значение",
+                                 null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фасет продукта'
+        verbose_name_plural = "Фасеты продуктов"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'property'], name='unique_product_facet'),
+        ]
+        indexes = [
+            models.Index(fields=['property', 'value', 'product'], name='facet_value_idx'),
+            models.Index(fields=['property', 'number', 'product'], name='facet_number_idx',
+                         condition=models.Q(number__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.property_id} {self.value}'
+
+
 class Order(models.Model):
     objects = models.Manager()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default="new")
+    # Сумма заказа поддерживается приращениями при изменении строк заказа (см. OrderItem.save и signals)
     total_amount = models.PositiveIntegerField(default=0)
     user = models.ForeignKey(User, verbose_name='Покупатель', related_name='user',
                     blank=True, on_delete=models.CASCADE)
@@ -260,14 +423,22 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = "Список заказов"
+        indexes = [
+            # Заказы покупателя в статусе, новые первыми
+            models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_created_idx'),
+            # Незавершенные заказы (обработка поставщиком, массовая смена статуса)
+            models.Index(fields=['status', 'created_at'], name='order_active_idx',
+                         condition=models.Q(status__in=ACTIVE_STATUSES)),
+        ]
 
     def __str__(self):
         return f'{self.id} {self.status} {self.total_amount}'
 
 class OrderItem(models.Model):
     objects = models.Manager()
+    # Отдельный индекс по order не нужен: его заменяет составной индекс (order, product)
     order = models.ForeignKey(Order, verbose_name='Заказ', related_name='order',
-                    blank=True, on_delete=models.CASCADE)
+                    blank=True, on_delete=models.CASCADE, db_index=False)
     product = models.ForeignKey(Product, verbose_name='Товар', related_name='product',
                     blank=True, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0, verbose_name='Количество')
@@ -276,11 +447,73 @@ class OrderItem(models.Model):
     class Meta:
         verbose_name = 'Строка заказа'
         verbose_name_plural = "Список элементов заказа"
+        indexes = [
+            # Строки заказа и группировка по товарам без обращения к таблице
+            models.Index(fields=['order', 'product'], name='orderitem_order_product_idx'),
+        ]
 
     def __str__(self):
         return f'{self.product.name} {self.quantity} {self.total_cost}'
 
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем сохраненные в БД значения, чтобы при save() изменить сумму заказа на разницу
+        instance._saved_total = (instance.__dict__.get('order_id'), instance.__dict__.get('total_cost'))
+        return instance
+
     def save(self, *args, **kwargs):
         self.total_cost = self.product.price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        old_order_id, old_total_cost = getattr(self, '_saved_total', (None, None))
+        if self.pk is not None and (old_order_id is None or old_total_cost is None):
+            old_order_id, old_total_cost = next(iter(OrderItem.objects.filter(pk=self.pk).values_list(
+                'order_id', 'total_cost')), (None, None))
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_order_id is not None and old_order_id != self.order_id:
+                Order.objects.filter(pk=old_order_id).update(
+                    total_amount=F('total_amount') - int(old_total_cost or 0))
+                old_total_cost = 0
+            delta = int(self.total_cost) - int(old_total_cost or 0)
+            if delta:
+                Order.objects.filter(pk=self.order_id).update(total_amount=F('total_amount') + delta)
+        self._saved_total = (self.order_id, self.total_cost)
+
+
+class Job(models.Model):
+    """
+    Фоновая задача (см. backend.jobs)
+    """
+    objects = models.Manager()
+    task = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default='queued')
+    # Постановка задачи с ключом, пока задача с тем же ключом ждет первого запуска, не создает новую
+    key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Ключ объединения')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='Максимум попыток')
+    # Для ожидающей задачи - время запуска, для выполняющейся - конец аренды воркером
+    run_at = models.DateTimeField(verbose_name='Время запуска')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Список фоновых задач'
+        indexes = [
+            # Выборка воркером: только незавершенные задачи в порядке времени запуска
+            models.Index(fields=['run_at'], name='job_pending_idx',
+                         condition=models.Q(status__in=PENDING_JOB_STATUSES)),
+        ]
+        constraints = [
+            # Одна ожидающая задача на ключ. Повторы после ошибки (attempts > 0) не учитываются:
+            # их перевод обратно в очередь не должен конфликтовать с новой задачей
+            models.UniqueConstraint(fields=['key'], name='job_queued_key_unique',
+                                    condition=models.Q(status='queued', attempts=0)),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.task} {self.status}'
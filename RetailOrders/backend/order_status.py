@@ -0,0 +1,124 @@
+"""
+Переходы статусов заказа.
+
+new -> confirmed -> assembled -> sent -> delivered -> closed,
+до отправки заказ можно отменить (canceled).
+
+Поставщик меняет статус только заказов, все строки которых - его товары
+(иначе отмена вернула бы на склад товары других поставщиков), и не
+закрывает заказы: closed выставляют сотрудники.
+
+Массовая смена статуса выполняется пачками: одна блокирующая выборка
+подходящих заказов и один UPDATE на пачку, без загрузки и сохранения
+каждого заказа по отдельности.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .cache import catalog_cache
+from .models import STATUS_CHOICES, Order, OrderItem, Product
+from .tasks import refresh_summary_later
+
+TRANSITIONS = {
+    'new': ('confirmed', 'canceled'),
+    'confirmed': ('assembled', 'canceled'),
+    'assembled': ('sent', 'canceled'),
+    'sent': ('delivered',),
+    'delivered': ('closed',),
+    'closed': (),
+    'canceled': (),
+}
+
+STATUSES = tuple(status for status, _ in STATUS_CHOICES)
+
+# Статусы, которые может выставить поставщик
+SUPPLIER_TARGETS = ('confirmed', 'assembled', 'sent', 'delivered', 'canceled')
+
+
+class StatusTransitionError(ValueError):
+    """
+    Неизвестный статус заказа.
+    """
+
+
+def can_transition(source, target, role=None):
+    """
+    Разрешен ли переход
+    :param role: 'supplier' - переходы поставщика, None - все переходы (сотрудники, команды)
+    """
+    if target not in TRANSITIONS.get(source, ()):
+        return False
+    return role != 'supplier' or target in SUPPLIER_TARGETS
+
+
+def allowed_predecessors(target, role=None):
+    """
+    Статусы, из которых разрешен переход в target
+    :param target: новый статус
+    :param role: роль пользователя (см. can_transition)
+    :return: кортеж статусов
+    """
+    if target not in STATUSES:
+        raise StatusTransitionError(f'Неизвестный статус: {target}')
+    return tuple(source for source in TRANSITIONS if can_transition(source, target, role))
+
+
+def supplier_orders(user_id):
+    """
+    Заказы, все строки которых - товары компаний пользователя
+    """
+    foreign = OrderItem.objects.exclude(product__company__owner_id=user_id).values('order_id')
+    return Order.objects.filter(order__product__company__owner_id=user_id).exclude(id__in=foreign)
+
+
+def _release_stock(order_ids):
+    """
+    Возвращаем на склад товары отмененных заказов.
+    Товары обновляются в порядке возрастания id, как и при резервировании.
+    """
+    returned = (OrderItem.objects.filter(order_id__in=order_ids)
+                .values('product_id', 'product__category_id', 'product__company_id')
+                .annotate(total=Sum('quantity')).order_by('product_id'))
+    product_ids, pairs = [], set()
+    for row in returned:
+        Product.objects.filter(id=row['product_id']).update(quantity=F('quantity') + row['total'])
+        product_ids.append(row['product_id'])
+        pairs.add((row['product__category_id'], row['product__company_id']))
+    catalog_cache.invalidate_products(product_ids)
+    refresh_summary_later(pairs)
+
+
+def bulk_transition(order_ids, target, queryset=None, batch_size=1000, role=None):
+    """
+    Переводим заказы в новый статус
+    :param order_ids: id заказов
+    :param target: новый статус
+    :param queryset: заказы, доступные пользователю (по умолчанию все, для поставщика - supplier_orders)
+    :param batch_size: количество заказов в одном UPDATE
+    :param role: роль пользователя (см. can_transition)
+    :return: (id переведенных заказов, id отклоненных заказов)
+    """
+    predecessors = allowed_predecessors(target, role)
+    scope = Order.objects.all() if queryset is None else queryset
+    order_ids = list(dict.fromkeys(order_ids))
+    if not predecessors:
+        return [], order_ids
+
+    updated = []
+    for start in range(0, len(order_ids), batch_size):
+        batch = order_ids[start:start + batch_size]
+        with transaction.atomic():
+            ids = list(
+                Order.objects.select_for_update()
+                .filter(id__in=batch, status__in=predecessors)
+                .filter(id__in=scope.values('id'))
+                .order_by('id').values_list('id', flat=True))
+            if ids:
+                Order.objects.filter(id__in=ids).update(status=target, updated_at=timezone.now())
+                if target == 'canceled':
+                    _release_stock(ids)
+        updated.extend(ids)
+
+    accepted = set(updated)
+    return updated, [order_id for order_id in order_ids if order_id not in accepted]
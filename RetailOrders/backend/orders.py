@@ -0,0 +1,83 @@
+"""
+Оформление заказа.
+
+Остатки резервируются условным UPDATE
+``quantity = quantity - n WHERE id = ... AND quantity >= n`` без чтения
+и последующей записи, поэтому параллельные заказы одного товара не могут
+уйти в минус. Товары блокируются в порядке возрастания id, что исключает
+взаимные блокировки между заказами с одинаковыми товарами.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+
+from .cache import catalog_cache
+from .models import Order, OrderItem, Product
+from .tasks import refresh_summary_later
+
+
+class CheckoutError(Exception):
+    """
+    Заказ не может быть оформлен. errors: {id товара: причина}
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def place_order(user, items):
+    """
+    Оформляем заказ одной транзакцией
+    :param user: покупатель
+    :param items: итератор пар (id товара, количество)
+    :return: созданный заказ
+    """
+    basket = defaultdict(int)
+    for product_id, quantity in items:
+        basket[product_id] += quantity
+    if not basket:
+        raise CheckoutError({'items': 'Корзина пуста'})
+
+    with transaction.atomic():
+        order = Order.objects.create(user_id=user.id)
+
+        reserved = {
+            product_id: Product.objects.filter(
+                id=product_id, quantity__gte=basket[product_id]
+            ).update(quantity=F('quantity') - basket[product_id])
+            for product_id in sorted(basket)
+        }
+        # Строки товаров уже заблокированы резервированием, цены читаются актуальные
+        products = {
+            product_id: (price, state_orders, (category_id, company_id))
+            for product_id, price, state_orders, category_id, company_id in
+            Product.objects.filter(id__in=basket).values_list('id', 'price', 'company__state_orders',
+                                                               'category_id', 'company_id')
+        }
+
+        errors = {}
+        for product_id in basket:
+            if product_id not in products:
+                errors[product_id] = 'Товар не найден'
+            elif not products[product_id][1]:
+                errors[product_id] = 'Поставщик не принимает заказы'
+            elif not reserved[product_id]:
+                errors[product_id] = 'Недостаточно товара на складе'
+        if errors:
+            # Исключение откатывает заказ и все резервирования
+            raise CheckoutError(errors)
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=quantity,
+                      total_cost=products[product_id][0] * quantity)
+            for product_id, quantity in basket.items()
+        ])
+        Order.objects.filter(pk=order.pk).update(total_amount=Subquery(
+            OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+                total=Sum('total_cost')).values('total')))
+        order.refresh_from_db(fields=['total_amount'])
+        catalog_cache.invalidate_products(basket)
+        refresh_summary_later(product[2] for product in products.values())
+    return order
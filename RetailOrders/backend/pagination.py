@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу (seek pagination).
+    Вместо OFFSET следующая страница выбирается условием
+    (name, id) > (последнее name, последний id), поэтому стоимость запроса
+    не зависит от номера страницы при наличии индекса по полям ordering.
+    """
+    ordering = ('name', 'id')
+    # Типы значений полей ordering в курсоре
+    position_types = (str, int)
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+
+        # Одна лишняя строка показывает, есть ли следующая страница.
+        # View может загрузить строки сам (load_rows), например сразу словарями для вывода
+        load = getattr(view, 'load_rows', list)
+        rows = load(queryset[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = [self.position_value(rows[-1], field) for field in self.ordering] \
+            if self.has_next else None
+        return rows
+
+    @staticmethod
+    def position_value(row, field):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    def seek_filter(self, position):
+        """
+        (a, b, c) > (x, y, z)  =>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            term = Q(**{f'{field}__gt': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                term &= Q(**{previous: value})
+            condition |= term
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (UnicodeEncodeError, binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Значения попадают в условие запроса: значение другого типа дало бы ошибку базы, а не 404
+        for value, value_type in zip(position, self.position_types):
+            if not isinstance(value, value_type) or isinstance(value, bool):
+                raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position, ensure_ascii=False).encode()).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,42 @@
+"""
+JSON-рендерер на orjson с тем же выводом, что у rest_framework JSONRenderer.
+
+orjson - необязательная зависимость: без него используется стандартный
+рендерер DRF. Типы, которые orjson выводит иначе, чем JSONEncoder DRF
+(datetime, date, time, подклассы str/int/dict, dataclass), передаются в
+JSONEncoder.default, разделители U+2028/U+2029 экранируются так же, как
+в DRF. Отличается только запись float в экспоненциальной форме (1e16
+вместо 1e+16). Форматированный вывод (indent) и настройки, отключающие
+компактный вывод или UTF-8, обрабатываются стандартным рендерером.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+               | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, выполняющий кодирование через orjson, если он установлен
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not (self.compact and api_settings.UNICODE_JSON):
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+        try:
+            ret = orjson.dumps(data, default=encoder.default, option=OPTIONS)
+        except TypeError:
+            # Например, целые больше 64 бит
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
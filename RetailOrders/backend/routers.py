@@ -0,0 +1,109 @@
+"""
+Чтение каталога и отчетов с реплик базы данных.
+
+Реплики перечисляются в настройке DATABASE_REPLICAS. На реплику уходят
+только чтения моделей из READ_MODELS (и REPORT_MODELS для выгрузок) и только внутри запроса
+(ReplicaPinningMiddleware) или блока replica_reads(); записи, чтения
+внутри транзакции и все чтения после первой записи в запросе выполняются
+на основной базе. После записи пользователь еще REPLICA_STICKY_SECONDS
+читает с основной базы, чтобы видеть свои изменения, пока реплики
+догоняют (например, остатки сразу после оформления заказа).
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Каталог и отчеты, допускающие чтение с небольшой задержкой репликации
+READ_MODELS = frozenset({
+    'backend.product',
+    'backend.category',
+    'backend.property',
+    'backend.productproperty',
+    'backend.company',
+    'backend.catalogsummary',
+    'backend.productfacet',
+})
+
+# Заказы читаются с реплики только выгрузками отчетов (router.db_for_read(..., report=True)):
+# остальные чтения заказов в запросах предшествуют их изменению и должны видеть последнее состояние
+REPORT_MODELS = frozenset({
+    'backend.order',
+    'backend.orderitem',
+})
+
+# Состояние маршрутизации текущего запроса. Словарь изменяется на месте,
+# поэтому запись в потоке sync_to_async видна и в вызывающем контексте.
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """
+    Разрешаем чтение с реплик внутри блока
+    :param pinned: читать с основной базы с самого начала (липкое окно после записи)
+    :return: состояние {'pinned': ..., 'written': ...}
+    """
+    token = _state.set({'pinned': pinned, 'written': False})
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Чтения внутри блока выполняются на основной базе (например, заполнение кэша)
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    pinned, state['pinned'] = state['pinned'], True
+    try:
+        yield
+    finally:
+        state['pinned'] = pinned or state['written']
+
+
+def replica_alias():
+    """
+    Псевдоним случайной реплики (основная база, если реплик нет)
+    """
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор чтения каталога с реплик
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['pinned']:
+            return None
+        label = model._meta.label_lower
+        if label not in READ_MODELS and not (hints.get('report') and label in REPORT_MODELS):
+            return None
+        if not settings.DATABASE_REPLICAS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['pinned'] = state['written'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,59 @@
+"""
+Поиск товаров по названию и описанию.
+
+В PostgreSQL используется полнотекстовый индекс Product.search_vector
+(GIN, заполняется триггером) с ранжированием, а если по словам ничего
+не найдено - поиск по триграммам названия, который прощает опечатки.
+Для остальных СУБД (SQLite в тестах) выполняется поиск по подстроке.
+"""
+from functools import reduce
+from operator import and_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+# Конфигурация должна совпадать с триггером из миграции 0013_product_search_vector
+SEARCH_CONFIG = 'russian'
+
+
+def _full_text(queryset, text):
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return (queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', 'id'))
+
+
+def _trigram(queryset, text):
+    # Оператор % (name__trigram_similar) использует индекс product_name_trgm_idx
+    return (queryset.filter(name__trigram_similar=text)
+            .annotate(rank=TrigramSimilarity('name', text))
+            .order_by('-rank', 'id'))
+
+
+def _substring(queryset, text):
+    terms = text.split()
+    condition = reduce(and_, (Q(name__icontains=term) | Q(description__icontains=term) for term in terms))
+    return (queryset.filter(condition)
+            .annotate(rank=Case(When(name__icontains=text, then=Value(1)), default=Value(0),
+                                output_field=IntegerField()))
+            .order_by('-rank', 'id'))
+
+
+def search_products(queryset, text, limit):
+    """
+    Поиск товаров
+    :param queryset: товары, среди которых выполняется поиск
+    :param text: поисковая строка
+    :param limit: максимальное количество результатов
+    :return: список товаров, отсортированный по релевантности
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if connections[queryset.db].vendor != 'postgresql':
+        return list(_substring(queryset, text)[:limit])
+    found = list(_full_text(queryset, text)[:limit])
+    if not found:
+        found = list(_trigram(queryset, text)[:limit])
+    return found
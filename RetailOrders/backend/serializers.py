@@ -1,6 +1,100 @@
 from rest_framework import serializers
-from .models import User, Contact, Company, Category, Product, Property, ProductProperty, Order, OrderItem
+from .models import User, Contact, Company, Category, Product, Property, ProductProperty, Order, OrderItem, \
+    STATUS_CHOICES
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .authentication import VERSION_CLAIM, add_user_claims, check_token_version
+from .tokens import CachedRefreshToken
+
+
+def _get_relation(model, attr):
+    """
+    Поле модели по имени атрибута, в том числе обратная связь по имени
+    менеджера без related_name ('company_set')
+    """
+    try:
+        return model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == attr:
+                return relation
+        raise
+
+
+def _related_lookups(serializer, model):
+    """
+    Собираем связи, которые читает сериализатор при выводе.
+    Прямые ForeignKey/OneToOne идут в select_related, обратные связи и
+    ManyToMany - в Prefetch, queryset которого подготавливается тем же
+    способом для вложенного сериализатора.
+    :return: (список путей для select_related, список Prefetch)
+    """
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        is_nested = isinstance(nested, serializers.ModelSerializer)
+        # Для простых полей последний атрибут - это значение, а не связь ('property.name')
+        attrs = field.source_attrs if is_nested else field.source_attrs[:-1]
+
+        current, path, prefetched = model, [], False
+        for attr in attrs:
+            try:
+                relation = _get_relation(current, attr)
+            except FieldDoesNotExist:
+                break
+            if not relation.is_relation:
+                break
+            path.append(attr)
+            current = relation.related_model
+            if relation.one_to_many or relation.many_to_many:
+                lookup = '__'.join(path)
+                if is_nested and len(path) == len(attrs):
+                    queryset = _eager_load(nested, current._default_manager.all())
+                    prefetch.append(Prefetch(lookup, queryset=queryset))
+                else:
+                    prefetch.append(lookup)
+                prefetched = True
+                break
+
+        if path and not prefetched:
+            lookup = '__'.join(path)
+            select.append(lookup)
+            if is_nested and len(path) == len(attrs):
+                nested_select, nested_prefetch = _related_lookups(nested, current)
+                select.extend(f'{lookup}__{item}' for item in nested_select)
+                prefetch.extend(
+                    Prefetch(f'{lookup}__{item.prefetch_through}', queryset=item.queryset)
+                    if isinstance(item, Prefetch) else f'{lookup}__{item}'
+                    for item in nested_prefetch)
+    return select, prefetch
+
+
+def _eager_load(serializer, queryset):
+    select, prefetch = _related_lookups(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    Подготовка queryset для ModelSerializer: по объявленным вложенным
+    сериализаторам и полям вида source='relation.field' добавляются нужные
+    select_related/prefetch_related, чтобы вывод списка не выполнял
+    отдельный запрос на каждую строку и каждый уровень вложенности.
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return _eager_load(cls(), queryset)
 
 
 class CompanySerializer(serializers.ModelSerializer):
@@ -26,10 +120,43 @@ class ContactSerializer(serializers.ModelSerializer):
         }
 
 
+class ContactDataSerializer(ContactSerializer):
+    """
+    Контакт без поля user: владелец задается из токена, поэтому
+    проверка данных не обращается к базе
+    """
+    class Meta(ContactSerializer.Meta):
+        fields = ('id', 'phone', 'city', 'street', 'structure', 'building', 'apartment')
+
+
+class ContactBatchSerializer(serializers.Serializer):
+    """
+    Пакет изменений контактов: новые контакты, изменения (с id) и id удаляемых
+    """
+    MAX_ITEMS = 1000
+
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
 
-class UserSerializer(serializers.ModelSerializer):
+    def validate_update(self, value):
+        for item in value:
+            if not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+                raise serializers.ValidationError(_('Each item must contain an integer id.'))
+        return value
+
+    def validate(self, attrs):
+        total = sum(len(attrs[key]) for key in ('create', 'update', 'delete'))
+        if not total:
+            raise serializers.ValidationError(_('The batch is empty.'))
+        if total > self.MAX_ITEMS:
+            raise serializers.ValidationError(_('No more than %(max)d items per batch.') % {'max': self.MAX_ITEMS})
+        return attrs
+
+
+class UserSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     contacts = ContactSerializer(read_only=True, many=True)
-    company = CompanySerializer(read_only=True, many=True)
+    company = CompanySerializer(source='company_set', read_only=True, many=True)
 
     class Meta:
         model = User
@@ -90,6 +217,45 @@ class UserChangePasswordSerializer(serializers.Serializer):
         return instance
 
 
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Выдача токенов с ролью, статусом и версией токенов пользователя
+    """
+    token_class = CachedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление токенов: refresh-токен отозванной версии не принимается.
+    Смена статуса пользователя меняет версию, поэтому пользователь
+    из базы не загружается.
+    """
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if VERSION_CLAIM not in refresh:
+            return super().validate(attrs)
+        check_token_version(refresh)
+        if not refresh.get('is_active'):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -97,7 +263,7 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     company = CompanySerializer(read_only=True)
 
@@ -111,7 +277,29 @@ class PropertySerializer(serializers.ModelSerializer):
         fields = ('name', 'value')
 
 
-class ProductPropertySerializer(serializers.ModelSerializer):
+class ProductParameterSerializer(serializers.ModelSerializer):
+    """
+    Характеристика в карточке товара: название, единица измерения и значение
+    """
+    name = serializers.CharField(source='property.name', read_only=True)
+    unit = serializers.CharField(source='property.value', read_only=True)
+
+    class Meta:
+        model = ProductProperty
+        fields = ('name', 'unit', 'quantity')
+
+
+class ProductCatalogSerializer(ProductSerializer):
+    """
+    Товар в каталоге вместе с характеристиками
+    """
+    properties = ProductParameterSerializer(source='products', read_only=True, many=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ('id',) + ProductSerializer.Meta.fields + ('properties',)
+
+
+class ProductPropertySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     property = PropertySerializer(read_only=True)
     class Meta:
@@ -119,7 +307,7 @@ class ProductPropertySerializer(serializers.ModelSerializer):
         fields = ('product', 'property', 'quantity')
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(write_only=True)
     class Meta:
         model = Order
@@ -127,10 +315,30 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     order = OrderSerializer(read_only=True)
     product = ProductSerializer(read_only=True)
     class Meta:
         model = OrderItem
         fields = ('id', 'order', 'product', 'quantity', 'total_cost')
-        read_only_fields = ('id')
\ No newline at end of file
+        read_only_fields = ('id',)
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    Корзина для оформления заказа
+    """
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+
+
+class OrderStatusSerializer(serializers.Serializer):
+    """
+    Массовая смена статуса заказов
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES)
@@ -0,0 +1,67 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import facets
+from .cache import catalog_cache
+from .models import Category, Company, Order, OrderItem, Product, ProductFacet, ProductProperty, Property
+from .tasks import refresh_summary_later
+
+
+@receiver(post_delete, sender=OrderItem)
+def subtract_order_item(sender, instance, **kwargs):
+    """
+    Уменьшаем сумму заказа на стоимость удаленной строки.
+    Сигнал срабатывает и при удалении через QuerySet.delete() и каскадно.
+    """
+    if instance.total_cost:
+        Order.objects.filter(pk=instance.order_id).update(
+            total_amount=F('total_amount') - int(instance.total_cost))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    # Списки новой и прежней категории/поставщика (_saved_group обновляет refresh_product_summary)
+    groups = {(instance.category_id, instance.company_id), getattr(instance, '_saved_group', (None, None))}
+    catalog_cache.invalidate_products([instance.pk], groups=[group for group in groups if group != (None, None)])
+
+
+# Удаление характеристики обрабатывается в ProductProperty.delete(): обработчик post_delete
+# отключил бы быстрое удаление характеристик запросом при импорте и каскадно
+@receiver(post_save, sender=ProductProperty)
+def invalidate_product_property(sender, instance, **kwargs):
+    instance.invalidate_product()
+
+
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_company(sender, instance, **kwargs):
+    catalog_cache.invalidate_company(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    catalog_cache.invalidate_category(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_properties(sender, instance, **kwargs):
+    catalog_cache.invalidate_properties()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def refresh_product_summary(sender, instance, **kwargs):
+    """
+    Пересчитываем сводку каталога для новой и прежней категории/поставщика товара (фоновой задачей).
+    """
+    pairs = {(instance.category_id, instance.company_id), getattr(instance, '_saved_group', (None, None))}
+    instance._saved_group = (instance.category_id, instance.company_id)
+    refresh_summary_later(pairs)
+
+
+@receiver(post_save, sender=ProductProperty)
+def save_product_facet(sender, instance, **kwargs):
+    facet = facets.build_facet(instance.product_id, instance.property_id, instance.quantity)
+    ProductFacet.objects.update_or_create(
+        product_id=facet.product_id, property_id=facet.property_id,
+        defaults={'value': facet.value, 'number': facet.number})
+
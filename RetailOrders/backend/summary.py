@@ -0,0 +1,68 @@
+"""
+Сводка каталога (CatalogSummary): количество товаров, товаров в наличии,
+минимальная и максимальная цена по паре (категория, поставщик).
+
+Строки сводки пересчитываются только для затронутых пар одним GROUP BY
+и upsert-запросом, поэтому чтение сводки не зависит от размера каталога.
+После изменений каталога пересчет выполняется фоновыми задачами (backend.tasks).
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+
+from .models import CatalogSummary, Product
+
+# Количество пар (категория, поставщик) в одном запросе пересчета
+PAIRS_BATCH_SIZE = 200
+
+
+def _refresh(products_filter, summary_filter=None):
+    rows = (Product.objects.filter(products_filter)
+            .values('category_id', 'company_id')
+            .annotate(product_count=Count('id'), in_stock_count=Count('id', filter=Q(quantity__gt=0)),
+                      min_price=Min('price'), max_price=Max('price')))
+    summaries = [CatalogSummary(**row) for row in rows]
+    with transaction.atomic():
+        CatalogSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['category', 'company'],
+            update_fields=['product_count', 'in_stock_count', 'min_price', 'max_price', 'updated_at'],
+        )
+        if summary_filter is not None:
+            # Пары, в которых не осталось товаров
+            CatalogSummary.objects.filter(summary_filter).exclude(reduce(
+                or_, (Q(category_id=item.category_id, company_id=item.company_id) for item in summaries), Q(pk=None)
+            )).delete()
+
+
+def refresh_companies(company_ids):
+    """
+    Пересчитываем сводку всех категорий поставщиков (после импорта прайс-листа)
+    :param company_ids: id поставщиков
+    """
+    for company_id in set(company_ids):
+        _refresh(Q(company_id=company_id), Q(company_id=company_id))
+
+
+def refresh_pairs(pairs):
+    """
+    Пересчитываем сводку для пар (id категории, id поставщика)
+    :param pairs: итератор пар
+    """
+    pairs = sorted({pair for pair in pairs if None not in pair})
+    for start in range(0, len(pairs), PAIRS_BATCH_SIZE):
+        condition = reduce(or_, (Q(category_id=category_id, company_id=company_id)
+                                 for category_id, company_id in pairs[start:start + PAIRS_BATCH_SIZE]))
+        _refresh(condition, condition)
+
+
+def refresh_all():
+    """
+    Полный пересчет сводки
+    """
+    with transaction.atomic():
+        CatalogSummary.objects.all().delete()
+        _refresh(Q())
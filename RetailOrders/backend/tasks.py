@@ -0,0 +1,52 @@
+"""
+Фоновые задачи проекта (см. backend.jobs).
+
+Пересчет сводки каталога после оформления заказа, смены статусов и
+импорта прайс-листа выполняется воркером, а не в потоке HTTP-запроса.
+Все задачи идемпотентны: сводка пересчитывается по текущему состоянию
+товаров, поэтому повтор дает тот же результат. Пересчет ставится в
+очередь с ключом пары (категория, поставщик) или поставщика, поэтому на
+пару, ожидающую пересчета, в очереди одна задача. Задачи прежнего
+пересчета по id товаров (summary.refresh_products) заменены задачами
+по парам миграцией 0020_rewrite_legacy_summary_jobs.
+"""
+from . import summary
+from .cache import catalog_cache
+from .jobs import task
+
+
+@task(name='summary.refresh_pairs')
+def refresh_summary_for_pairs(pairs):
+    """
+    Сводка пар (id категории, id поставщика)
+    :param pairs: список пар
+    """
+    summary.refresh_pairs(tuple(pair) for pair in pairs)
+    catalog_cache.invalidate_summary()
+
+
+@task(name='summary.refresh_companies')
+def refresh_summary_for_companies(company_ids):
+    """
+    Сводка всех категорий поставщиков (после импорта прайс-листа)
+    :param company_ids: id поставщиков
+    """
+    summary.refresh_companies(company_ids)
+    catalog_cache.invalidate_summary()
+
+
+def refresh_summary_later(pairs):
+    """
+    Ставим в очередь пересчет сводки: одна ожидающая задача на пару
+    :param pairs: итератор пар (id категории, id поставщика)
+    """
+    for category_id, company_id in sorted({tuple(pair) for pair in pairs if None not in pair}):
+        refresh_summary_for_pairs.enqueue(key=f'summary:pair:{category_id}:{company_id}',
+                                          pairs=[[category_id, company_id]])
+
+
+def refresh_company_summary_later(company_id):
+    """
+    Ставим в очередь пересчет сводки поставщика
+    """
+    refresh_summary_for_companies.enqueue(key=f'summary:company:{company_id}', company_ids=[company_id])
@@ -0,0 +1,86 @@
+"""
+Асинхронные view профиля и контактов (backend.async_views), подключенные через URLconf
+"""
+import importlib
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, resolve
+
+from backend.async_views import AsyncContactsView
+from backend.models import Contact, User
+from backend.tests.utils import auth_headers
+
+CONTACT = {'phone': '+79990000000', 'city': 'Москва', 'street': 'Тверская', 'structure': '', 'building': '1',
+           'apartment': '10'}
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # URLconf выбирает view при импорте; после тестов (и отмены настройки) загружается заново
+        cls.addClassCleanup(cls.reload_urls)
+        cls.reload_urls()
+
+    @staticmethod
+    def reload_urls():
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password', first_name='Иван')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        cls.contact = Contact.objects.create(user=cls.user, **CONTACT)
+        Contact.objects.create(user=cls.other, **CONTACT)
+
+    def setUp(self):
+        self.headers = auth_headers(self.user)
+
+    def test_async_views_are_routed(self):
+        self.assertIs(resolve('/api/user/contact').func.view_class, AsyncContactsView)
+
+    def test_profile(self):
+        response = self.client.get('/api/user/retrieveupdate', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Иван')
+
+        response = self.client.put('/api/user/retrieveupdate', data={'last_name': 'Петров'},
+                                   content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_name, 'Петров')
+
+    def test_contacts(self):
+        response = self.client.get('/api/user/contact', **self.headers)
+        self.assertEqual([contact['id'] for contact in response.json()], [self.contact.id])
+
+        response = self.client.post('/api/user/contact', data=dict(CONTACT, city='Казань'),
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Contact.objects.filter(user=self.user, city='Казань').exists())
+        response = self.client.post('/api/user/contact', data='{', content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_contact_detail(self):
+        path = f'/api/user/contact/{self.contact.id}/'
+        response = self.client.put(path, data={'city': 'Казань'}, content_type='application/json', **self.headers)
+        self.assertEqual((response.status_code, response.json()['city']), (200, 'Казань'))
+        # Чужой контакт не найден
+        self.assertEqual(self.client.get(path, **auth_headers(self.other)).status_code, 404)
+        self.assertEqual(self.client.delete(path, **self.headers).status_code, 204)
+        self.assertEqual(self.client.delete(path, **self.headers).status_code, 404)
+
+    def test_authentication_required(self):
+        response = self.client.get('/api/user/contact')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        self.assertEqual(self.client.patch('/api/user/contact', **self.headers).status_code, 405)
+
+    def test_options_without_token(self):
+        response = self.client.options('/api/user/contact')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response['Allow'].split(', ')), {'GET', 'HEAD', 'POST', 'OPTIONS'})
@@ -0,0 +1,106 @@
+"""
+Набор данных и микробенчмарки API (backend.benchmarks, команда bench_api)
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase
+
+from backend.benchmarks.api import MIN_LATENCY_DELTA_MS, compare
+from backend.benchmarks.seed import cleanup, sample, seed
+from backend.models import CatalogSummary, Company, Order, OrderItem, Product, ProductFacet, ProductProperty, User
+
+RESULT = {'queries': 3, 'p50_ms': 10.0, 'p95_ms': 20.0, 'alloc_kb': 100.0}
+
+
+class CompareTests(SimpleTestCase):
+
+    def test_no_regressions(self):
+        results = {'a': dict(RESULT, p95_ms=24.0, alloc_kb=120.0), 'new': dict(RESULT, queries=50)}
+        # Сценарии без базового замера не сравниваются
+        self.assertEqual(compare(results, {'a': RESULT}), [])
+
+    def test_query_growth_is_regression(self):
+        self.assertEqual(compare({'a': dict(RESULT, queries=4)}, {'a': RESULT}), ['a: запросов 3 -> 4'])
+
+    def test_latency_and_memory_tolerance(self):
+        regressions = compare({'a': dict(RESULT, p95_ms=26.0, alloc_kb=130.0)}, {'a': RESULT})
+        self.assertEqual(regressions, ['a: p95 20.0 -> 26.0 мс', 'a: память 100.0 -> 130.0 КБ'])
+        self.assertEqual(compare({'a': dict(RESULT, p95_ms=26.0)}, {'a': RESULT}, tolerance=0.5), [])
+
+    def test_small_latency_delta_is_noise(self):
+        base = dict(RESULT, p95_ms=1.0)
+        self.assertEqual(compare({'a': dict(base, p95_ms=1.0 + MIN_LATENCY_DELTA_MS)}, {'a': base}), [])
+        self.assertEqual(len(compare({'a': dict(base, p95_ms=1.1 + MIN_LATENCY_DELTA_MS)}, {'a': base})), 1)
+
+
+class SeedTests(TestCase):
+
+    def test_seed_sample_and_cleanup(self):
+        data = seed(products=40, batch_size=15, prefix='test')
+        self.assertEqual(data['rows'], {'users': 10, 'contacts': 20, 'companies': 2, 'categories': 5,
+                                        'properties': 6, 'products': 40, 'product_properties': 120,
+                                        'product_facets': 120, 'orders': 10,
+                                        'order_items': OrderItem.objects.count()})
+        self.assertEqual(ProductFacet.objects.count(), ProductProperty.objects.count())
+        self.assertEqual(sum(CatalogSummary.objects.values_list('product_count', flat=True)), 40)
+        # Суммы заказов вычислены при генерации
+        totals = Order.objects.annotate(items_total=Sum('order__total_cost')).values_list('total_amount', 'items_total')
+        self.assertTrue(all(total == items_total for total, items_total in totals))
+
+        self.assertEqual(sample('test'), {key: value for key, value in data.items() if key != 'rows'})
+        self.assertEqual(User.objects.get(pk=data['supplier_id']).role, 'supplier')
+        with self.assertRaises(LookupError):
+            sample('missing')
+
+        cleanup('test')
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Company.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_seed_is_deterministic(self):
+        first = seed(products=20, prefix='one')
+        second = seed(products=20, prefix='two')
+        names = [list(Product.objects.filter(company__name__startswith=f'Поставщик {prefix}-')
+                      .order_by('article').values_list('name', 'price', 'quantity'))
+                 for prefix in (first['prefix'], second['prefix'])]
+        self.assertEqual(names[0], names[1])
+
+
+class BenchApiCommandTests(TestCase):
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command('bench_api', products=30, iterations=2, warmup=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_all_scenarios_and_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            output = self.run_command(save_baseline=path)
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+            self.assertIn('Базовый замер сохранен', output)
+            self.assertEqual(baseline['environment']['products'], 30)
+            self.assertIn('order.checkout', baseline['results'])
+            # Временный набор данных удален
+            self.assertFalse(Product.objects.exists())
+
+            for result in baseline['results'].values():
+                result['queries'] = 0
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, 'contacts.list: запросов 0 ->'):
+                self.run_command(scenario=['contacts.list'], baseline=path)
+
+    def test_scenario_selection(self):
+        output = self.run_command(scenario=['contacts'])
+        self.assertIn('contacts.list', output)
+        self.assertIn('contacts.batch', output)
+        self.assertNotIn('contact.detail', output)
+        with self.assertRaises(CommandError):
+            self.run_command(scenario=['missing'])
@@ -0,0 +1,68 @@
+"""
+Кэш каталога и его инвалидация (backend.cache)
+"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from backend.cache import PRODUCT_LISTS, product_list_scopes
+from backend.models import Product
+from backend.tests.utils import OrderTestCase
+
+
+class ProductListScopeTests(TestCase):
+
+    def test_query_values_are_normalized(self):
+        self.assertEqual(product_list_scopes(category_id='05'), ('products:category:5',))
+        self.assertEqual(product_list_scopes(category_id=' 5 '), product_list_scopes(category_id=5))
+        self.assertEqual(product_list_scopes(company_id='abc'), (PRODUCT_LISTS,))
+        self.assertEqual(product_list_scopes(company_id='2', category_id='x'), ('products:company:2',))
+
+
+# Отдельный кэш без вытеснения: сброс накопленных метрик запросов (backend.instrumentation)
+# в кэш с MAX_ENTRIES по умолчанию может вытеснить проверяемые записи
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'catalog-cache-tests', 'OPTIONS': {'MAX_ENTRIES': 100000}}})
+class CatalogCacheTests(OrderTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()['results']]
+
+    def rename(self, product, name):
+        product = Product.objects.get(pk=product.pk)
+        product.name = name
+        # Инвалидация выполняется после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+    def test_product_save_invalidates_filtered_lists(self):
+        category_id = self.phone.category_id
+        paths = ['/api/products', f'/api/products?category={category_id}', f'/api/products?category=0{category_id}',
+                 f'/api/products?company={self.phone.company_id}&limit=10']
+        for path in paths:
+            self.assertIn('Телефон', self.names(path))
+        self.rename(self.phone, 'Смартфон')
+        for path in paths:
+            with self.subTest(path):
+                self.assertIn('Смартфон', self.names(path))
+
+    def test_other_lists_stay_cached(self):
+        path = f'/api/products?company={self.cable.company_id}'
+        self.assertEqual(self.names(path), ['Кабель'])
+        Product.objects.filter(pk=self.cable.pk).update(name='Провод')
+        self.rename(self.phone, 'Смартфон')
+        self.assertEqual(self.names(path), ['Кабель'])
+
+    def test_checkout_leaves_lists_to_ttl(self):
+        path = f'/api/products?category={self.phone.category_id}'
+        quantity = {product['name']: product['quantity'] for product in self.client.get(path).json()['results']}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.checkout((self.phone, 2)).status_code, 201)
+        cached = {product['name']: product['quantity'] for product in self.client.get(path).json()['results']}
+        self.assertEqual(cached, quantity)
+        # Карточка товара сбрасывается сразу
+        self.assertEqual(self.client.get(f'/api/products/{self.phone.id}').json()['quantity'], 3)
@@ -0,0 +1,91 @@
+"""
+Сводка каталога по категориям и поставщикам (backend.summary)
+"""
+from django.core.cache import cache
+from django.test import override_settings
+
+from backend import summary
+from backend.jobs import run_pending
+from backend.models import CatalogSummary, Category, Job, Product
+from backend.tests.utils import OrderTestCase
+
+
+@override_settings(JOBS_EXECUTOR='worker')
+class CatalogSummaryTests(OrderTestCase):
+
+    def setUp(self):
+        cache.clear()
+        Job.objects.all().delete()
+        summary.refresh_all()
+
+    def row(self, product):
+        item = CatalogSummary.objects.get(category_id=product.category_id, company_id=product.company_id)
+        return item.product_count, item.in_stock_count, item.min_price, item.max_price
+
+    def save(self, product, **fields):
+        product = Product.objects.get(pk=product.pk)
+        for name, value in fields.items():
+            setattr(product, name, value)
+        product.save()
+        self.refresh()
+        return product
+
+    def refresh(self):
+        # Пересчет выполняет воркер, кэш сводки сбрасывается после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            run_pending()
+
+    def test_refresh_all(self):
+        self.assertEqual(self.row(self.phone), (2, 2, 30, 100))
+        self.assertEqual(self.row(self.cable), (1, 1, 20, 20))
+        self.assertEqual(CatalogSummary.objects.count(), 2)
+
+    def test_product_change_refreshes_pair(self):
+        self.save(self.case, quantity=0, price=150)
+        self.assertEqual(self.row(self.phone), (2, 1, 100, 150))
+        # Сводка другого поставщика не пересчитывается
+        self.assertEqual(self.row(self.cable), (1, 1, 20, 20))
+
+    def test_category_change_refreshes_old_and_new_pair(self):
+        category = Category.objects.create(name='Аксессуары')
+        self.save(self.case, category=category)
+        self.assertEqual(self.row(self.phone), (1, 1, 100, 100))
+        self.assertEqual(self.row(Product(category=category, company_id=self.case.company_id)), (1, 1, 30, 30))
+
+    def test_empty_pair_is_removed(self):
+        Product.objects.get(pk=self.cable.pk).delete()
+        self.refresh()
+        self.assertFalse(CatalogSummary.objects.filter(company_id=self.cable.company_id).exists())
+
+    def test_checkout_refreshes_stock(self):
+        self.assertEqual(self.checkout((self.phone, 5)).status_code, 201)
+        self.refresh()
+        self.assertEqual(self.row(self.phone), (2, 1, 30, 100))
+
+    def test_refresh_companies(self):
+        Product.objects.filter(pk=self.phone.pk).update(price=10)
+        summary.refresh_companies([self.phone.company_id])
+        self.assertEqual(self.row(self.phone), (2, 2, 10, 30))
+
+    def test_summary_view(self):
+        response = self.client.get('/api/categories/summary')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'category_id': self.phone.category_id, 'name': 'Телефоны',
+                                            'product_count': 3, 'in_stock_count': 3,
+                                            'min_price': 20, 'max_price': 100}])
+        response = self.client.get(f'/api/categories/summary?company={self.cable.company_id}')
+        self.assertEqual([row['product_count'] for row in response.json()], [1])
+        self.assertEqual(self.client.get('/api/categories/summary?company=x').status_code, 400)
+
+    def test_summary_view_cache_is_invalidated(self):
+        self.client.get('/api/categories/summary')
+        self.save(self.phone, price=500)
+        self.assertEqual(self.client.get('/api/categories/summary').json()[0]['max_price'], 500)
+
+    def test_pending_change_is_not_visible_before_refresh(self):
+        Product.objects.get(pk=self.phone.pk).save()
+        self.assertEqual(Job.objects.filter(task='summary.refresh_pairs', status='queued').count(), 1)
+        Product.objects.filter(pk=self.phone.pk).update(price=500)
+        self.assertEqual(self.row(self.phone), (2, 2, 30, 100))
+        self.refresh()
+        self.assertEqual(self.client.get('/api/categories/summary').json()[0]['max_price'], 500)
@@ -0,0 +1,47 @@
+"""
+Оформление заказа с резервированием остатков (backend.orders)
+"""
+from backend.models import Company, Order, Product
+from backend.tests.utils import OrderTestCase
+
+
+class CheckoutTests(OrderTestCase):
+
+    def test_checkout_reserves_stock(self):
+        response = self.checkout((self.phone, 2), (self.case, 1), (self.phone, 1))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['order']['total_amount'], 330)
+        self.assertEqual(self.stock(self.phone), 2)
+        self.assertEqual(self.stock(self.case), 9)
+
+    def test_oversell_is_rejected(self):
+        response = self.checkout((self.case, 1), (self.phone, 6))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['Errors'], {str(self.phone.id): 'Недостаточно товара на складе'})
+        # Резервирование других товаров откатывается вместе с заказом
+        self.assertEqual(self.stock(self.phone), 5)
+        self.assertEqual(self.stock(self.case), 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_is_rejected(self):
+        missing = Product(id=self.cable.id + 1)
+        response = self.checkout((self.phone, 1), (missing, 1))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['Errors'], {str(missing.id): 'Товар не найден'})
+        self.assertEqual(self.stock(self.phone), 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_supplier_not_accepting_orders(self):
+        Company.objects.filter(pk=self.cable.company_id).update(state_orders=False)
+        response = self.checkout((self.cable, 1))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['Errors'], {str(self.cable.id): 'Поставщик не принимает заказы'})
+        self.assertEqual(self.stock(self.cable), 10)
+
+    def test_empty_basket(self):
+        self.assertEqual(self.checkout().status_code, 400)
+
+    def test_anonymous_checkout(self):
+        response = self.client.post('/api/order/checkout', data={'items': [{'product': self.phone.id, 'quantity': 1}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,74 @@
+"""
+Пакетное изменение контактов (backend.contacts)
+"""
+from django.test import TestCase
+
+from backend.models import Contact, User
+from backend.tests.utils import auth_headers
+
+CONTACT = {'phone': '+79990000000', 'city': 'Москва', 'street': 'Тверская', 'structure': '', 'building': '1',
+           'apartment': '10'}
+
+
+class ContactBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        cls.first = Contact.objects.create(user=cls.user, **CONTACT)
+        cls.second = Contact.objects.create(user=cls.user, **dict(CONTACT, city='Казань'))
+        cls.foreign = Contact.objects.create(user=cls.other, **CONTACT)
+
+    def batch(self, **data):
+        return self.client.post('/api/user/contact/batch', data=data, content_type='application/json',
+                                **auth_headers(self.user))
+
+    def cities(self):
+        return sorted(Contact.objects.filter(user=self.user).values_list('city', flat=True))
+
+    def test_batch_is_applied(self):
+        response = self.batch(create=[dict(CONTACT, city='Сочи')], update=[{'id': self.first.id, 'city': 'Тула'}],
+                              delete=[self.second.id])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        created = Contact.objects.get(user=self.user, city='Сочи')
+        self.assertEqual(results, {
+            'create': [{'index': 0, 'id': created.id, 'status': 'created'}],
+            'update': [{'index': 0, 'id': self.first.id, 'status': 'updated'}],
+            'delete': [{'id': self.second.id, 'status': 'deleted'}],
+        })
+        self.assertEqual(self.cities(), ['Сочи', 'Тула'])
+
+    def test_invalid_item_rolls_back_batch(self):
+        response = self.batch(create=[dict(CONTACT, city='Сочи'), {'city': 'Тула'}],
+                              update=[{'id': self.first.id, 'city': 'Тула'}], delete=[self.second.id])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['Errors']
+        self.assertEqual([item['index'] for item in errors['create']], [1])
+        self.assertIn('phone', errors['create'][0]['errors'])
+        self.assertEqual((errors['update'], errors['delete']), ([], []))
+        self.assertEqual(self.cities(), ['Казань', 'Москва'])
+
+    def test_foreign_contacts_are_rejected(self):
+        response = self.batch(update=[{'id': self.foreign.id, 'city': 'Тула'}], delete=[self.foreign.id, self.first.id])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['Errors']
+        self.assertEqual(errors['update'], [{'index': 0, 'id': self.foreign.id, 'errors': 'Контакт не найден'}])
+        self.assertEqual(errors['delete'], [{'id': self.foreign.id, 'errors': 'Контакт не найден'}])
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.city, 'Москва')
+        self.assertEqual(self.cities(), ['Казань', 'Москва'])
+
+    def test_update_of_deleted_contact_is_rejected(self):
+        response = self.batch(update=[{'id': self.first.id, 'city': 'Тула'}], delete=[self.first.id])
+        self.assertEqual(response.json()['Errors']['update'][0]['errors'], 'Контакт также удаляется')
+        self.assertEqual(self.cities(), ['Казань', 'Москва'])
+
+    def test_batch_validation(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch(update=[{'city': 'Тула'}]).status_code, 400)
+        self.assertEqual(self.batch(delete=[0]).status_code, 400)
+        response = self.client.post('/api/user/contact/batch', data={'delete': [self.first.id]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 401)
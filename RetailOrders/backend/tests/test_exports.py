@@ -0,0 +1,136 @@
+"""
+Потоковая выгрузка каталога и истории заказов (backend.exports, команда export_data)
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import zlib
+from datetime import timedelta
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from backend import exports
+from backend.importer import import_price_list
+from backend.models import Order, Product, ProductProperty, Property
+from backend.tests.utils import OrderTestCase, auth_headers
+
+
+class ExportTestCase(OrderTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        color = Property.objects.create(name='Цвет', value='')
+        memory = Property.objects.create(name='Объем', value='ГБ')
+        ProductProperty.objects.create(product=cls.phone, property=color, quantity='черный')
+        ProductProperty.objects.create(product=cls.phone, property=memory, quantity='128')
+
+    def export(self, path, user, **params):
+        response = self.client.get(path, params, **auth_headers(user))
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def orders(self, user, **params):
+        _, body = self.export('/api/order/export', user, **params)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+
+class PriceListExportTests(ExportTestCase):
+
+    def test_csv_columns_and_reimport(self):
+        response, body = self.export('/api/partner/export', self.supplier, format='csv')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="products-{self.phone.company_id}.csv"')
+        self.assertTrue(body.startswith(exports.CSV_BOM))
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+        self.assertEqual(list(rows[0]), list(exports.PRODUCT_COLUMNS) + ['Объем (ГБ)', 'Цвет'])
+        self.assertEqual([(row['article'], row['Цвет'], row['Объем (ГБ)']) for row in rows],
+                         [('1', 'черный', '128'), ('2', '', '')])
+
+        # Выгрузка загружается обратно импортом без изменений
+        report = import_price_list(io.BytesIO(body), 'csv', self.phone.company)
+        self.assertEqual((report['created'], report['updated'], report['errors']), (0, 2, []))
+        self.assertEqual(self.stock(self.phone), 5)
+        self.assertEqual(set(ProductProperty.objects.filter(product=self.phone).values_list('quantity', flat=True)),
+                         {'черный', '128'})
+
+    def test_jsonl(self):
+        _, body = self.export('/api/partner/export', self.supplier)
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(rows[0], {'article': 1, 'name': 'Телефон', 'description': '', 'category': 'Телефоны',
+                                   'price': 100, 'quantity': 5,
+                                   'parameters': {'Цвет': 'черный', 'Объем (ГБ)': '128'}})
+        self.assertEqual(len(rows), 2)
+
+    def test_gzip_round_trip(self):
+        _, plain = self.export('/api/partner/export', self.supplier, format='csv')
+        response, body = self.export('/api/partner/export', self.supplier, format='csv', compress='gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="products-{self.phone.company_id}.csv.gz"')
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_gzip_blocks_are_flushed(self):
+        rows = ({'article': index, 'name': 'x' * 100} for index in range(100))
+        blocks = list(exports.stream(rows, 'jsonl', compress=True, block_size=1000))
+        decompressor = zlib.decompressobj(wbits=31)
+        # Каждый блок распаковывается сразу, без ожидания конца потока
+        lines = 0
+        for block in blocks[:-1]:
+            data = decompressor.decompress(block)
+            self.assertTrue(data.endswith(b'\n'))
+            lines += data.count(b'\n')
+        self.assertEqual(lines, 100)
+        self.assertGreater(len(blocks), 3)
+
+    def test_errors(self):
+        headers = auth_headers(self.supplier)
+        self.assertEqual(self.client.get('/api/partner/export', {'format': 'xml'}, **headers).status_code, 400)
+        self.assertEqual(self.client.get('/api/partner/export', {'company': 'x'}, **headers).status_code, 400)
+        self.assertEqual(self.client.get('/api/partner/export', **auth_headers(self.buyer)).status_code, 403)
+
+
+class OrderExportTests(ExportTestCase):
+
+    def setUp(self):
+        self.checkout((self.phone, 1), (self.cable, 2))
+        self.checkout((self.case, 3))
+
+    def test_visibility(self):
+        rows = self.orders(self.buyer)
+        self.assertEqual([(row['article'], row['quantity']) for row in rows], [(1, 1), (3, 2), (2, 3)])
+        self.assertEqual(list(rows[0]), list(exports.ORDER_COLUMNS))
+        self.assertEqual(rows[0]['order_total'], 140)
+        self.assertEqual(rows[0]['total_cost'], '100.00')
+        # Поставщик видит только строки со своими товарами
+        self.assertEqual([row['article'] for row in self.orders(self.other_supplier)], [3])
+
+    def test_filters(self):
+        first = Order.objects.order_by('id').first()
+        Order.objects.filter(pk=first.pk).update(status='canceled', created_at=timezone.now() - timedelta(days=3))
+        self.assertEqual([row['article'] for row in self.orders(self.buyer, status='canceled')], [1, 3])
+        today = timezone.localdate().isoformat()
+        self.assertEqual([row['article'] for row in self.orders(self.buyer, date_from=today)], [2])
+        self.assertEqual([row['article'] for row in self.orders(self.buyer, date_to=today)], [1, 3, 2])
+        headers = auth_headers(self.buyer)
+        self.assertEqual(self.client.get('/api/order/export', {'date_from': '2026-13-01'}, **headers).status_code, 400)
+        self.assertEqual(self.client.get('/api/order/export', {'status': 'lost'}, **headers).status_code, 400)
+
+    def test_csv(self):
+        _, body = self.export('/api/order/export', self.buyer, format='csv')
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], list(exports.ORDER_COLUMNS))
+        self.assertEqual(len(rows), 4)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.jsonl.gz')
+            call_command('export_data', 'orders', gzip=True, output=path, status='new', stderr=io.StringIO())
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                self.assertEqual(len(file.readlines()), 3)
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'products')
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'orders', date_from='вчера')
@@ -0,0 +1,105 @@
+"""
+Фасетный поиск по характеристикам (backend.facets)
+"""
+import io
+
+from django.test import TestCase
+
+from backend.facets import sync_facets
+from backend.importer import import_price_list
+from backend.models import Category, Company, Product, ProductFacet, ProductProperty, Property, User
+
+CSV = """article;name;category;price;quantity;Цвет;Объем (ГБ)
+1;Смартфон;Смартфоны;100;5;черный;128
+2;Смартфон;Смартфоны;200;5;белый;256
+3;Чехол;Аксессуары;10;50;черный;
+"""
+
+UPDATED_CSV = """article;name;category;price;quantity;Цвет;Объем (ГБ)
+1;Смартфон;Смартфоны;100;5;красный;
+2;Смартфон;Смартфоны;200;5;белый;512
+"""
+
+
+class FacetTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        cls.company = Company.objects.create(name='Связной', owner=cls.supplier)
+
+    def run_import(self, text):
+        return import_price_list(io.BytesIO(text.encode()), 'csv', self.company)
+
+    def assertFacetsConsistent(self):
+        """
+        Фасеты совпадают с характеристиками товаров
+        """
+        properties = set(ProductProperty.objects.values_list('product_id', 'property_id', 'quantity'))
+        facets = set(ProductFacet.objects.values_list('product_id', 'property_id', 'value'))
+        self.assertEqual(facets, properties)
+
+    def articles(self, *filters):
+        response = self.client.get('/api/products/facets', {'property': list(filters)})
+        self.assertEqual(response.status_code, 200)
+        ids = [row['id'] for row in response.json()['results']]
+        return sorted(Product.objects.filter(id__in=ids).values_list('article', flat=True))
+
+
+class FacetConsistencyTests(FacetTestCase):
+
+    def test_import_and_reimport(self):
+        self.run_import(CSV)
+        self.assertFacetsConsistent()
+        self.assertEqual(ProductFacet.objects.filter(number__isnull=False).count(), 2)
+
+        self.run_import(UPDATED_CSV)
+        self.assertFacetsConsistent()
+        self.assertEqual(ProductFacet.objects.get(product__article=2, property__name='Объем').number, 512)
+
+    def test_model_save_and_delete(self):
+        self.run_import(CSV)
+        item = ProductProperty.objects.get(product__article=3, property__name='Цвет')
+        item.quantity = 'синий'
+        item.save()
+        self.assertFacetsConsistent()
+        ProductProperty.objects.get(product__article=1, property__name='Объем').delete()
+        self.assertFacetsConsistent()
+        Property.objects.get(name='Цвет').delete()
+        self.assertFacetsConsistent()
+        Product.objects.get(article=2).delete()
+        self.assertFacetsConsistent()
+
+    def test_sync_after_queryset_update(self):
+        self.run_import(CSV)
+        queryset = ProductProperty.objects.filter(property__name='Цвет', quantity='черный')
+        product_ids = list(queryset.values_list('product_id', flat=True))
+        queryset.update(quantity='серый')
+        sync_facets(product_ids)
+        self.assertFacetsConsistent()
+
+
+class FacetFilterTests(FacetTestCase):
+
+    def setUp(self):
+        self.run_import(CSV)
+        self.color = Property.objects.get(name='Цвет').id
+        self.volume = Property.objects.get(name='Объем').id
+
+    def test_value_and_range_filters(self):
+        self.assertEqual(self.articles(f'{self.color}:черный'), [1, 3])
+        self.assertEqual(self.articles(f'{self.volume}:200..'), [2])
+        self.assertEqual(self.articles(f'{self.color}:черный', f'{self.volume}:..200'), [1])
+        # Несколько значений одной характеристики объединяются через ИЛИ
+        self.assertEqual(self.articles(f'{self.color}:черный', f'{self.color}:белый'), [1, 2, 3])
+
+    def test_filters_follow_reimport(self):
+        self.run_import(UPDATED_CSV)
+        self.assertEqual(self.articles(f'{self.color}:черный'), [3])
+        self.assertEqual(self.articles(f'{self.volume}:200..'), [2])
+
+    def test_facet_counts(self):
+        response = self.client.get('/api/products/facets', {'category': Category.objects.get(name='Смартфоны').id})
+        facets = {facet['name']: facet['values'] for facet in response.json()['facets']}
+        self.assertEqual(facets['Цвет'], [{'value': 'белый', 'count': 1}, {'value': 'черный', 'count': 1}])
+        self.assertEqual(self.client.get('/api/products/facets', {'property': 'x'}).status_code, 400)
@@ -0,0 +1,66 @@
+"""
+Быстрый вывод списков (backend.fastpath) и JSON-рендерер на orjson (backend.renderers):
+байты ответа должны совпадать с выводом DRF
+"""
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from backend.benchmarks.serialization import CASES, measure
+from backend.models import Company, Contact, Order, OrderItem, Product
+from backend.renderers import FastJSONRenderer
+from backend.tests.utils import OrderTestCase
+
+
+class FastPathOutputTests(OrderTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Пустые и NULL значения, Decimal с разной дробной частью, спецсимволы в строках
+        Product.objects.filter(pk=cls.phone.pk).update(description='Экран 6,5" линия\\путь\u2028😀')
+        Company.objects.filter(pk=cls.cable.company_id).update(url=None)
+        Company.objects.filter(pk=cls.phone.company_id).update(url='https://example.com/?a=1&b=2')
+        Contact.objects.create(user=cls.buyer, phone='+79990000000', city='Москва', street='Тверская',
+                               structure='', building='', apartment='1')
+        order = Order.objects.create(user=cls.buyer, total_amount=0)
+        for product, total_cost in ((cls.phone, Decimal('1234.50')), (cls.case, Decimal('0.10')),
+                                    (cls.cable, None)):
+            item = OrderItem(order=order, product=product, quantity=1)
+            OrderItem.objects.bulk_create([item])
+            OrderItem.objects.filter(pk=item.pk).update(total_cost=total_cost)
+
+    def test_bytes_match_drf(self):
+        for case in CASES:
+            with self.subTest(case.name):
+                result = measure(case, iterations=1)
+                self.assertGreater(result['rows'], 0)
+                self.assertTrue(result['identical'])
+
+    def test_product_list_endpoint(self):
+        response = self.client.get('/api/products?limit=2')
+        self.assertEqual(response.status_code, 200)
+        expected = JSONRenderer().render(response.json())
+        self.assertEqual(response.content, expected)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_decimal_and_null(self):
+        self.assertSameOutput({'price': Decimal('10.50'), 'zero': Decimal('0E-6'), 'none': None,
+                               'values': [Decimal('-1.000000'), None]})
+
+    def test_key_order_and_nesting(self):
+        self.assertSameOutput({'z': 1, 'a': {'y': [], 'b': {}}, 'm': [{'c': 'd', 'a': 'b'}]})
+
+    def test_strings(self):
+        self.assertSameOutput({'text': 'Строка "в кавычках"\n\t\\ \u2028\u2029 😀 </script>'})
+
+    def test_dates_and_big_numbers(self):
+        self.assertSameOutput({'created': datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+                               'day': date(2026, 1, 2), 'big': 2 ** 70, 'float': 0.1, 'flag': True})
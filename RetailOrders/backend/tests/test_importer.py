@@ -0,0 +1,222 @@
+"""
+Потоковый импорт прайс-листов (backend.importer)
+"""
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from backend.importer import PriceListError, import_price_list
+from backend.models import Company, Order, OrderItem, Product, ProductFacet, ProductProperty, User
+from backend.tests.utils import auth_headers
+
+YAML = """
+shop: Связной
+categories:
+  - id: 224
+    name: Смартфоны
+  - id: 15
+    name: Аксессуары
+goods:
+  - id: 4216292
+    category: 224
+    model: apple/iphone/xs-max
+    name: Смартфон Apple iPhone XS Max 512GB (золотистый)
+    price: 110000
+    quantity: 14
+    parameters:
+      "Диагональ (дюйм)": 6.5
+      Цвет: золотистый
+  - id: 4672670
+    category: 15
+    name: Чехол
+    price: 1000
+    quantity: 20
+"""
+
+CSV = """article;name;category;price;quantity;Цвет;Объем (ГБ)
+1;Смартфон;Смартфоны;100;5;черный;128
+2;Чехол;Аксессуары;10;50;;
+"""
+
+
+class ImporterTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        cls.company = Company.objects.create(name='Связной', owner=cls.supplier)
+
+    def run_import(self, text, file_format, company=None, **kwargs):
+        return import_price_list(io.BytesIO(text.encode()), file_format, company or self.company, **kwargs)
+
+
+class YamlImportTests(ImporterTestCase):
+
+    def test_products_properties_and_facets(self):
+        report = self.run_import(YAML, 'yaml', batch_size=1)
+        self.assertEqual((report['created'], report['updated'], report['skipped']), (2, 0, 0))
+
+        phone = Product.objects.get(article=4216292)
+        self.assertEqual((phone.name, phone.description, phone.price, phone.quantity, phone.category.name),
+                         ('Смартфон Apple iPhone XS Max 512GB (золотистый)', 'apple/iphone/xs-max', 110000, 14,
+                          'Смартфоны'))
+        self.assertEqual(phone.company, self.company)
+        self.assertEqual(
+            set(ProductProperty.objects.filter(product=phone).values_list('property__name', 'property__value',
+                                                                          'quantity')),
+            {('Диагональ', 'дюйм', '6.5'), ('Цвет', '', 'золотистый')})
+        self.assertEqual(ProductFacet.objects.filter(product=phone).count(), 2)
+        self.assertEqual(set(self.company.categories.values_list('name', flat=True)), {'Смартфоны', 'Аксессуары'})
+
+    def test_categories_after_goods_are_rejected(self):
+        document = 'shop: Связной\ngoods:\n  - id: 1\n    category: 1\n    name: Товар\n    price: 1\n    quantity: 1\n' \
+                   'categories:\n  - id: 1\n    name: Категория\n'
+        with self.assertRaisesMessage(PriceListError, 'categories должен идти в файле перед goods'):
+            self.run_import(document, 'yaml')
+        self.assertFalse(Product.objects.exists())
+
+    def test_category_names_do_not_need_categories(self):
+        document = 'goods:\n  - id: 1\n    category: Телефоны\n    name: Товар\n    price: 1\n    quantity: 1\n'
+        self.assertEqual(self.run_import(document, 'yaml')['created'], 1)
+        self.assertEqual(Product.objects.get(article=1).category.name, 'Телефоны')
+
+    def test_malformed_categories_are_rejected(self):
+        for categories in ('[{name: Без id}]', '[{id: 1}]', '[Телефоны]', '{id: 1, name: Телефоны}'):
+            with self.subTest(categories):
+                with self.assertRaises(PriceListError):
+                    self.run_import(f'categories: {categories}\ngoods: []\n', 'yaml')
+
+    def test_unknown_category_id_is_reported(self):
+        report = self.run_import(YAML.replace('category: 15', 'category: 16'), 'yaml')
+        self.assertEqual((report['created'], report['skipped']), (1, 1))
+        self.assertIn('article=4672670', report['errors'][0])
+
+    def test_invalid_yaml(self):
+        with self.assertRaises(PriceListError):
+            self.run_import('goods: [', 'yaml')
+
+
+class CsvImportTests(ImporterTestCase):
+
+    def test_columns_and_parameters(self):
+        report = self.run_import(CSV, 'csv')
+        self.assertEqual(report['created'], 2)
+        phone = Product.objects.get(article=1)
+        self.assertEqual(
+            set(ProductProperty.objects.filter(product=phone).values_list('property__name', 'property__value',
+                                                                          'quantity')),
+            {('Цвет', '', 'черный'), ('Объем', 'ГБ', '128')})
+        # Пустые ячейки не создают характеристик
+        self.assertFalse(ProductProperty.objects.filter(product__article=2).exists())
+
+    def test_upsert_updates_existing_products(self):
+        self.run_import(CSV, 'csv')
+        phone_id = Product.objects.get(article=1).id
+        report = self.run_import(CSV.replace('1;Смартфон;Смартфоны;100;5;черный;128',
+                                             '1;Смартфон;Смартфоны;90;7;белый;'), 'csv')
+        self.assertEqual((report['created'], report['updated']), (0, 2))
+        phone = Product.objects.get(article=1)
+        self.assertEqual((phone.id, phone.price, phone.quantity), (phone_id, 90, 7))
+        # Характеристика, пропавшая из строки, удаляется вместе с фасетом
+        self.assertEqual(list(ProductProperty.objects.filter(product=phone).values_list('quantity', flat=True)),
+                         ['белый'])
+        self.assertEqual(list(ProductFacet.objects.filter(product=phone).values_list('value', flat=True)),
+                         ['белый'])
+
+    def test_invalid_rows_are_reported(self):
+        report = self.run_import(CSV + '3;Кабель;Аксессуары;дорого;1;;\n4;;Аксессуары;1;1;;\n', 'csv')
+        self.assertEqual((report['processed'], report['created'], report['skipped']), (4, 2, 2))
+        self.assertEqual(len(report['errors']), 2)
+        self.assertIn('article=3', report['errors'][0])
+
+    def test_foreign_article_is_not_overwritten(self):
+        other = Company.objects.create(name='Другой поставщик')
+        self.run_import(CSV, 'csv', company=other)
+        report = self.run_import(CSV, 'csv')
+        self.assertEqual((report['created'], report['skipped']), (0, 2))
+        self.assertEqual(set(Product.objects.values_list('company_id', flat=True)), {other.id})
+
+
+class JsonLinesImportTests(ImporterTestCase):
+
+    def test_rows(self):
+        report = self.run_import('{"article": 1, "name": "Товар", "category": "Разное", "price": 5, "quantity": 1}\n'
+                                 '\n["не словарь"]\n', 'jsonl')
+        self.assertEqual((report['created'], report['skipped']), (1, 1))
+
+    def test_broken_line(self):
+        with self.assertRaisesMessage(PriceListError, 'Строка 2'):
+            self.run_import('{"article": 1}\n{broken\n', 'jsonl')
+
+
+class PriceListImportViewTests(ImporterTestCase):
+
+    def upload(self, data, user=None):
+        return self.client.post('/api/partner/import', data=data, **auth_headers(user or self.supplier))
+
+    def test_import(self):
+        response = self.upload({'file': SimpleUploadedFile('price.yaml', YAML.encode())})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+
+    def test_invalid_company(self):
+        response = self.upload({'file': SimpleUploadedFile('price.csv', CSV.encode()), 'company': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.upload({'file': SimpleUploadedFile('price.csv', CSV.encode()), 'company': '999999'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Product.objects.exists())
+
+    def test_unknown_format(self):
+        response = self.upload({'file': SimpleUploadedFile('price.txt', b'')})
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_for_suppliers(self):
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        response = self.upload({'file': SimpleUploadedFile('price.csv', CSV.encode())}, user=buyer)
+        self.assertEqual(response.status_code, 403)
+
+
+class IncrementalImportTests(ImporterTestCase):
+
+    def test_unchanged_rows_are_not_written(self):
+        self.run_import(CSV, 'csv', incremental=True)
+        report = self.run_import(CSV.replace('2;Чехол;Аксессуары;10;50', '2;Чехол;Аксессуары;12;50'), 'csv',
+                                 incremental=True)
+        self.assertEqual((report['unchanged'], report['updated'], report['created']), (1, 1, 0))
+        self.assertEqual(Product.objects.get(article=2).price, 12)
+
+    def test_missing_products_are_removed(self):
+        self.run_import(CSV, 'csv', incremental=True)
+        ordered = Product.objects.get(article=1)
+        order = Order.objects.create(user=self.supplier)
+        OrderItem.objects.create(order=order, product=ordered, quantity=1)
+
+        report = self.run_import('article;name;category;price;quantity\n3;Кабель;Аксессуары;5;5\n', 'csv',
+                                 incremental=True)
+        self.assertEqual((report['created'], report['deleted']), (1, 2))
+        self.assertFalse(Product.objects.filter(article=2).exists())
+        # Товар из заказа остается, но снимается с продажи и будет записан при следующем импорте
+        ordered.refresh_from_db()
+        self.assertEqual((ordered.quantity, ordered.fingerprint), (0, ''))
+        self.assertEqual(OrderItem.objects.get(order=order).product_id, ordered.id)
+
+    def test_invalid_rows_are_not_removed(self):
+        self.run_import(CSV, 'csv', incremental=True)
+        report = self.run_import(CSV.replace('2;Чехол;Аксессуары;10;50', '2;Чехол;Аксессуары;бесплатно;50'), 'csv',
+                                 incremental=True)
+        self.assertEqual((report['skipped'], report['deleted']), (1, 0))
+        self.assertTrue(Product.objects.filter(article=2).exists())
+
+    def test_full_import_keeps_missing_products(self):
+        self.run_import(CSV, 'csv')
+        report = self.run_import('article;name;category;price;quantity\n3;Кабель;Аксессуары;5;5\n', 'csv')
+        self.assertEqual(report['deleted'], 0)
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_incremental_mode_from_view(self):
+        self.run_import(CSV, 'csv')
+        response = self.client.post('/api/partner/import', data={
+            'file': SimpleUploadedFile('price.csv', CSV.encode()), 'mode': 'incremental'},
+            **auth_headers(self.supplier))
+        self.assertEqual(response.json()['unchanged'], 2)
@@ -0,0 +1,82 @@
+"""
+Метрики SQL и времени обработки запросов (backend.instrumentation, instrumentation_middleware)
+"""
+import re
+
+from django.test import TestCase, override_settings
+
+from backend import instrumentation
+from backend.models import Category
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) duplicate", app;dur=[\d.-]+, total;dur=[\d.]+')
+
+
+# Счетчики сбрасываются в отдельный кэш, чтобы не смешиваться с запросами других тестов
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'instrumentation-tests'}},
+                   METRICS_TOKEN='secret', METRICS_FLUSH_SECONDS=3600)
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name='Телефоны')
+
+    def setUp(self):
+        # Счетчики, накопленные процессом до теста
+        instrumentation.registry._take()
+
+    def metrics(self, token='secret'):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/products/search', {'q': 'Телефон'})
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match)
+        self.assertGreaterEqual(int(match.group(1)), 1)
+        self.assertEqual(match.group(2), '0')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/categories'))
+
+    def test_metrics_endpoint(self):
+        for _ in range(3):
+            self.client.get('/api/products/search', {'q': 'Телефон'})
+        self.client.get('/api/products/0')
+        response = self.metrics()
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        labels = 'view="products-search",method="GET",status="2xx"'
+        self.assertIn(f'http_requests_total{{{labels}}} 3\n', text)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 3\n', text)
+        self.assertIn(f'http_response_size_bytes_count{{{labels}}} 3\n', text)
+        self.assertIn('http_requests_total{view="product",method="GET",status="4xx"} 1\n', text)
+        queries = re.search(rf'http_request_db_queries_total{{{labels}}} (\d+)', text)
+        self.assertGreaterEqual(int(queries.group(1)), 3)
+
+    def test_metrics_require_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.metrics('wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN='', DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_queries(self):
+        instrumentation.install()
+        category = Category.objects.get()
+        stats, token = instrumentation.start()
+        try:
+            for _ in range(3):
+                Category.objects.get(pk=category.pk)
+            Category.objects.count()
+        finally:
+            instrumentation.finish(token)
+        self.assertEqual((stats.queries, stats.duplicates()), (4, 2))
+        self.assertEqual([count for _, count in stats.repeated(3)], [3])
+
+        with self.assertLogs('backend.instrumentation', 'WARNING') as logs:
+            instrumentation.registry.observe('categories', 'GET', '2xx', 0.01, stats, 10)
+        self.assertIn('3 раз', logs.output[0])
+        # Вне HTTP-запроса запросы не учитываются
+        Category.objects.count()
+        self.assertEqual(stats.queries, 4)
@@ -0,0 +1,168 @@
+"""
+Очередь фоновых задач (backend.jobs)
+"""
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from backend.jobs import TASKS, claim, execute, run_pending, task
+from backend.models import CatalogSummary, Category, Company, Job, Product, User
+from backend.orders import place_order
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('Сервис недоступен')
+
+
+@override_settings(JOBS_EXECUTOR='worker', JOBS_LEASE_SECONDS=300, JOBS_RETRY_DELAY=10, JOBS_MAX_RETRY_DELAY=60)
+class JobTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        Job.objects.all().delete()
+
+    def test_claim_leases_due_jobs(self):
+        due = record.enqueue(value=1)
+        later = record.enqueue(value=2, delay=60)
+
+        jobs = claim()
+        self.assertEqual([job.pk for job in jobs], [due.pk])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), ('running', 1))
+        self.assertGreater(due.run_at, timezone.now() + timedelta(seconds=200))
+        # Арендованная задача не выдается второй раз, пока аренда не истекла
+        self.assertEqual(claim(), [])
+        later.refresh_from_db()
+        self.assertEqual((later.status, later.attempts), ('queued', 0))
+
+    def test_expired_lease_is_claimed_again(self):
+        job = record.enqueue(value=1)
+        first, = claim()
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now() - timedelta(seconds=1))
+        second, = claim()
+        self.assertEqual(second.attempts, 2)
+        # Результат первого воркера не записывается: аренду забрал другой
+        self.assertTrue(execute(first))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        self.assertTrue(execute(second))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+    def test_successful_job(self):
+        job = record.enqueue(value='ok')
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(calls, ['ok'])
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(run_pending(), 0)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = fail.enqueue()
+        with self.assertLogs('backend.jobs', 'WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('Сервис недоступен', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        # Повтор откладывается на время задержки
+        self.assertEqual(run_pending(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('backend.jobs', 'ERROR'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(run_pending(), 0)
+
+    def test_unknown_task_fails(self):
+        job = Job.objects.create(task='tests.missing', run_at=timezone.now())
+        with self.assertLogs('backend.jobs', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_key_coalesces_queued_jobs(self):
+        first = record.enqueue(key='record:1', value=1)
+        self.assertEqual(record.enqueue(key='record:1', value=1).pk, first.pk)
+        self.assertNotEqual(record.enqueue(key='record:2', value=2).pk, first.pk)
+        self.assertEqual(Job.objects.filter(task='tests.record').count(), 2)
+
+        # Взятая воркером задача не объединяется: изменения во время выполнения не теряются
+        claim(job_ids=[first.pk])
+        second = record.enqueue(key='record:1', value=1)
+        self.assertNotEqual(second.pk, first.pk)
+
+    def test_retry_does_not_conflict_with_queued_job(self):
+        job = fail.enqueue(key='fail')
+        claimed, = claim()
+        twin = fail.enqueue(key='fail')
+        with self.assertLogs('backend.jobs', 'WARNING'):
+            execute(claimed)
+        self.assertEqual(Job.objects.filter(pk__in=[job.pk, twin.pk], status='queued').count(), 2)
+
+    def test_catalog_changes_share_summary_job(self):
+        supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        category = Category.objects.create(name='Телефоны')
+        company = Company.objects.create(name='Поставщик', owner=supplier)
+        product = Product.objects.create(name='Телефон', description='', article=1, quantity=5, price=100,
+                                         category=category, company=company)
+        for price in (110, 120):
+            product.price = price
+            product.save()
+        place_order(supplier, [(product.id, 1)])
+        place_order(supplier, [(product.id, 2)])
+        jobs = Job.objects.filter(task='summary.refresh_pairs')
+        self.assertEqual(list(jobs.values_list('key', 'payload')),
+                         [(f'summary:pair:{category.id}:{company.id}', {'pairs': [[category.id, company.id]]})])
+
+        self.assertEqual(run_pending(), 1)
+        summary = CatalogSummary.objects.get(category=category, company=company)
+        self.assertEqual((summary.product_count, summary.min_price), (1, 120))
+
+    @override_settings(JOBS_EXECUTOR='immediate')
+    def test_immediate_executor_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = record.enqueue(value='now')
+            self.assertEqual(calls, [])
+        job.refresh_from_db()
+        self.assertEqual((calls, job.status), (['now'], 'done'))
+
+    def test_legacy_summary_jobs_are_rewritten(self):
+        migration = import_module('backend.migrations.0020_rewrite_legacy_summary_jobs')
+        supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        category = Category.objects.create(name='Телефоны')
+        company = Company.objects.create(name='Поставщик', owner=supplier)
+        phones = [Product.objects.create(name=f'Телефон {article}', description='', article=article, quantity=5,
+                                         price=100, category=category, company=company) for article in (1, 2)]
+        Job.objects.all().delete()
+        now = timezone.now()
+        queued = Job.objects.create(task='summary.refresh_products', payload={'product_ids': [p.id for p in phones]},
+                                    run_at=now)
+        done = Job.objects.create(task='summary.refresh_products', payload={'product_ids': [phones[0].id]},
+                                  status='done', run_at=now)
+
+        migration.rewrite_legacy_summary_jobs(apps, None)
+        self.assertFalse(Job.objects.filter(pk=queued.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=done.pk).exists())
+        jobs = Job.objects.filter(task='summary.refresh_pairs')
+        self.assertEqual(list(jobs.values_list('key', 'payload', 'status')),
+                         [(f'summary:pair:{category.id}:{company.id}', {'pairs': [[category.id, company.id]]},
+                           'queued')])
+        self.assertNotIn('summary.refresh_products', TASKS)
+
+        self.assertEqual(run_pending(), 1)
+        summary = CatalogSummary.objects.get(category=category, company=company)
+        self.assertEqual(summary.product_count, 2)
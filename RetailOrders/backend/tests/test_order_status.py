@@ -0,0 +1,86 @@
+"""
+Переходы статусов заказа (backend.order_status)
+"""
+from django.test import SimpleTestCase
+
+from backend.models import Order, User
+from backend.order_status import StatusTransitionError, allowed_predecessors, can_transition
+from backend.tests.utils import OrderTestCase, auth_headers
+
+
+class StatusTransitionTests(OrderTestCase):
+
+    def change_status(self, user, orders, status):
+        return self.client.post('/api/order/status', data={'ids': [order.id for order in orders], 'status': status},
+                                content_type='application/json', **auth_headers(user))
+
+    def order(self, *items, status='new'):
+        self.assertEqual(self.checkout(*items).status_code, 201)
+        order = Order.objects.latest('id')
+        Order.objects.filter(pk=order.pk).update(status=status)
+        return order
+
+    def test_allowed_transitions(self):
+        order = self.order((self.phone, 1))
+        for status in ('confirmed', 'assembled', 'sent', 'delivered'):
+            response = self.change_status(self.supplier, [order], status)
+            self.assertEqual(response.json()['updated'], [order.id], status)
+        order.refresh_from_db(fields=['status'])
+        self.assertEqual(order.status, 'delivered')
+
+    def test_forbidden_transitions(self):
+        new, sent = self.order((self.phone, 1)), self.order((self.case, 1), status='sent')
+        response = self.change_status(self.supplier, [new], 'delivered')
+        self.assertEqual(response.json(), {'Status': True, 'updated': [], 'rejected': [new.id]})
+        response = self.change_status(self.supplier, [sent], 'canceled')
+        self.assertEqual(response.json()['rejected'], [sent.id])
+        self.assertEqual(self.stock(self.case), 9)
+
+    def test_supplier_cannot_close_orders(self):
+        order = self.order((self.phone, 1), status='delivered')
+        self.assertEqual(self.change_status(self.supplier, [order], 'closed').json()['rejected'], [order.id])
+        staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.assertEqual(self.change_status(staff, [order], 'closed').json()['updated'], [order.id])
+
+    def test_cancel_releases_stock(self):
+        order = self.order((self.phone, 2), (self.case, 3))
+        response = self.change_status(self.supplier, [order], 'canceled')
+        self.assertEqual(response.json()['updated'], [order.id])
+        self.assertEqual(self.stock(self.phone), 5)
+        self.assertEqual(self.stock(self.case), 10)
+
+        # Повторная отмена не возвращает товары второй раз
+        self.assertEqual(self.change_status(self.supplier, [order], 'canceled').json()['rejected'], [order.id])
+        self.assertEqual(self.stock(self.phone), 5)
+
+    def test_supplier_cannot_change_mixed_orders(self):
+        order = self.order((self.phone, 1), (self.cable, 2))
+        for supplier in (self.supplier, self.other_supplier):
+            self.assertEqual(self.change_status(supplier, [order], 'canceled').json()['rejected'], [order.id])
+        self.assertEqual(self.stock(self.phone), 4)
+        self.assertEqual(self.stock(self.cable), 8)
+
+    def test_buyer_cannot_change_status(self):
+        order = self.order((self.phone, 1))
+        self.assertEqual(self.change_status(self.buyer, [order], 'canceled').status_code, 403)
+
+    def test_unknown_status(self):
+        order = self.order((self.phone, 1))
+        self.assertEqual(self.change_status(self.supplier, [order], 'lost').status_code, 400)
+
+
+class StateMachineTests(SimpleTestCase):
+
+    def test_can_transition(self):
+        self.assertTrue(can_transition('new', 'confirmed'))
+        self.assertTrue(can_transition('assembled', 'canceled', role='supplier'))
+        self.assertFalse(can_transition('sent', 'canceled'))
+        self.assertFalse(can_transition('closed', 'new'))
+        self.assertTrue(can_transition('delivered', 'closed'))
+        self.assertFalse(can_transition('delivered', 'closed', role='supplier'))
+
+    def test_allowed_predecessors(self):
+        self.assertEqual(allowed_predecessors('canceled'), ('new', 'confirmed', 'assembled'))
+        self.assertEqual(allowed_predecessors('closed', role='supplier'), ())
+        with self.assertRaises(StatusTransitionError):
+            allowed_predecessors('lost')
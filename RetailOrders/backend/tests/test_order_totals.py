@@ -0,0 +1,48 @@
+"""
+Сумма заказа, поддерживаемая приращениями (OrderItem.save, signals)
+"""
+from backend.models import Order, OrderItem
+from backend.tests.utils import OrderTestCase
+
+
+class TotalAmountTests(OrderTestCase):
+
+    def total(self, order):
+        order.refresh_from_db(fields=['total_amount'])
+        return order.total_amount
+
+    def test_total_follows_item_changes(self):
+        order = Order.objects.create(user=self.buyer)
+        item = OrderItem.objects.create(order=order, product=self.phone, quantity=2)
+        OrderItem.objects.create(order=order, product=self.case, quantity=1)
+        self.assertEqual(self.total(order), 230)
+
+        item.quantity = 1
+        item.save()
+        self.assertEqual(self.total(order), 130)
+
+        item = OrderItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        item.save()
+        self.assertEqual(self.total(order), 330)
+
+        item.delete()
+        self.assertEqual(self.total(order), 30)
+
+        OrderItem.objects.filter(order=order).delete()
+        self.assertEqual(self.total(order), 0)
+
+    def test_moving_item_updates_both_orders(self):
+        first, second = Order.objects.create(user=self.buyer), Order.objects.create(user=self.buyer)
+        item = OrderItem.objects.create(order=first, product=self.phone, quantity=2)
+        item.order = second
+        item.save()
+        self.assertEqual(self.total(first), 0)
+        self.assertEqual(self.total(second), 200)
+
+    def test_deleting_order_item_queryset(self):
+        order = Order.objects.create(user=self.buyer)
+        OrderItem.objects.create(order=order, product=self.phone, quantity=1)
+        OrderItem.objects.create(order=order, product=self.cable, quantity=2)
+        OrderItem.objects.filter(product=self.cable).delete()
+        self.assertEqual(self.total(order), 100)
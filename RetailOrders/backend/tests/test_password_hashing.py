@@ -0,0 +1,94 @@
+"""
+Хеширование паролей с настраиваемой стоимостью (backend.hashing)
+"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from backend import hashing
+from backend.models import User
+
+
+class HashingTestMixin:
+
+    def setUp(self):
+        # Экземпляры хешеров кэшируются вместе с количеством итераций, пул и слоты - на процесс
+        hashers.get_hashers.cache_clear()
+        self.addCleanup(hashers.get_hashers.cache_clear)
+        for name in ('_pool', '_slots'):
+            patcher = mock.patch.object(hashing, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class RehashTests(HashingTestMixin, TestCase):
+
+    def iterations(self, user):
+        user.refresh_from_db(fields=['password'])
+        return int(user.password.split('$')[1])
+
+    def test_hash_is_updated_on_login(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            hashers.get_hashers.cache_clear()
+            user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        self.assertEqual(self.iterations(user), 1000)
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            hashers.get_hashers.cache_clear()
+            self.assertFalse(user.check_password('wrong'))
+            self.assertEqual(self.iterations(user), 1000)
+            self.assertTrue(user.check_password('password'))
+            self.assertEqual(self.iterations(user), 2000)
+            self.assertTrue(user.check_password('password'))
+
+    def test_unusable_password(self):
+        self.assertFalse(hashing.check_password('password', hashing.make_password(None)))
+        self.assertFalse(hashing.check_password(None, hashing.make_password('password')))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class HashingLimitsTests(HashingTestMixin, SimpleTestCase):
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_TIMEOUT=0.01)
+    def test_busy_when_no_free_slot(self):
+        slots = hashing._get_slots()
+        slots.acquire()
+        try:
+            with self.assertRaises(hashing.PasswordHashingBusy):
+                hashing.make_password('password')
+        finally:
+            slots.release()
+        # Слот освобождается и после ошибки
+        self.assertTrue(hashing.check_password('password', hashing.make_password('password')))
+        self.assertTrue(slots.acquire(blocking=False))
+        slots.release()
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_broken_pool_falls_back_to_current_process(self):
+        broken = Future()
+        broken.set_exception(BrokenProcessPool('Процесс завершился'))
+        pool = mock.Mock(**{'submit.return_value': broken})
+        hashing._pool = pool
+
+        encoded = hashing.make_password('password')
+        self.assertTrue(hashers.check_password('password', encoded))
+        pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertIsNone(hashing._pool)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_pool_replaced_by_other_thread_is_kept(self):
+        broken = Future()
+        broken.set_exception(BrokenProcessPool('Процесс завершился'))
+        pool, fresh = mock.Mock(), mock.Mock()
+        hashing._pool = pool
+
+        def replace(*args):
+            hashing._pool = fresh
+            return broken
+        pool.submit.side_effect = replace
+        self.assertTrue(hashers.check_password('password', hashing.make_password('password')))
+        self.assertIs(hashing._pool, fresh)
+        pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
@@ -0,0 +1,38 @@
+"""
+SQL ключевых endpoint'ов: количество запросов и сортировки (backend.benchmarks.queries)
+"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from backend.benchmarks.queries import ENDPOINTS, orderings, record, unexpected_orderings
+from backend.benchmarks.seed import seed
+from backend.models import User
+from backend.serializers import UserTokenObtainPairSerializer
+
+
+class QueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(products=200)
+        token = UserTokenObtainPairSerializer.get_token(User.objects.get(pk=cls.data['user_id']))
+        cls.headers = {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+
+    def setUp(self):
+        # Списки каталога должны читаться из базы, а не из кэша предыдущего теста
+        cache.clear()
+
+    def test_product_list_queries(self):
+        endpoint = ENDPOINTS[0]
+        code, statements = record(self.client, endpoint, self.data)
+        self.assertEqual(code, 200)
+        # Страница товаров и характеристики товаров страницы одним запросом
+        self.assertEqual(len(statements), 2)
+        self.assertEqual([ordering for sql in statements for ordering in orderings(sql)], [('name', 'id')])
+
+    def test_no_unexpected_orderings(self):
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.name):
+                code, statements = record(self.client, endpoint, self.data, self.headers if endpoint.auth else None)
+                self.assertLess(code, 400)
+                self.assertEqual(unexpected_orderings(endpoint, statements), [])
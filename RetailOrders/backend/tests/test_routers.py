@@ -0,0 +1,120 @@
+"""
+Маршрутизация чтения каталога между основной базой и репликой (backend.routers)
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from backend.models import Category, Company, Order, OrderItem, Product, User
+from backend.routers import replica_reads
+from backend.serializers import UserTokenObtainPairSerializer
+
+REPLICA = 'replica'
+
+
+# TransactionTestCase: внутри транзакции TestCase маршрутизатор всегда выбирает основную базу
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Реплика добавляется в setUpClass: при сборке тестов ее еще нет в настройках
+    databases = {DEFAULT_DB_ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика - второе соединение с уже созданной тестовой основной базой (TEST MIRROR),
+        # отдельный сервер не нужен. Соединение существует только на время тестов класса.
+        if REPLICA not in connections:
+            primary = connections[DEFAULT_DB_ALIAS].settings_dict
+            connections.settings[REPLICA] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': DEFAULT_DB_ALIAS}}
+            cls.addClassCleanup(cls.remove_replica)
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @staticmethod
+    def remove_replica():
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        self.user = user
+        self.supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        company = Company.objects.create(name='Поставщик', owner=self.supplier)
+        category = Category.objects.create(name='Телефоны')
+        self.product = Product.objects.create(name='Телефон', description='', article=1, quantity=5, price=100,
+                                              category=category, company=company)
+        self.auth = self.headers(user)
+        self.contact = {'phone': '+79990000000', 'city': 'Москва', 'street': 'Тверская', 'apartment': '1'}
+
+    @staticmethod
+    def headers(user):
+        token = UserTokenObtainPairSerializer.get_token(user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def request(self, method, path, **kwargs):
+        """
+        Выполняем запрос и возвращаем ответ и SQL, выполненные на основной базе и на реплике.
+        Потоковый ответ читается целиком внутри замера.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(path, **kwargs)
+            if response.streaming:
+                response.body = b''.join(response.streaming_content)
+        return response, [query['sql'] for query in primary], [query['sql'] for query in replica]
+
+    def test_catalog_reads_go_to_replica(self):
+        response, primary, replica = self.request('get', '/api/products/facets')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertTrue(replica)
+        self.assertEqual(primary, [])
+
+    def test_writes_go_to_primary(self):
+        response, primary, replica = self.request('post', '/api/user/contact', data=self.contact, **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any(sql.startswith('INSERT') for sql in primary))
+        self.assertEqual(replica, [])
+
+    def test_reads_after_write_are_pinned_to_primary(self):
+        self.request('post', '/api/user/contact', data=self.contact, **self.auth)
+        response, primary, replica = self.request('get', '/api/products/facets', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+
+        # Липкое окно действует только для пользователя, который записывал
+        response, primary, replica = self.request('get', '/api/products/facets')
+        self.assertTrue(replica)
+        self.assertEqual(primary, [])
+
+    def test_streamed_export_follows_sticky_window(self):
+        headers = self.headers(self.supplier)
+        response, primary, replica = self.request('get', '/api/partner/export', **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Телефон', response.body.decode())
+        self.assertTrue(any('backend_product' in sql for sql in replica))
+        self.assertFalse(any('backend_product' in sql for sql in primary))
+
+        # Строки читаются при отдаче ответа, но база выбрана с учетом записи пользователя
+        self.request('post', '/api/user/contact', data=self.contact, **headers)
+        response, primary, replica = self.request('get', '/api/partner/export', **headers)
+        self.assertIn('Телефон', response.body.decode())
+        self.assertTrue(any('backend_product' in sql for sql in primary))
+        self.assertEqual(replica, [])
+
+    def test_order_export_reads_from_replica(self):
+        order = Order.objects.create(user=self.user, status='new')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1)
+        response, primary, replica = self.request('get', '/api/order/export', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"order_id":%d' % order.id, response.body)
+        self.assertTrue(any('backend_orderitem' in sql for sql in replica))
+        self.assertFalse(any('backend_orderitem' in sql for sql in primary))
+
+        # Остальные чтения заказов выполняются на основной базе
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Order), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Order, report=True), REPLICA)
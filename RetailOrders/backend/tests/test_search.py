@@ -0,0 +1,57 @@
+"""
+Поиск товаров (backend.search). В SQLite проверяется поиск по подстроке;
+полнотекстовый поиск и триграммы требуют PostgreSQL.
+"""
+from django.test import TestCase
+
+from backend.models import Category, Company, Product, User
+from backend.search import search_products
+
+
+class ProductSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        category = Category.objects.create(name='Смартфоны')
+        company = Company.objects.create(name='Связной', owner=supplier)
+        products = [
+            ('Чехол для iPhone', 'Силиконовый чехол'),
+            ('Смартфон Apple iPhone XS Max', 'Черный, 512 ГБ'),
+            ('Смартфон Xiaomi Mi 9', 'Синий, 64 ГБ'),
+            ('Защитное стекло', 'Для iPhone XS Max'),
+        ]
+        cls.products = [Product.objects.create(name=name, description=description, article=article, quantity=1,
+                                               price=100, category=category, company=company)
+                        for article, (name, description) in enumerate(products, start=1)]
+
+    def search(self, text, limit=20):
+        return [product.name for product in search_products(Product.objects.all(), text, limit)]
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('iphone'), ['Чехол для iPhone', 'Смартфон Apple iPhone XS Max',
+                                                 'Защитное стекло'])
+        # Полное совпадение строки в названии выше совпадения в описании
+        self.assertEqual(self.search('XS Max'), ['Смартфон Apple iPhone XS Max', 'Защитное стекло'])
+
+    def test_all_terms_are_required(self):
+        self.assertEqual(self.search('Смартфон Синий'), ['Смартфон Xiaomi Mi 9'])
+        self.assertEqual(self.search('Смартфон Красный'), [])
+
+    def test_empty_query(self):
+        self.assertEqual(self.search('   '), [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.search('iphone', limit=2)), 2)
+
+    def test_queryset_filter_is_kept(self):
+        queryset = Product.objects.exclude(pk=self.products[0].pk)
+        self.assertEqual([product.name for product in search_products(queryset, 'чехол', 10)], [])
+
+    def test_search_view(self):
+        response = self.client.get('/api/products/search', {'q': 'xiaomi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['name'] for product in response.json()], ['Смартфон Xiaomi Mi 9'])
+        self.assertEqual(len(self.client.get('/api/products/search', {'q': 'iphone', 'limit': 1}).json()), 1)
+        self.assertEqual(self.client.get('/api/products/search').json(), [])
+        self.assertEqual(self.client.get('/api/products/search', {'q': 'iphone', 'limit': 'x'}).status_code, 400)
@@ -0,0 +1,102 @@
+"""
+JWT-аутентификация без запроса пользователя (backend.authentication)
+"""
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.authentication import StatelessJWTAuthentication, TokenUser
+from backend.models import User
+from backend.serializers import UserTokenObtainPairSerializer
+
+
+class StatelessAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_user_is_not_loaded(self):
+        token = UserTokenObtainPairSerializer.get_token(self.user).access_token
+        # Версия токенов читается из базы один раз, затем из кэша
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(token)
+            self.assertIsInstance(user, TokenUser)
+            self.assertEqual((user.pk, user.role, user.is_active, user.is_staff),
+                             (self.user.pk, 'supplier', True, False))
+            self.assertTrue(user.is_authenticated)
+        # Остальные поля загружают пользователя
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'supplier@example.com')
+
+    def test_token_without_claims_loads_user(self):
+        token = AccessToken.for_user(self.user)
+        user, _ = self.authenticate(token)
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_deleted_user_is_rejected(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {UserTokenObtainPairSerializer.get_token(self.user).access_token}'}
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/user/retrieveupdate', **headers).status_code, 401)
+
+
+class TokenRevocationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'old-password')
+
+    def headers(self, user=None):
+        token = UserTokenObtainPairSerializer.get_token(user or self.user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def profile(self, headers):
+        return self.client.get('/api/user/retrieveupdate', **headers)
+
+    def test_token_is_accepted(self):
+        headers = self.headers()
+        # Второй запрос проверяет версию токенов из кэша
+        self.assertEqual(self.profile(headers).status_code, 200)
+        self.assertEqual(self.profile(headers).status_code, 200)
+
+    def test_password_change_revokes_tokens(self):
+        headers = self.headers()
+        self.assertEqual(self.profile(headers).status_code, 200)
+
+        # Кэш версии токенов сбрасывается после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/user/changepassword', data={
+                'old_password': 'old-password', 'new_password': 'new-password'}, content_type='application/json',
+                **headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.profile(headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Token has been revoked')
+        self.user.refresh_from_db()
+        self.assertEqual(self.profile(self.headers()).status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        headers = self.headers()
+        self.assertEqual(self.profile(headers).status_code, 200)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.profile(headers).status_code, 401)
+
+    def test_unrelated_changes_keep_tokens(self):
+        headers = self.headers()
+        self.assertEqual(self.profile(headers).status_code, 200)
+        self.user.first_name = 'Иван'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.profile(headers).status_code, 200)
+
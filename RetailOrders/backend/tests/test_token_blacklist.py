@@ -0,0 +1,54 @@
+"""
+Ротация refresh-токенов с черным списком в кэше (backend.tokens)
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from backend.models import User
+from backend.serializers import UserTokenObtainPairSerializer
+
+
+class TokenBlacklistTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+
+    def refresh(self, token):
+        return self.client.post('/api/token/refresh', data={'refresh': str(token)}, content_type='application/json')
+
+    def test_rotation_blacklists_old_token(self):
+        token = UserTokenObtainPairSerializer.get_token(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        rotated = response.json()['refresh']
+        self.assertNotEqual(rotated, str(token))
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=token['jti']).exists())
+        self.assertTrue(OutstandingToken.objects.filter(token=rotated, user_id=self.user.pk).exists())
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    def test_reuse_is_rejected_without_cache(self):
+        token = UserTokenObtainPairSerializer.get_token(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        # Кэш другого процесса: повтор отклоняется по уникальности записи в черном списке
+        cache.clear()
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_blacklist_check_uses_cache(self):
+        token = UserTokenObtainPairSerializer.get_token(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_refresh_token_is_revoked(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user)
+        self.user.set_password('new-password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,45 @@
+"""
+Общие данные и заголовки для тестов
+"""
+from django.test import TestCase
+
+from backend.models import Category, Company, Product, User
+from backend.serializers import UserTokenObtainPairSerializer
+
+
+def auth_headers(user):
+    """
+    Заголовок Authorization с access-токеном пользователя
+    """
+    token = UserTokenObtainPairSerializer.get_token(user).access_token
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+class OrderTestCase(TestCase):
+    """
+    Покупатель, два поставщика и товары для тестов заказов
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.supplier = User.objects.create_user('supplier', 'supplier@example.com', 'password', role='supplier')
+        cls.other_supplier = User.objects.create_user('other', 'other@example.com', 'password', role='supplier')
+        category = Category.objects.create(name='Телефоны')
+        company = Company.objects.create(name='Поставщик', owner=cls.supplier)
+        other_company = Company.objects.create(name='Другой поставщик', owner=cls.other_supplier)
+        cls.phone = Product.objects.create(name='Телефон', description='', article=1, quantity=5, price=100,
+                                           category=category, company=company)
+        cls.case = Product.objects.create(name='Чехол', description='', article=2, quantity=10, price=30,
+                                          category=category, company=company)
+        cls.cable = Product.objects.create(name='Кабель', description='', article=3, quantity=10, price=20,
+                                           category=category, company=other_company)
+
+    def checkout(self, *items):
+        return self.client.post('/api/order/checkout', data={'items': [
+            {'product': product.id, 'quantity': quantity} for product, quantity in items
+        ]}, content_type='application/json', **auth_headers(self.buyer))
+
+    def stock(self, product):
+        product.refresh_from_db(fields=['quantity'])
+        return product.quantity
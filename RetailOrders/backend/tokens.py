@@ -0,0 +1,72 @@
+"""
+Refresh-токены с черным списком в кэше.
+
+Стандартный RefreshToken при каждом обновлении проверяет BlacklistedToken,
+загружает пользователя для записи в черный список и для новой записи
+OutstandingToken и выполняет несколько get_or_create. Здесь проверка
+черного списка выполняется по кэшу, а запись в базу сводится к вставкам
+по id пользователя из токена. Повторное использование токена,
+которого еще нет в кэше (кэш другого процесса, вытеснение), отклоняется
+по уникальности BlacklistedToken.token при ротации.
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+def _blacklist_key(jti):
+    return f'auth:blacklist:{jti}'
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    Refresh-токен, черный список которого проверяется по кэшу
+    """
+
+    def check_blacklist(self):
+        if cache.get(_blacklist_key(self.payload[api_settings.JTI_CLAIM])):
+            raise TokenError(_('Token is blacklisted'))
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            # Без ротации повторное использование не проверяется при записи в черный список
+            super().check_blacklist()
+
+    def _outstanding(self):
+        return OutstandingToken(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            token=str(self),
+            created_at=self.current_time,
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
+
+    def blacklist(self):
+        """
+        Добавляем токен в черный список
+        :raise TokenError: токен уже в черном списке
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        with transaction.atomic():
+            try:
+                token_id = OutstandingToken.objects.values_list('id', flat=True).get(jti=jti)
+            except OutstandingToken.DoesNotExist:
+                token_id = self.outstand().id
+            try:
+                with transaction.atomic():
+                    blacklisted = BlacklistedToken.objects.create(token_id=token_id)
+            except IntegrityError:
+                raise TokenError(_('Token is blacklisted'))
+
+        timeout = max(int((datetime_from_epoch(self.payload['exp']) - aware_utcnow()).total_seconds()), 1)
+        cache.set(_blacklist_key(jti), True, timeout)
+        return blacklisted
+
+    def outstand(self):
+        # После ротации jti новый, поэтому запись создается без get_or_create
+        outstanding = self._outstanding()
+        outstanding.save()
+        return outstanding
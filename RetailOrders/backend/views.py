@@ -1,14 +1,35 @@
 #from django.shortcuts import render
+import hmac
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import F, Max, Min, Sum
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.http import JsonResponse
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.request import Request
-#from rest_framework.generics import ListAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView, get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Contact
-from .serializers import UserSerializer, UserCreateSerializer, UserChangePasswordSerializer, ContactSerializer
+from . import exports
+from .cache import SUMMARY, catalog_cache, product_list_scopes
+from .contacts import ContactBatchError, apply_contact_batch
+from .facets import facet_counts
+from .fastpath import serialize_rows
+from .filters import PRODUCT_PARAMS, filter_products
+from .instrumentation import registry
+from .importer import FORMATS, PriceListError, detect_format, import_price_list
+from .models import CatalogSummary, Category, Company, Contact, Order, Product
+from .order_status import bulk_transition, supplier_orders
+from .orders import CheckoutError, place_order
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .search import search_products
+from .serializers import UserSerializer, UserCreateSerializer, UserChangePasswordSerializer, ContactSerializer, \
+    ContactDataSerializer, ContactBatchSerializer, ProductCatalogSerializer, CheckoutSerializer, OrderSerializer, OrderStatusSerializer, CategorySerializer
 
 
 # Create your views here.
@@ -90,6 +111,7 @@ class ContactsView(APIView):
     """
 
     permission_classes = (IsAuthenticated,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
 
     def get(self, request):
         """
@@ -99,9 +121,8 @@ class ContactsView(APIView):
         """
 
         contact = Contact.objects.filter(
-            user_id=request.user.id)
-        serializer = ContactSerializer(contact, many=True)
-        return Response(serializer.data)
+            user_id=request.user.id).order_by('id')
+        return Response(serialize_rows(ContactSerializer, contact))
 
     def post(self, request):
         """
@@ -109,11 +130,9 @@ class ContactsView(APIView):
         :param request: standard request
         :return: standard response
         """
-        request.data._mutable = True
-        request.data.update({'user': request.user.id})
-        serializer = ContactSerializer(data=request.data)
+        serializer = ContactDataSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(user_id=request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -132,7 +151,7 @@ class ContactDetailView(APIView):
 
     def get_contact(self, pk, user):
         try:
-            return Contact.objects.get(pk=pk, user=user)
+            return Contact.objects.get(pk=pk, user_id=user.id)
         except Contact.DoesNotExist:
             return None
 
@@ -149,7 +168,7 @@ class ContactDetailView(APIView):
             return Response(status=status.HTTP_404_NOT_FOUND)
         serializer = ContactSerializer(contact, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            serializer.save(user_id=request.user.id)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -159,3 +178,352 @@ class ContactDetailView(APIView):
             return Response({"Message": f"Contact id = {pk} not found"}, status=status.HTTP_404_NOT_FOUND)
         contact.delete()
         return Response({"Message": f"Contact id = {pk} successfully deleted"}, status=status.HTTP_204_NO_CONTENT)
+
+
+class ContactBatchView(APIView):
+    """
+    Creating, updating and deleting many contacts of the authenticated user
+    in one transaction. Either the whole batch is applied or nothing is written;
+    the response contains a result for every item.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = ContactBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'Status': False, 'Errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = apply_contact_batch(request.user.id, **serializer.validated_data)
+        except ContactBatchError as error:
+            return Response({'Status': False, 'Errors': error.results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'Status': True, 'results': results})
+
+
+class PriceListImportView(APIView):
+    """
+    Import of a supplier price list (YAML, CSV, JSON Lines).
+    The file is streamed and written in batches, so its size is not limited by memory.
+    With mode=incremental only changed products are written and products
+    missing from the price list are removed.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'supplier':
+            return Response({'Status': False, 'Error': 'Only for suppliers'}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'Status': False, 'Errors': 'Не указаны все необходимые аргументы'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        company = request.data.get('company')
+        if company is not None and not str(company).isdigit():
+            return Response({'Status': False, 'Errors': 'Некорректный id компании'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        companies = Company.objects.filter(owner_id=request.user.id)
+        if company is not None:
+            companies = companies.filter(pk=int(company))
+        company = companies.order_by('id').first()
+        if company is None:
+            return Response({'Status': False, 'Error': 'Company not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        file_format = request.data.get('format')
+        try:
+            if file_format not in FORMATS:
+                file_format = detect_format(upload.name)
+            report = import_price_list(upload, file_format, company,
+                                       incremental=request.data.get('mode') == 'incremental')
+        except PriceListError as error:
+            return Response({'Status': False, 'Errors': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'Status': True, **report}, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """
+    Base view for streaming downloads.
+    Query parameters: format (jsonl or csv, jsonl by default) and compress=gzip.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # "format" selects the export file format, not a DRF renderer
+        return super().perform_content_negotiation(request, force=True)
+
+    @staticmethod
+    def export_response(rows, request, name, columns=None):
+        export_format = request.query_params.get('format', 'jsonl')
+        compress = request.query_params.get('compress') == 'gzip'
+        try:
+            chunks = exports.stream(rows, export_format, columns=columns, compress=compress)
+        except exports.ExportError as error:
+            return Response({'Status': False, 'Errors': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(chunks, content_type=exports.content_type(export_format, compress))
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(name, export_format, compress)}"'
+        return response
+
+
+class PriceListExportView(ExportView):
+    """
+    Streaming export of a supplier catalog in the price list format (JSON Lines or CSV),
+    so the file can be edited and imported back.
+    Query parameters: company, format (jsonl, csv), compress=gzip.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if request.user.role != 'supplier':
+            return Response({'Status': False, 'Error': 'Only for suppliers'}, status=status.HTTP_403_FORBIDDEN)
+
+        company = request.query_params.get('company')
+        if company is not None and not company.isdigit():
+            return Response({'Status': False, 'Errors': 'Некорректный id компании'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        companies = Company.objects.filter(owner_id=request.user.id)
+        if company is not None:
+            companies = companies.filter(pk=int(company))
+        company = companies.order_by('id').first()
+        if company is None:
+            return Response({'Status': False, 'Error': 'Company not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        columns = None
+        if request.query_params.get('format') == 'csv':
+            columns = exports.product_columns(company)
+        return self.export_response(exports.product_rows(company), request, f'products-{company.id}', columns)
+
+
+class OrderExportView(ExportView):
+    """
+    Streaming export of the order history, one line per order item (JSON Lines or CSV).
+    Staff get all orders, suppliers the items with their products, buyers their own orders.
+    Query parameters: date_from, date_to (YYYY-MM-DD), status, format (jsonl, csv), compress=gzip.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            items = exports.filter_order_items(exports.order_items(request.user), request.query_params)
+        except exports.ExportError as error:
+            return Response({'Status': False, 'Errors': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.export_response(exports.order_rows(items), request, 'orders', exports.ORDER_COLUMNS)
+
+
+class ProductListView(ListAPIView):
+    """
+    Product catalog with keyset pagination on (name, id).
+    Query parameters:
+    - category, company: id of the category / supplier
+    - price_min, price_max: price range
+    - property: "<property id>:<value>" or "<property id>:<min>..<max>", may be repeated
+    - limit, cursor: page size and position returned in "next"
+    Rows are read with values_list() straight into the serializer format
+    (backend.fastpath) and rendered with orjson when it is installed.
+    """
+
+    permission_classes = (AllowAny,)
+    serializer_class = ProductCatalogSerializer
+    pagination_class = KeysetPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_queryset(self):
+        try:
+            return filter_products(Product.objects.all(), self.request.query_params)
+        except ValueError:
+            raise ValidationError('Некорректные параметры фильтрации')
+
+    def load_rows(self, queryset):
+        # Страница читается через values_list() сразу в формате serializer_class
+        return serialize_rows(self.serializer_class, queryset)
+
+    def cache_params(self, request):
+        # Ключ кэша строится только из известных параметров: произвольная строка
+        # запроса не создает новых записей. Хост входит в ключ из-за ссылки "next".
+        params = request.query_params
+        names = PRODUCT_PARAMS + (self.paginator.page_size_query_param, self.paginator.cursor_query_param)
+        return request.get_host() + '?' + urlencode(
+            [(name, value) for name in names for value in sorted(params.getlist(name))])
+
+    def list(self, request, *args, **kwargs):
+        def load():
+            page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            return self.get_paginated_response(page).data
+
+        params = request.query_params
+        scopes = product_list_scopes(company_id=params.get('company'), category_id=params.get('category'))
+        return Response(catalog_cache.get_list('products', self.cache_params(request), load, scopes=scopes))
+
+
+class ProductDetailView(APIView):
+    """
+    Product card with properties. Served from the catalog cache.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request, pk):
+        def load():
+            # Поисковый вектор в карточке не нужен, а читать его из каждой строки дорого
+            queryset = ProductCatalogSerializer.setup_eager_loading(Product.objects.defer('search_vector'))
+            product = get_object_or_404(queryset, pk=pk)
+            return ProductCatalogSerializer(product).data, product.company_id, product.category_id
+
+        return Response(catalog_cache.get_product(pk, load))
+
+
+class CategoryListView(APIView):
+    """
+    List of all product categories. Served from the catalog cache.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        data = catalog_cache.get_list(
+            'categories', '', lambda: CategorySerializer(Category.objects.order_by('name'), many=True).data)
+        return Response(data)
+
+
+class OrderCheckoutView(APIView):
+    """
+    Placing an order for the authenticated user.
+    The whole basket is validated and stock is reserved in one transaction:
+    either every item is reserved or nothing is written.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'Status': False, 'Errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = [(item['product'], item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            order = place_order(request.user, items)
+        except CheckoutError as error:
+            return Response({'Status': False, 'Errors': error.errors}, status=status.HTTP_409_CONFLICT)
+        return Response({'Status': True, 'order': OrderSerializer(order).data}, status=status.HTTP_201_CREATED)
+
+
+class OrderStatusView(APIView):
+    """
+    Bulk status change of orders by a supplier.
+    Only orders made up entirely of the supplier's products are affected,
+    and only transitions allowed by the order state machine for the
+    supplier role are applied (closing orders is left to staff).
+    The response lists updated and rejected order ids.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'supplier' and not request.user.is_staff:
+            return Response({'Status': False, 'Error': 'Only for suppliers'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = OrderStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'Status': False, 'Errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset, role = None, None
+        if not request.user.is_staff:
+            queryset, role = supplier_orders(request.user.id), 'supplier'
+        updated, rejected = bulk_transition(serializer.validated_data['ids'],
+                                            serializer.validated_data['status'], queryset=queryset, role=role)
+        return Response({'Status': True, 'updated': updated, 'rejected': rejected}, status=status.HTTP_200_OK)
+
+
+class CatalogSummaryView(APIView):
+    """
+    Product counts and price range per category, read from the precomputed catalog summary.
+    With ?company=<id> the figures are returned for a single supplier.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        company = request.query_params.get('company')
+        if company is not None and not company.isdigit():
+            return Response({'Status': False, 'Errors': 'Некорректный id компании'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        def load():
+            queryset = CatalogSummary.objects.all()
+            if company is not None:
+                queryset = queryset.filter(company_id=int(company))
+            return list(queryset.values('category_id', name=F('category__name')).annotate(
+                product_count=Sum('product_count'), in_stock_count=Sum('in_stock_count'),
+                min_price=Min('min_price'), max_price=Max('max_price')).order_by('name'))
+
+        return Response(catalog_cache.get_list('summary', company or '', load, scopes=(SUMMARY,)))
+
+
+class ProductSearchView(APIView):
+    """
+    Full-text product search by name and description.
+    Query parameters:
+    - q: search string
+    - limit: number of results (20 by default, 100 at most)
+    """
+
+    permission_classes = (AllowAny,)
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'Status': False, 'Errors': 'Некорректный limit'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = ProductCatalogSerializer.setup_eager_loading(Product.objects.defer('search_vector'))
+        products = search_products(queryset, request.query_params.get('q', ''), limit)
+        return Response(ProductCatalogSerializer(products, many=True).data)
+
+
+class ProductFacetView(APIView):
+    """
+    Faceted product search.
+    Accepts the same filters as the catalog and returns the number of matching
+    products, the first "limit" of them and the number of products for every
+    property value among the matches.
+    """
+
+    permission_classes = (AllowAny,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+            products = filter_products(Product.objects.all(), request.query_params)
+        except ValueError:
+            return Response({'Status': False, 'Errors': 'Некорректные параметры фильтрации'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        page = products.order_by('name', 'id')[:limit]
+        return Response({
+            'count': products.count(),
+            'results': serialize_rows(ProductCatalogSerializer, page),
+            'facets': facet_counts(products),
+        })
+
+
+class MetricsView(APIView):
+    """
+    Request metrics of all processes in the Prometheus text format.
+    Requires "Authorization: Bearer <METRICS_TOKEN>"; without METRICS_TOKEN
+    the endpoint is available only with DEBUG.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if settings.METRICS_TOKEN:
+            allowed = hmac.compare_digest(header.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode())
+        else:
+            allowed = settings.DEBUG
+        if not allowed:
+            return Response({'Status': False, 'Error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(registry.collect(), content_type='text/plain; version=0.0.4; charset=utf-8')